@@ -48,6 +48,7 @@ from .duwi_smarthome_sdk.base.customer_api import CustomerApi, SharingTokenListe
 from .duwi_smarthome_sdk.base.customer_device import CustomerDevice
 from .duwi_smarthome_sdk.base.customer_scene import CustomerScene
 from .duwi_smarthome_sdk.base.manager import Manager, SharingDeviceListener
+from .duwi_smarthome_sdk.base.metadata_cache import MetadataCache
 
 type DuwiConfigEntry = ConfigEntry[HomeAssistantDuwiData]
 
@@ -83,6 +84,8 @@ async def async_setup_entry(hass: HomeAssistant, entry: DuwiConfigEntry) -> bool
     token_listener = TokenListener(hass, entry)
     # 全局lp 只构造一个
     lp = hass.data[DOMAIN].get("lp") if hass.data[DOMAIN].get("lp") else LanProcess()
+    # 拓扑缓存在重载之间共用
+    metadata_cache = hass.data[DOMAIN].setdefault("metadata_cache", MetadataCache())
     manager: Manager = Manager(
         id=entry.entry_id,
         customer_api=CustomerApi(
@@ -100,10 +103,11 @@ async def async_setup_entry(hass: HomeAssistant, entry: DuwiConfigEntry) -> bool
         ),
         house_key=entry.data.get(HOUSE_KEY),
         token_listener=token_listener,
-        lp=lp
+        lp=lp,
+        metadata_cache=metadata_cache
     )
     # 保留原先的名称
-    lp.add_message_listener(manager.handle_lan_message)
+    lp.add_message_listener(manager.handle_lan_message, entry.entry_id)
     # start方法只执行一次
     if not hass.data[DOMAIN].get("lp"):
         lp.start()
@@ -133,6 +137,7 @@ async def async_setup_entry(hass: HomeAssistant, entry: DuwiConfigEntry) -> bool
     await cleanup_device_registry(hass, ids)
     hass.data[DOMAIN].setdefault("existing_house", []).append(entry.data[HOUSE_NO])
     hass.loop.create_task(manager.is_connected())
+    hass.loop.create_task(manager.token_scheduler())
     # 开启全局的ws监听
     if is_online:
         await hass.async_create_task(manager.ws.reconnect())
@@ -199,14 +204,18 @@ async def cleanup_device_registry(hass: HomeAssistant, device_ids: list) -> None
 async def async_unload_entry(hass: HomeAssistant, entry: DuwiConfigEntry) -> bool:
     """Unloading the Duwi platforms."""
     # Attempt to unload all platforms associated with the entry.
-    await hass.data[DOMAIN][entry.entry_id].manager.unload()
+    manager = hass.data[DOMAIN][entry.entry_id].manager
+    await manager.unload()
     house_no = entry.data.get(HOUSE_NO)
+    # 缓存在重新加载后保留, 使其过期以便重新拉取并按内容哈希比较
+    manager.metadata_cache.invalidate(house_no)
     if house_no in hass.data[DOMAIN].get("existing_house"):
         hass.data[DOMAIN]["existing_house"].remove(house_no)
 
     if lp := hass.data[DOMAIN].get("lp"):
         _LOGGER.info("clear_hosts from async_unload_entry")
         lp.clear_hosts(entry.entry_id)
+        lp.remove_message_listener(entry.entry_id)
 
     return await hass.config_entries.async_unload_platforms(
         entry, SUPPORTED_PLATFORMS
@@ -221,6 +230,7 @@ async def async_remove_entry(hass: HomeAssistant, entry: DuwiConfigEntry) -> boo
     manager = hass.data[DOMAIN][entry.entry_id].manager
     await cleanup_device_registry(hass, manager.device_map.keys())
     await manager.unload(True)
+    manager.metadata_cache.invalidate(entry.data.get(HOUSE_NO))
     hass.data[DOMAIN].pop(entry.entry_id)
 
     house_no_list: [] = hass.data[DOMAIN].get("existing_house")
@@ -253,9 +263,12 @@ class DeviceListener(SharingDeviceListener):
     def update_scene(self, scene: CustomerScene):
         dispatcher_send(self.hass, f"{DUWI_SCENE_UPDATE}_{scene.scene_no}")
 
-    def update_device(self, device: CustomerDevice) -> None:
+    def update_device(self, device: CustomerDevice, status: dict[str, Any] | None = None) -> None:
         """Update device status."""
-        dispatcher_send(self.hass, f"{DUWI_HA_SIGNAL_UPDATE_ENTITY}_{device.device_no}")
+        if status is None:
+            dispatcher_send(self.hass, f"{DUWI_HA_SIGNAL_UPDATE_ENTITY}_{device.device_no}")
+        else:
+            dispatcher_send(self.hass, f"{DUWI_HA_SIGNAL_UPDATE_ENTITY}_{device.device_no}", status)
 
     def add_device(self, device: CustomerDevice) -> None:
         """Add device added listener."""
@@ -1,13 +1,27 @@
+from collections import ChainMap
+from collections.abc import Mapping
+import time
 from typing import Any
 
+from homeassistant.core import CALLBACK_TYPE, callback
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.event import async_call_later
 
 from . import debounce
-from .const import MANUFACTURER, _LOGGER, DUWI_HA_SIGNAL_UPDATE_ENTITY, DOMAIN
+from .const import (
+    _LOGGER,
+    DOMAIN,
+    DUWI_COMMAND_CONFIRM_TIMEOUT,
+    DUWI_HA_SIGNAL_UPDATE_ENTITY,
+    DUWI_UNECHOED_COMMANDS,
+    MANUFACTURER,
+)
 from .duwi_smarthome_sdk.base.manager import Manager
 from .duwi_smarthome_sdk.base.customer_device import CustomerDevice
+from .duwi_smarthome_sdk.const.const import Code
+from .pending_commands import PendingCommands
 
 
 class DuwiEntity(Entity):
@@ -21,7 +35,9 @@ class DuwiEntity(Entity):
         self.device = device
         self.entity_id = f"{DOMAIN}.{device.device_no}"
         self.device_manager = device_manager
-        self.is_control = True
+        # 等待确认的指令,只用于显示,不写入 device.value
+        self._pending_commands = PendingCommands(DUWI_COMMAND_CONFIRM_TIMEOUT, DUWI_UNECHOED_COMMANDS)
+        self._pending_timer: CALLBACK_TYPE | None = None
 
     @property
     def device_info(self) -> DeviceInfo:
@@ -43,13 +59,24 @@ class DuwiEntity(Entity):
                 self.handle_signal,
             )
         )
+        self.async_on_remove(self._cancel_pending_timer)
 
-    async def handle_signal(self) -> None:
-        """Handle the signal and call the appropriate method based on is_control."""
-        if self.is_control:
-            self.async_write_ha_state()
-        else:
-            self.is_control = True
+    async def handle_signal(self, status: dict[str, Any] | None = None) -> None:
+        """Handle a device update, holding back values still waiting for confirmation."""
+        if self._pending_commands and status is not None:
+            confirmed_only = not self._pending_commands.reconcile(status)
+            if not self._pending_commands:
+                self._cancel_pending_timer()
+            if confirmed_only:
+                return
+        self.async_write_ha_state()
+
+    @property
+    def value(self) -> Mapping[str, Any]:
+        """Device value as shown, with unconfirmed command values on top."""
+        if not self._pending_commands:
+            return self.device.value
+        return ChainMap(self._pending_commands.overlay, self.device.value)
 
     @property
     def available(self) -> bool:
@@ -58,7 +85,39 @@ class DuwiEntity(Entity):
 
     async def _send_command(self, commands: dict[str, Any]) -> None:
         """Send command to the device."""
-        self.device.value.update(commands)
-        self.is_control = False
-        self.async_write_ha_state()
-        await self.device_manager.send_commands(self.device.device_no, self.device.is_group, commands)
+        sent = self._pending_commands.add(commands, time.monotonic())
+        if sent:
+            self.async_write_ha_state()
+            self._schedule_pending_timer()
+        result = await self.device_manager.send_commands(self.device.device_no, self.device.is_group, commands)
+        if result is None or result.get("code") != Code.SUCCESS.value:
+            # 下发失败,撤回本次的乐观状态
+            if self._pending_commands.discard(sent):
+                _LOGGER.debug("device %s command %s failed, restore reported value", self.device.device_no,
+                              list(sent))
+                self._schedule_pending_timer()
+                self.async_write_ha_state()
+
+    def _schedule_pending_timer(self) -> None:
+        self._cancel_pending_timer()
+        deadline = self._pending_commands.next_deadline
+        if deadline is None or self.hass is None:
+            return
+        self._pending_timer = async_call_later(
+            self.hass, max(deadline - time.monotonic(), 0), self._async_pending_timeout
+        )
+
+    @callback
+    def _cancel_pending_timer(self) -> None:
+        if self._pending_timer is not None:
+            self._pending_timer()
+            self._pending_timer = None
+
+    @callback
+    def _async_pending_timeout(self, _now) -> None:
+        self._pending_timer = None
+        # 超时未确认,回退到设备上报的状态
+        if self._pending_commands.expire(time.monotonic(), self.device.value):
+            _LOGGER.debug("device %s commands not confirmed, restore reported value", self.device.device_no)
+            self.async_write_ha_state()
+        self._schedule_pending_timer()
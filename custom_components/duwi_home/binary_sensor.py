@@ -90,6 +90,6 @@ class DuwiBinarySensorEntity(DuwiEntity, BinarySensorEntity):
     @property
     def is_on(self) -> bool | None:
         """Return the state of the sensor."""
-        v = self.device.value
+        v = self.value
         return (v.get("human_state", v.get("trigger_state", False))
                 or v.get("additional_property", {}).get(DPCode.TRIGGER, False))
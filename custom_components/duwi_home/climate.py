@@ -1,4 +1,7 @@
-from typing import Any, Union
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Mapping, Union
 
 from homeassistant.components.climate import ClimateEntityDescription, ClimateEntity, HVACMode, ClimateEntityFeature, \
     HVACAction
@@ -9,6 +12,7 @@ from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .duwi_smarthome_sdk.base.manager import Manager
 from .duwi_smarthome_sdk.base.customer_device import CustomerDevice
+from .duwi_smarthome_sdk.const.const import HAVC_TYPE_MAP
 from . import DuwiConfigEntry
 
 from .base import DuwiEntity
@@ -56,6 +60,35 @@ CLIMATE: dict[str, tuple[ClimateEntityDescription, ...]] = {
 }
 
 
+@dataclass(frozen=True)
+class ClimateSchema:
+    """Value keys and capabilities of a climate entity, shared by all devices of a sub type."""
+
+    switch: str
+    mode: str
+    set_temp: str
+    real_temp: str
+    set_humidity: str
+    real_humidity: str
+    wind_speed: str
+    lock_mode: str
+    work_mode: str
+    # 设置预设模式使用的key
+    preset_command: str
+    temp_step: float | None
+    temp_range: tuple[float, float]
+    humidity_range: tuple[float, float]
+    supports_temperature: bool
+    supports_humidity: bool
+    # Home Assistant 的接口是列表, 每种类型只构建一次, 不要修改
+    hvac_modes: list[HVACMode]
+    preset_modes: list[str] | None
+    fan_modes: list[str] | None
+    # 模式 -> 该模式的目标温度key / 温度范围
+    mode_set_temp: Mapping[str, str]
+    mode_temp_range: Mapping[str, tuple[float, float]]
+
+
 async def async_setup_entry(
         hass: HomeAssistant, entry: DuwiConfigEntry, async_add_entities: AddEntitiesCallback
 ) -> None:
@@ -116,192 +149,148 @@ class DuwiClimateEntity(DuwiEntity, ClimateEntity):
         self.entity_description = description
         self._attr_temperature_unit = UnitOfTemperature.CELSIUS
         self._attr_unique_id = f"{super().unique_id}{description.key}"
-        havc = self.device.value.get("havc", {})
+        self._schema = climate_schema(device.device_sub_type_no, description.key)
         self._attr_supported_features = (
                 SUPPORT_FLAGS
                 | ClimateEntityFeature.TURN_OFF
                 | ClimateEntityFeature.TURN_ON
-                | (ClimateEntityFeature.TARGET_TEMPERATURE if havc.get(description.key + "_set_temp_range") else 0)
-                | (ClimateEntityFeature.TARGET_HUMIDITY if havc.get(description.key + "_set_humidity_range") else 0)
-                | (ClimateEntityFeature.PRESET_MODE if self.preset_modes else 0)
-                | (ClimateEntityFeature.FAN_MODE if self.fan_modes else 0)
+                | (ClimateEntityFeature.TARGET_TEMPERATURE if self._schema.supports_temperature else 0)
+                | (ClimateEntityFeature.TARGET_HUMIDITY if self._schema.supports_humidity else 0)
+                | (ClimateEntityFeature.PRESET_MODE if self._schema.preset_modes else 0)
+                | (ClimateEntityFeature.FAN_MODE if self._schema.fan_modes else 0)
         )
 
     @property
     def available(self) -> bool:
         """Return if the device is available."""
-        v = self.device.value
+        v = self.value
         for key, value in v.items():
             if key.endswith("_fault_s") and value is True:
                 return False
-        return self.device.value.get("online", False)
+        return self.value.get("online", False)
 
     @property
     def target_temperature_step(self) -> float | None:
         """Return the unit of measurement."""
-        havc = self.device.value.get("havc", {})
-        return havc.get(self.entity_description.key + "_temp_step")
+        return self._schema.temp_step
 
     @property
     def preset_mode(self) -> str | None:
         """Return the current preset mode."""
-        v = self.device.value
-        return v.get(self.entity_description.key + "_lock_mode") or v.get(
-            self.entity_description.key + "_work_mode")
+        v = self.value
+        return v.get(self._schema.lock_mode) or v.get(self._schema.work_mode)
 
     @property
     def preset_modes(self) -> list[str] | None:
         """Return the list of available preset modes."""
-        havc = self.device.value.get("havc", {})
-        return havc.get(self.entity_description.key + "_lock_mode") or havc.get(
-            self.entity_description.key + "_work_mode")
+        return self._schema.preset_modes
 
     @property
     def target_temperature(self) -> float | None:
         """Return the temperature we try to reach."""
-        v = self.device.value
-        mode = v.get(self.entity_description.key + "_mode")
-        t = v.get(self.entity_description.key + "_set_temp")
-        if not mode:
-            return t
-        temp = v.get(self.entity_description.key + "_" + mode + "_set_temp")
-        if not temp:
-            temp = v.get(self.entity_description.key + "_set_temp")
-        return temp
+        v = self.value
+        mode = v.get(self._schema.mode)
+        temp = None
+        if mode and (key := self._schema.mode_set_temp.get(mode)):
+            temp = v.get(key)
+        return temp or v.get(self._schema.set_temp)
 
     @property
     def current_temperature(self) -> float | None:
         """Return the current temperature."""
-        return self.device.value.get(self.entity_description.key + "_real_temp")
+        return self.value.get(self._schema.real_temp)
 
     @property
     def target_humidity(self) -> float | None:
         """Return the humidity we try to reach."""
-        # return 0.4
-        return self.device.value.get(self.entity_description.key + "_set_humidity")
+        return self.value.get(self._schema.set_humidity)
 
     @property
     def current_humidity(self) -> int | None:
         """Return the current humidity."""
-        return self.device.value.get(self.entity_description.key + "_real_humidity")
+        return self.value.get(self._schema.real_humidity)
 
     @property
     def fan_modes(self) -> list[str] | None:
         """Return the list of available fan modes."""
-        return self.device.value.get("havc", {}).get(self.entity_description.key + "_wind_speed")
+        return self._schema.fan_modes
 
     @property
     def fan_mode(self) -> str | None:
         """Return the current fan mode."""
-        return self.device.value.get(self.entity_description.key + "_wind_speed")
+        return self.value.get(self._schema.wind_speed)
 
     @property
     def hvac_mode(self) -> HVACMode | None:
         """Return the current operation mode."""
-        v = self.device.value
-        if v.get(self.entity_description.key + "_switch") == "off":
+        v = self.value
+        if v.get(self._schema.switch) == "off":
             return HVACMode.OFF
-        mode = self.convert_mode(v.get(self.entity_description.key + "_mode"))
+        mode = self.convert_mode(v.get(self._schema.mode))
         return mode if mode else self.default_mode()
 
     @property
     def hvac_modes(self) -> list[HVACMode]:
         """Return the list of available operation modes."""
-        mode_key = self.entity_description.key + "_mode"
-        raw_modes = self.device.value.get("havc", {}).get(mode_key, [])
-
-        if not raw_modes:
-            if self.entity_description.key == DPCode.FA:
-                raw_modes.append("fan")
-            if self.entity_description.key == DPCode.HP or self.entity_description.key == DPCode.FH:
-                raw_modes.append("hot")
-
-        mode = [mode for raw_mode in raw_modes if (mode := self.convert_mode(raw_mode))]
-        mode.append(HVACMode.OFF)
-        return mode
+        return self._schema.hvac_modes
 
     @property
     def max_humidity(self) -> float:
         """Return the maximum humidity value."""
-        return self.device.value.get("havc", {}).get(self.entity_description.key + "_set_humidity_range", [40, 75])[1]
+        return self._schema.humidity_range[1]
 
     @property
     def min_humidity(self) -> float:
         """Return the minimum humidity value."""
-        return self.device.value.get("havc", {}).get(self.entity_description.key + "_set_humidity_range", [40, 75])[0]
+        return self._schema.humidity_range[0]
 
     @property
     def max_temp(self) -> float:
         """Return the maximum temperature value."""
-        v = self.device.value
-        h = self.device.value.get("havc", {})
-        mode = v.get(self.entity_description.key + "_mode")
-        r = 0
-        if mode:
-            r = h.get(self.entity_description.key + "_set_" + mode + "_temp_range")
-            r = r[1] if r else 0
-        if not r:
-            r = h.get(self.entity_description.key + "_set_temp_range", [5, 45])[1]
-        return r
+        return self._temp_range()[1]
 
     @property
     def min_temp(self) -> float:
         """Return the minimum temperature value."""
-        v = self.device.value
-        h = self.device.value.get("havc", {})
-        mode = v.get(self.entity_description.key + "_mode")
-        r = 0
-        if mode:
-            r = h.get(self.entity_description.key + "_set_" + mode + "_temp_range")
-            r = r[0] if r else 0
-        if not r:
-            r = h.get(self.entity_description.key + "_set_temp_range", [5, 45])[0]
-        return r
+        return self._temp_range()[0]
+
+    def _temp_range(self) -> tuple[float, float]:
+        """Temperature range of the current mode."""
+        mode = self.value.get(self._schema.mode)
+        return self._schema.mode_temp_range.get(mode) or self._schema.temp_range
 
     async def async_set_humidity(self, humidity: int) -> None:
         """Set new target humidity."""
-        await self._send_command({self.entity_description.key + "_set_humidity": humidity})
+        await self._send_command({self._schema.set_humidity: humidity})
 
     async def async_set_fan_mode(self, fan_mode: str) -> None:
         """Set new target fan mode."""
-        await self._send_command({self.entity_description.key + "_wind_speed": fan_mode})
+        await self._send_command({self._schema.wind_speed: fan_mode})
 
     async def async_set_hvac_mode(self, hvac_mode: HVACMode) -> None:
         """Set new target operation mode."""
         if hvac_mode == HVACMode.OFF:
-            await self._send_command({self.entity_description.key + "_switch": "off"})
+            await self._send_command({self._schema.switch: "off"})
         else:
             await self._send_command({
-                self.entity_description.key + "_mode": self.convert_mode(hvac_mode),
-                self.entity_description.key + "_switch": "on",
+                self._schema.mode: self.convert_mode(hvac_mode),
+                self._schema.switch: "on",
             })
 
     async def async_set_preset_mode(self, preset_mode: str) -> None:
         """Set new preset mode."""
-        if self.entity_description.key == DPCode.FA:
-            await self._send_command({self.entity_description.key + "_work_mode": preset_mode})
-        else:
-            await self._send_command({self.entity_description.key + "_lock_mode": preset_mode})
+        await self._send_command({self._schema.preset_command: preset_mode})
 
     async def async_set_temperature(self, **kwargs: Any) -> None:
         """Set new target temperature."""
         target_temp = kwargs.get(ATTR_TEMPERATURE)
-        v = self.device.value
-        mode = v.get(self.entity_description.key + "_mode")
-        t = v.get(self.entity_description.key + "_set_temp")
-        if not mode:
-            await self._send_command({self.entity_description.key + "_set_temp": target_temp})
-            return
-        temp = v.get(self.entity_description.key + "_" + mode + "_set_temp")
+        v = self.value
+        mode = v.get(self._schema.mode)
+        key = self._schema.mode_set_temp.get(mode) if mode else None
         # 区分不同模式下面的温度调整指令
-        if not temp:
-            await self._send_command({self.entity_description.key + "_set_temp": target_temp})
-        else:
-            await self._send_command({self.entity_description.key + "_" + mode + "_set_temp": target_temp})
-
-    async def async_set_humidity(self, humidity: int) -> None:
-        """Set new target humidity."""
-        await self._send_command({self.entity_description.key + "_set_humidity": humidity})
+        if not key or not v.get(key):
+            key = self._schema.set_temp
+        await self._send_command({key: target_temp})
 
     def convert_mode(self, mode: Union[str, HVACMode]) -> HVACMode | str | None:
         """Convert between string and HVACMode."""
@@ -310,3 +299,53 @@ class DuwiClimateEntity(DuwiEntity, ClimateEntity):
     def default_mode(self) -> HVACMode | str | None:
         """Convert between string and HVACMode."""
         return self.DEFAULT_HVAC_MODE.get(self.entity_description.key)
+
+
+@lru_cache(maxsize=None)
+def climate_schema(device_sub_type_no: str, key: str) -> ClimateSchema:
+    """Build the schema of a climate entity once per (sub type, description key)."""
+    havc = HAVC_TYPE_MAP.get(device_sub_type_no, {})
+    raw_modes = list(havc.get(key + "_mode") or [])
+    if not raw_modes:
+        if key == DPCode.FA:
+            raw_modes.append("fan")
+        if key == DPCode.HP or key == DPCode.FH:
+            raw_modes.append("hot")
+    hvac_modes = [mode for raw_mode in raw_modes if (mode := DuwiClimateEntity.STR_TO_HVAC_MODE.get(raw_mode))]
+    hvac_modes.append(HVACMode.OFF)
+
+    # 设备上报的模式都可能出现,包括列表之外的常见模式
+    modes = set(raw_modes) | set(DuwiClimateEntity.HVAC_MODE_TO_STR.values())
+    mode_temp_range = {}
+    for mode in modes:
+        # 两种写法: hp_set_cold_temp_range / ac_heat_set_temp_range
+        r = havc.get(key + "_set_" + mode + "_temp_range") or havc.get(key + "_" + mode + "_set_temp_range")
+        if r:
+            mode_temp_range[mode] = (r[0], r[1])
+
+    preset_modes = havc.get(key + "_lock_mode") or havc.get(key + "_work_mode")
+    fan_modes = havc.get(key + "_wind_speed")
+    temp_range = havc.get(key + "_set_temp_range", [5, 45])
+    humidity_range = havc.get(key + "_set_humidity_range", [40, 75])
+    return ClimateSchema(
+        switch=key + "_switch",
+        mode=key + "_mode",
+        set_temp=key + "_set_temp",
+        real_temp=key + "_real_temp",
+        set_humidity=key + "_set_humidity",
+        real_humidity=key + "_real_humidity",
+        wind_speed=key + "_wind_speed",
+        lock_mode=key + "_lock_mode",
+        work_mode=key + "_work_mode",
+        preset_command=key + ("_work_mode" if key == DPCode.FA else "_lock_mode"),
+        temp_step=havc.get(key + "_temp_step"),
+        temp_range=(temp_range[0], temp_range[1]),
+        humidity_range=(humidity_range[0], humidity_range[1]),
+        supports_temperature=bool(havc.get(key + "_set_temp_range")),
+        supports_humidity=bool(havc.get(key + "_set_humidity_range")),
+        hvac_modes=hvac_modes,
+        preset_modes=list(preset_modes) if preset_modes else None,
+        fan_modes=list(fan_modes) if fan_modes else None,
+        mode_set_temp=MappingProxyType({mode: key + "_" + mode + "_set_temp" for mode in modes}),
+        mode_temp_range=MappingProxyType(mode_temp_range),
+    )
@@ -23,6 +23,11 @@ DUWI_SCENE_UPDATE = "duwi_scene_update"
 DUWI_HA_SIGNAL_UPDATE_ENTITY = "duwi_entry_update"
 DUWI_HA_ACCESS_TOKEN = "duwi_access_token"
 
+# 指令下发后等待设备确认的时间(秒), 超时未确认则回退到上报的状态
+DUWI_COMMAND_CONFIRM_TIMEOUT = 10
+# 设备不会回报的指令key, 不等待确认: 窗帘开/关/停, 音乐上一首/下一首
+DUWI_UNECHOED_COMMANDS = frozenset({"control", "songs_switch"})
+
 # API keys
 CLIENT = "client"
 ADDRESS = "address"
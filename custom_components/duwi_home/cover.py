@@ -156,18 +156,18 @@ class DuwiCoverEntity(DuwiEntity, CoverEntity):
         self.entity_description = description
         self._attr_unique_id = f"{super().unique_id}{description.key}"
         self._attr_supported_features = SUPPORTED_COVER_MODES.get(description.key)
-        tilt_position = self.device.value.get("angle_degree", 0) or self.device.value.get("light_angle", 0)
+        tilt_position = self.value.get("angle_degree", 0) or self.value.get("light_angle", 0)
         self._is_tilt_over_90 = tilt_position > 90
 
     @property
     def current_cover_position(self) -> int | None:
         """Return the current position of the roller."""
-        return self.device.value.get("control_percent", 0)
+        return self.value.get("control_percent", 0)
 
     @property
     def current_cover_tilt_position(self) -> int | None:
         """Return the current tilt position of the roller."""
-        tilt_position = self.device.value.get("angle_degree", 0) or self.device.value.get("light_angle", 0)
+        tilt_position = self.value.get("angle_degree", 0) or self.value.get("light_angle", 0)
         if tilt_position == 90:
             self._is_tilt_over_90 = not self._is_tilt_over_90
         if self._is_tilt_over_90 == 90:
@@ -5,5 +5,24 @@ DUWI_LAN_VERSION = "00"
 BEGIN_COMMAND = "FAAF"
 END_COMMAND = "FBBF"
 DEVICE_ID = "FFFFFFFFFFFF"
+# 局域网组播端口
+LAN_PORT = 54283
+# 等待主机应答的超时时间(秒)
+LAN_ACK_TIMEOUT = 2
+# 接收报文的最大长度(字节)和内核接收缓冲区大小(字节)
+LAN_MAX_DATAGRAM_SIZE = 65535
+LAN_RCVBUF_SIZE = 1024 * 1024
+# 在该时间(秒)内收到相同的报文视为重复, 最多记录的报文数量
+LAN_DEDUP_WINDOW = 2
+LAN_DEDUP_SIZE = 1024
+# 同一主机两个报文之间的最小间隔(秒), 发送队列长度
+LAN_HOST_SEND_INTERVAL = 0.02
+LAN_SEND_QUEUE_SIZE = 1000
+# 主机上线后同时同步状态的主机数量, 每个主机占用的时间(秒), 开始同步之间的间隔(秒)
+LAN_RESYNC_CONCURRENCY = 2
+LAN_RESYNC_HOLD = 3
+LAN_RESYNC_STAGGER = 0.5
+# 预置的主机ip在该时间(秒)内没有应答则改为组播发现
+LAN_SEED_TIMEOUT = 10
 
 _LOGGER = logging.getLogger(__package__)
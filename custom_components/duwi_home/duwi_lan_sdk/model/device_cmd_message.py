@@ -1,3 +1,23 @@
+from functools import lru_cache
+import itertools
+import json
+import os
+
+# 本次运行的随机前缀 + 递增序号,代替 36 位的 uuid
+_TRACE_PREFIX = os.urandom(3).hex()
+_TRACE_COUNTER = itertools.count(1)
+
+
+def next_trace_id() -> str:
+    return f"{_TRACE_PREFIX}{next(_TRACE_COUNTER):x}"
+
+
+@lru_cache(maxsize=64)
+def _static_fragment(version: str, message_type: str) -> str:
+    """每种报文类型只生成一次 version 和 type 部分"""
+    return ',"version":' + json.dumps(version) + ',"type":' + json.dumps(message_type) + ',"data":'
+
+
 class DeviceCmdMessage:
     def __init__(self, traceid, version, type, data):
         self.traceId = traceid
@@ -12,3 +32,8 @@ class DeviceCmdMessage:
             "type": self.type,
             "data": self.data,
         }
+
+    def to_json(self) -> str:
+        """紧凑的 json,字段顺序和 to_dict 一致"""
+        return ('{"traceId":' + json.dumps(self.traceId) + _static_fragment(self.version, self.type)
+                + json.dumps(self.data, separators=(",", ":")) + "}")
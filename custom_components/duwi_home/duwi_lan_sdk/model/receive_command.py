@@ -1,10 +1,16 @@
 class ReceiveCommand:
-    def __init__(self, sequence, data_json):
+    def __init__(self, sequence, data_json, message_id="", lan_type=""):
         self.sequence = sequence
         self.data_json = data_json
+        self.message_id = message_id
+        self.lan_type = lan_type
+        # 负载长度是否正确
+        self.status = True
 
     def to_dict(self):
         return {
             "sequence": self.sequence,
-            "data_json": self.data_json
+            "data_json": self.data_json,
+            "message_id": self.message_id,
+            "lan_type": self.lan_type,
         }
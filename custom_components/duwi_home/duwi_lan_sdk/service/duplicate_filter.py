@@ -0,0 +1,37 @@
+import time
+from collections import OrderedDict
+
+from ..const.const import LAN_DEDUP_SIZE, LAN_DEDUP_WINDOW
+
+
+class DuplicateFilter:
+    """
+    重复报文过滤
+
+    组播回环和主机重发会收到完全相同的报文,按 (设备序号, 报文序号, 负载) 在解密之前过滤,
+    只在接收线程中使用
+    """
+
+    def __init__(self, window: float = LAN_DEDUP_WINDOW, max_size: int = LAN_DEDUP_SIZE):
+        self.window = window
+        self.max_size = max_size
+        # 报文标识 -> 首次收到的时间
+        self._seen: OrderedDict[tuple[bytes, bytes, int], float] = OrderedDict()
+
+    def is_duplicate(self, data: bytes) -> bool:
+        """data 为原始报文, 报文序号 3:5 字节, 设备序号 5:11 字节, 之后为负载"""
+        now = time.monotonic()
+        # 清理过期的记录
+        while self._seen:
+            key, seen_at = next(iter(self._seen.items()))
+            if now - seen_at < self.window and len(self._seen) < self.max_size:
+                break
+            self._seen.popitem(last=False)
+        key = (data[5:11], data[3:5], hash(data[11:]))
+        if key in self._seen:
+            return True
+        self._seen[key] = now
+        return False
+
+    def clear(self):
+        self._seen.clear()
@@ -1,41 +1,80 @@
+import asyncio
 import json
 import socket
 import struct
 import threading
 import time
-import uuid
 
-from typing import List
+from typing import Callable, List
 
+from .duplicate_filter import DuplicateFilter
 from .lan_message_listener import LanMessageListener, LanMessage
-from ..const.const import DEVICE_ID, _LOGGER
+from .resync_scheduler import ResyncScheduler
+from .send_scheduler import PRIORITY_BACKGROUND, PRIORITY_CONTROL, PRIORITY_QUERY, PRIORITY_SCENE, SendScheduler
+from ..const.const import (
+    DEVICE_ID,
+    LAN_ACK_TIMEOUT,
+    LAN_MAX_DATAGRAM_SIZE,
+    LAN_PORT,
+    LAN_RCVBUF_SIZE,
+    LAN_SEED_TIMEOUT,
+    _LOGGER,
+)
+from ..const.lan_type import get_ack
 from ..const.message_type import message_type_cases, get_terminal_host
-from ..model.device_cmd_message import DeviceCmdMessage
-from ..util.command import get_receive_command, get_send_command, get_send_heart
+from ..model.device_cmd_message import DeviceCmdMessage, next_trace_id
+from ..util.command import get_message_id, get_receive_command, get_send_command, get_send_heart
 from ..util.convert import binary_to_hex
 
+_OWN_DEVICE_ID = bytes.fromhex(DEVICE_ID)
+
 
 class LanProcess:
 
-    def __init__(self):
+    def __init__(self, max_datagram_size: int = LAN_MAX_DATAGRAM_SIZE, rcvbuf_size: int = LAN_RCVBUF_SIZE):
         self.hosts = []
         self.hosts_status: dict[str, dict] = {}
         self.hosts_ip: dict[str, dict] = {}
         self.hosts_heart: dict[str, dict] = {}
         self.hosts_lan_secret_key: dict[str, str] = {}
         self.lock = threading.Lock()
-        self.lan_port = 54283
+        self.lan_port = LAN_PORT
         self.broadcast_ip = "239.0.0.188"
+        self.max_datagram_size = max_datagram_size
+        self.rcvbuf_size = rcvbuf_size
+        # 接收统计: 截断 / 重复 / 无法解密 / 未知主机
+        self.stats = {"received": 0, "truncated": 0, "duplicate": 0, "undecryptable": 0, "unknown_host": 0}
+        self._duplicate_filter = DuplicateFilter()
         self.__receive = True
         self.__hear_beat = True
-        self.subscribers = []
-
-    def sync_hosts(self, entry_id: str, hosts: List[str], lan_secret_key: str):
+        # entry_id -> 消息回调
+        self.subscribers: dict[str, Callable[[dict[str, any]], None]] = {}
+        # 主机 -> 所属集成, 收到报文时只处理和通知相关的集成
+        self.host_entries: dict[str, set[str]] = {}
+        # 预置但还没有确认的主机ip: 主机 -> 预置时间
+        self.hosts_ip_seeded: dict[str, float] = {}
+        # 主机最后一次收到报文的时间
+        self.hosts_last_seen: dict[str, float] = {}
+        # entry_id -> 主机地址变化回调(host_sequence, ip)
+        self.host_address_listeners: dict[str, Callable[[str, str], None]] = {}
+        # 共享的发送套接字
+        self._send_socket: socket.socket | None = None
+        self._send_lock = threading.Lock()
+        # 按优先级调度发送,用户控制不被心跳和发现报文阻塞
+        self._scheduler = SendScheduler(self._send_now)
+        # 主机上线后错开同步状态
+        self._resync = ResyncScheduler(self._send_terminal_data_up)
+        # 等待主机应答 (host_sequence, message_id) -> (loop, future)
+        self._ack_waiters: dict[tuple[str, str], tuple[asyncio.AbstractEventLoop, asyncio.Future]] = {}
+
+    def sync_hosts(self, entry_id: str, hosts: List[str], lan_secret_key: str,
+                   known_ips: dict[str, str] | None = None):
         """
         设置主机
 
         参数：
         hosts: List[str]: 主机序列号集合
+        known_ips: dict[str, str]: 上次学习到的主机ip,预置后直接单播探测
 
         返回：
         """
@@ -52,6 +91,7 @@ class LanProcess:
         with self.lock:
             # 添加 hosts 中有，但 hosts_status 中没有的主机
             if len(hosts) == 0:
+                self._unindex_entry(entry_id)
                 self.hosts_status[entry_id] = {}
             else:
                 # 比对
@@ -62,11 +102,18 @@ class LanProcess:
                 for host in wait_for_remove:
                     self.hosts_status[entry_id].pop(host)
                     self.hosts_ip[entry_id].pop(host)
+                    self._unindex_host(entry_id, host)
+                    if host not in self.host_entries:
+                        self._resync.cancel(host)
                 # 增加
                 for host in hosts:
+                    self.host_entries.setdefault(host, set()).add(entry_id)
                     if host not in self.hosts_status[entry_id]:
                         self.hosts_status[entry_id][host] = False  # 设置默认状态
                         self.hosts_ip[entry_id][host] = ""
+                        if known_ips and known_ips.get(host):
+                            self.hosts_ip[entry_id][host] = known_ips[host]
+                            self.hosts_ip_seeded[host] = time.monotonic()
                         self.hosts_heart[entry_id][host] = 0
                         self.hosts_lan_secret_key[host] = lan_secret_key
 
@@ -81,20 +128,46 @@ class LanProcess:
         heart_beat_thread = threading.Thread(target=self.heart_beat, args=(), daemon=True)
         heart_beat_thread.start()
 
+        # 开启发送线程
+        self._scheduler.start()
+
+        # 开启状态同步线程
+        self._resync.start()
+
     def stop(self):
         self.__receive = False
         self.__hear_beat = False
+        self._scheduler.stop()
+        self._resync.stop()
+        self._close_send_socket()
 
     def clear_hosts(self, entry_id: str):
         """
         清空指定集成的主机列表
         """
         with self.lock:
+            self._unindex_entry(entry_id)
             if entry_id in self.hosts_status:
                 self.hosts_status[entry_id] = {}
                 self.hosts_ip[entry_id] = {}
                 self.hosts_heart[entry_id] = {}
 
+    def _unindex_host(self, entry_id: str, host: str):
+        entries = self.host_entries.get(host)
+        if entries is None:
+            return
+        entries.discard(entry_id)
+        if not entries:
+            self.host_entries.pop(host)
+
+    def _unindex_entry(self, entry_id: str):
+        for host in list(self.hosts_status.get(entry_id, {})):
+            self._unindex_host(entry_id, host)
+
+    def get_host_entries(self, host_sequence: str) -> tuple[str, ...]:
+        """Entries that own the host."""
+        return tuple(self.host_entries.get(host_sequence, ()))
+
     def get_online_hosts(self, entry_id: str) -> List[str]:
 
         """
@@ -113,13 +186,44 @@ class LanProcess:
         返回:
         List[str]: 在线主机的序列号列表。
         """
-        for entry_id in self.hosts_status:
-            if host_sequence in self.hosts_status[entry_id]:
-                return self.hosts_status[entry_id].get(host_sequence, False)
+        for entry_id in self.get_host_entries(host_sequence):
+            return self.hosts_status.get(entry_id, {}).get(host_sequence, False)
+        return False
 
-    def _join_group(self):
+    def can_send(self, host_sequence) -> bool:
+        """
+        是否可以向主机下发指令
+        主机已同步且有密钥即可发送: 有ip时单播,否则组播,不需要等主机先应答
+        """
+        return bool(self.get_host_entries(host_sequence)) and bool(self.hosts_lan_secret_key.get(host_sequence))
+
+    def _create_receive_socket(self) -> socket.socket:
         # 创建UDP套接字
         udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # 允许多个监听者共用端口
+        udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            try:
+                udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            except OSError as ex:
+                _LOGGER.debug("SO_REUSEPORT not supported: %s", ex)
+        # 加大内核接收缓冲区,避免突发报文被丢弃
+        try:
+            udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.rcvbuf_size)
+        except OSError as ex:
+            _LOGGER.warning("set SO_RCVBUF failed: %s", ex)
+        return udp_socket
+
+    def _receive(self, udp_socket: socket.socket):
+        """接收一个报文,返回 (数据, 地址, 是否被截断)"""
+        if hasattr(udp_socket, "recvmsg"):
+            data, _, flags, addr = udp_socket.recvmsg(self.max_datagram_size)
+            return data, addr, bool(flags & socket.MSG_TRUNC)
+        data, addr = udp_socket.recvfrom(self.max_datagram_size)
+        return data, addr, len(data) >= self.max_datagram_size
+
+    def _join_group(self):
+        udp_socket = self._create_receive_socket()
 
         # 绑定套接字到组播地址和端口
         udp_socket.bind(("", self.lan_port))
@@ -130,13 +234,30 @@ class LanProcess:
         udp_socket.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
         # 接收组播数据包
         while self.__receive:
-            data, addr = udp_socket.recvfrom(1024)  # 接收最多1024字节的数据
+            data, addr, truncated = self._receive(udp_socket)
+            self.stats["received"] += 1
+            if truncated:
+                self.stats["truncated"] += 1
+                _LOGGER.warning("局域网报文被截断 from %s, max size %d", addr, self.max_datagram_size)
+                continue
+            # 自己发出的组播报文
+            if data[5:11] == _OWN_DEVICE_ID:
+                continue
+            # 重复报文在解密之前丢弃
+            if self._duplicate_filter.is_duplicate(data):
+                self.stats["duplicate"] += 1
+                continue
             binary_data = binary_to_hex(data)
             try:
                 message = get_receive_command(binary_data, self.hosts_lan_secret_key)
                 host_sequence = message.sequence
                 if host_sequence == DEVICE_ID:
                     continue
+                if not message.status:
+                    self.stats["undecryptable"] += 1
+                    continue
+                if message.lan_type == get_ack():
+                    self._resolve_ack(host_sequence, message.message_id)
 
                 # _LOGGER.info(
                 #     "接收到指令" + message.sequence + ":" + "%s == %s",
@@ -144,69 +265,126 @@ class LanProcess:
                 #     message.to_dict(),
                 # )
 
-                # 重置心跳计数器
-                for entry_id in self.hosts_heart:
-                    handle_hosts_heart = self.hosts_heart[entry_id]
+                # 只处理拥有该主机的集成
+                entry_ids = self.get_host_entries(host_sequence)
+                if not entry_ids:
+                    self.stats["unknown_host"] += 1
+                    continue
+                came_online = False
+                # 首次收到报文,预置的ip得到确认
+                self.hosts_ip_seeded.pop(host_sequence, None)
+                self.hosts_last_seen[host_sequence] = time.time()
+                for entry_id in entry_ids:
+                    # 重置心跳计数器
+                    handle_hosts_heart = self.hosts_heart.get(entry_id, {})
                     if host_sequence in handle_hosts_heart:
                         handle_hosts_heart[host_sequence] = 0
 
-                # 原主机的在线状态
-                # 循环所有实体的列表
-                for entry_id in self.hosts_status:
-                    handle_hosts_status = self.hosts_status[entry_id]
-                    handle_hosts_ip = self.hosts_ip[entry_id]
-
-                    if host_sequence in handle_hosts_status:
-                        old_host_online = handle_hosts_status.get(host_sequence, False)
-                        # 更新ip
-                        old_host_ip = handle_hosts_ip.get(host_sequence, "")
-                        new_ip = addr[0]
-                        if old_host_ip == "" or old_host_ip != new_ip:
-                            handle_hosts_ip[host_sequence] = addr[0]
-                        # 更新在线
-                        if not old_host_online:
-                            # 更新主机为在线
-                            handle_hosts_status[host_sequence] = True
-                            # 发布在线消息
-                            online_message = DeviceCmdMessage(
-                                str(uuid.uuid4()),
-                                "1.0",
-                                "terminal.host",
-                                {"sequence": host_sequence, "property": {"online": True}},
-                            )
-                            self._publish(online_message.to_dict())
-                            # 发送查询指令
-                            self._send_terminal_data_up(host_sequence)
-
-                    if not message.data_json == "":
-                        # 指令处理命令
-                        new_data_model = json.loads(message.data_json)
-                        self.resolve_message(new_data_model)
+                    # 原主机的在线状态
+                    handle_hosts_status = self.hosts_status.get(entry_id, {})
+                    handle_hosts_ip = self.hosts_ip.get(entry_id, {})
+                    if host_sequence not in handle_hosts_status:
+                        continue
+                    old_host_online = handle_hosts_status.get(host_sequence, False)
+                    # 更新ip
+                    old_host_ip = handle_hosts_ip.get(host_sequence, "")
+                    new_ip = addr[0]
+                    if old_host_ip == "" or old_host_ip != new_ip:
+                        handle_hosts_ip[host_sequence] = addr[0]
+                    if old_host_ip != new_ip or not old_host_online:
+                        self._notify_host_address(entry_id, host_sequence, new_ip)
+                    # 更新在线
+                    if not old_host_online:
+                        # 更新主机为在线
+                        handle_hosts_status[host_sequence] = True
+                        came_online = True
+                        # 发布在线消息
+                        online_message = DeviceCmdMessage(
+                            next_trace_id(),
+                            "1.0",
+                            "terminal.host",
+                            {"sequence": host_sequence, "property": {"online": True}},
+                        )
+                        self._publish(online_message.to_dict(), (entry_id,))
+                if came_online:
+                    # 发送查询指令
+                    self._request_resync(host_sequence)
+
+                if not message.data_json == "":
+                    # 指令处理命令
+                    new_data_model = json.loads(message.data_json)
+                    self.resolve_message(new_data_model, entry_ids)
 
             except ValueError as ex:
-                _LOGGER.error("Invalid input. Please enter a number.", ex)
+                # 解密或者解码失败
+                self.stats["undecryptable"] += 1
+                _LOGGER.error("Invalid lan message from %s: %s", addr, ex)
 
-    def resolve_message(self, new_data_model):
-        self._publish(new_data_model)
+    def resolve_message(self, new_data_model, entry_ids: tuple[str, ...]):
+        self._publish(new_data_model, entry_ids)
 
-    def add_message_listener(self, callback):
-        self.subscribers.append(callback)
+    def add_host_address_listener(self, entry_id: str, callback: Callable[[str, str], None]):
+        """主机上线或者ip变化时回调,在接收线程中执行"""
+        self.host_address_listeners[entry_id] = callback
 
-    def remove_message_listener(self, callback):
-        self.subscribers.remove(callback)
+    def remove_host_address_listener(self, entry_id: str):
+        self.host_address_listeners.pop(entry_id, None)
 
-    def _publish(self, lan_message: dict[str, any]):
-        for callback in self.subscribers:
-            callback(lan_message)
+    def _notify_host_address(self, entry_id: str, host_sequence: str, ip: str):
+        if callback := self.host_address_listeners.get(entry_id):
+            try:
+                callback(host_sequence, ip)
+            except Exception as ex:
+                _LOGGER.error("host address listener error: %s", ex)
+
+    def _expire_seeded_ips(self):
+        now = time.monotonic()
+        for host_sequence, seeded_at in list(self.hosts_ip_seeded.items()):
+            if now - seeded_at >= LAN_SEED_TIMEOUT:
+                self._drop_seeded_ip(host_sequence)
+
+    def _drop_seeded_ip(self, host_sequence: str) -> bool:
+        """
+        预置的ip没有应答,可能已经变化,清除后改为组播
+        返回是否清除了还没有确认的预置ip
+        """
+        if self.hosts_ip_seeded.pop(host_sequence, None) is None:
+            return False
+        for entry_id in self.get_host_entries(host_sequence):
+            if not self.hosts_status.get(entry_id, {}).get(host_sequence):
+                self.hosts_ip.get(entry_id, {})[host_sequence] = ""
+        return True
+
+    def add_message_listener(self, callback, entry_id: str):
+        """每个集成一个回调,重载时替换原先的回调"""
+        self.subscribers[entry_id] = callback
+
+    def remove_message_listener(self, entry_id: str):
+        self.subscribers.pop(entry_id, None)
+
+    def _publish(self, lan_message: dict[str, any], entry_ids: tuple[str, ...]):
+        for entry_id in entry_ids:
+            if callback := self.subscribers.get(entry_id):
+                callback(lan_message)
+
+    def _request_resync(self, host_sequence: str):
+        """
+        主机上线后同步状态
+        离线期间的变化无法确认,每次上线都请求全量上报,由调度器限制并发并错开时间
+        """
+        if self._resync.running:
+            self._resync.request(host_sequence)
+        else:
+            self._send_terminal_data_up(host_sequence)
 
     def _send_terminal_data_up(self, host_sequence: str):
         send_message = DeviceCmdMessage(
-            str(uuid.uuid4()),
+            next_trace_id(),
             "1.0",
             "sys.op",
             {"terminal_data_up": {"sequence": host_sequence}},
         )
-        json_data = json.dumps(send_message.to_dict())
+        json_data = send_message.to_json()
         lan_secret_key = self.hosts_lan_secret_key.get(host_sequence, "")
         if lan_secret_key == "":
             return
@@ -216,16 +394,16 @@ class LanProcess:
         command = {"host_sequence": host_sequence, "operate_command": operate_command}
         # 发送
         if not operate_command == b"":
-            self._send(command["host_sequence"], command["operate_command"])
+            self._send(command["host_sequence"], command["operate_command"], PRIORITY_QUERY)
 
     def _send_query_info(self, host_sequence: str):
         send_message = DeviceCmdMessage(
-            str(uuid.uuid4()),
+            next_trace_id(),
             "1.0",
             "terminal.host",
             {"sequence": host_sequence, "service": {"query_info": {"params": ["use_storage_percent"]}}},
         )
-        json_data = json.dumps(send_message.to_dict())
+        json_data = send_message.to_json()
         lan_secret_key = self.hosts_lan_secret_key.get(host_sequence, "")
         if lan_secret_key == "":
             return
@@ -235,7 +413,10 @@ class LanProcess:
         command = {"host_sequence": host_sequence, "operate_command": operate_command}
         # 发送
         if not operate_command == b"":
-            self._send(command["host_sequence"], command["operate_command"])
+            self._send(command["host_sequence"], command["operate_command"], PRIORITY_BACKGROUND)
+            if host_sequence in self.hosts_ip_seeded:
+                # 预置的ip确认之前同时组播,ip变化时不影响发现
+                self._send(host_sequence, operate_command, PRIORITY_BACKGROUND, self.broadcast_ip)
 
     def _broadcast_to_offline_hosts(self):
         for entry_id in self.hosts_status:
@@ -247,43 +428,158 @@ class LanProcess:
                     self._send_query_info(host)
 
     def activate_scene(self, host_sequence, scene_no):
+        message_id = get_message_id()
+        operate_command = self._get_scene_command(host_sequence, scene_no, message_id)
+        # 发送
+        # _LOGGER.debug("------发送局域网的指令%s  %s", host_sequence, message.to_dict())
+        if operate_command:
+            self._send(host_sequence, operate_command, PRIORITY_SCENE)
+
+    async def activate_scene_hosts(self, host_sequences: List[str], scene_no: str,
+                                   timeout: float = LAN_ACK_TIMEOUT) -> dict[str, bool]:
+        """
+        同时向多个主机下发场景,等待各主机应答
+
+        返回:
+        dict[str, bool]: 主机序列号 -> 是否在超时前应答
+        """
+        # 先完成所有报文的编码和加密,再集中发送
+        commands = {}
+        for host_sequence in host_sequences:
+            message_id = get_message_id()
+            operate_command = self._get_scene_command(host_sequence, scene_no, message_id)
+            if operate_command:
+                commands[host_sequence] = (message_id, operate_command)
+        return await self._send_and_wait_ack(host_sequences, commands, PRIORITY_SCENE, timeout)
+
+    async def _send_and_wait_ack(self, host_sequences: List[str], commands: dict[str, tuple[str, bytes]],
+                                 priority: int, timeout: float) -> dict[str, bool]:
+        """
+        集中发送已编码的报文 (message_id, 报文),等待各主机应答
+        预置ip的主机在首次应答前就可以单播下发,没有应答时清除预置ip,组播重发一次
+        """
+        results = await self._send_and_wait(host_sequences, commands, priority, timeout)
+        retry = {host_sequence: command for host_sequence, command in commands.items()
+                 if not results[host_sequence] and self._drop_seeded_ip(host_sequence)}
+        if retry:
+            _LOGGER.info("预置ip没有应答,组播重发 host_sequences: %s", list(retry))
+            results.update(await self._send_and_wait(list(retry), retry, priority, timeout))
+        return results
+
+    async def _send_and_wait(self, host_sequences: List[str], commands: dict[str, tuple[str, bytes]],
+                             priority: int, timeout: float) -> dict[str, bool]:
+        loop = asyncio.get_running_loop()
+        results = {host_sequence: False for host_sequence in host_sequences}
+        futures = {}
+        for host_sequence, (message_id, operate_command) in commands.items():
+            future = self._wait_ack(loop, host_sequence, message_id)
+            if self._send(host_sequence, operate_command, priority) is None:
+                futures[host_sequence] = future
+            else:
+                self._ack_waiters.pop((host_sequence, message_id), None)
+        try:
+            if futures:
+                await asyncio.wait(futures.values(), timeout=timeout)
+        finally:
+            for host_sequence, (message_id, _) in commands.items():
+                self._ack_waiters.pop((host_sequence, message_id), None)
+        for host_sequence, future in futures.items():
+            results[host_sequence] = future.done() and not future.cancelled()
+            if not future.done():
+                future.cancel()
+        return results
+
+    def _get_scene_command(self, host_sequence, scene_no, message_id):
         data_json = {"sequence": host_sequence, "service": {
             "scene_execute": {
                 "scene_no": scene_no,
             }
         }}
-        message = DeviceCmdMessage(str(uuid.uuid4()), "1.0", get_terminal_host(), data_json)
+        message = DeviceCmdMessage(next_trace_id(), "1.0", get_terminal_host(), data_json)
         lan_secret_key = self.hosts_lan_secret_key.get(host_sequence, "")
         if lan_secret_key == "":
-            return
-        operate_command = get_send_command(
+            return b""
+        return get_send_command(
             lan_secret_key,
-            json.dumps(message.to_dict()),
+            message.to_json(),
             "CON",
             DEVICE_ID,
+            message_id,
         )
-        # 发送
-        # _LOGGER.debug("------发送局域网的指令%s  %s", host_sequence, message.to_dict())
-        if not operate_command == b"":
-            self._send(host_sequence, operate_command)
+
+    def _wait_ack(self, loop, host_sequence, message_id) -> asyncio.Future:
+        future = loop.create_future()
+        self._ack_waiters[(host_sequence, message_id.upper())] = (loop, future)
+        return future
+
+    def _resolve_ack(self, host_sequence, message_id):
+        waiter = self._ack_waiters.pop((host_sequence, message_id), None)
+        if waiter is None:
+            return
+        loop, future = waiter
+
+        def set_result():
+            if not future.done():
+                future.set_result(True)
+
+        loop.call_soon_threadsafe(set_result)
 
     def device_operate(self, host_sequence: str, device_type_no: str, device_no: str,
                        terminal_sequence: str, route_num: int, is_group: bool, is_virtual_device: bool, commands):
+        operate = self._get_operate_data(device_type_no, device_no, terminal_sequence, route_num, is_group,
+                                         is_virtual_device, commands)
+        if operate is None:
+            return
+        operate_command = self._get_operate_command(host_sequence, *operate, is_group)
+        # 发送
+        # _LOGGER.debug("------发送局域网的指令%s  %s", host_sequence, message)
+        if operate_command:
+            self._send(host_sequence, operate_command, PRIORITY_CONTROL)
+
+    async def device_operate_hosts(self, host_sequences: List[str], device_type_no: str, device_no: str,
+                                   terminal_sequence: str, route_num: int, is_group: bool, is_virtual_device: bool,
+                                   commands, timeout: float = LAN_ACK_TIMEOUT) -> dict[str, bool]:
+        """
+        向设备所属的多个主机下发指令,等待各主机应答
+        报文内容只生成一次,每个主机只替换主机序列号后加密
+
+        返回:
+        dict[str, bool]: 主机序列号 -> 是否在超时前应答
+        """
+        operate = self._get_operate_data(device_type_no, device_no, terminal_sequence, route_num, is_group,
+                                         is_virtual_device, commands)
+        if operate is None:
+            return {host_sequence: False for host_sequence in host_sequences}
+        commands_by_host = {}
+        for host_sequence in host_sequences:
+            message_id = get_message_id()
+            operate_command = self._get_operate_command(host_sequence, *operate, is_group, message_id)
+            if operate_command:
+                commands_by_host[host_sequence] = (message_id, operate_command)
+        return await self._send_and_wait_ack(host_sequences, commands_by_host, PRIORITY_CONTROL, timeout)
+
+    @staticmethod
+    def _get_operate_data(device_type_no: str, device_no: str, terminal_sequence: str, route_num: int,
+                          is_group: bool, is_virtual_device: bool, commands) -> tuple[str, dict] | None:
+        """
+        生成指令的报文类型和内容,组的内容不含主机序列号
+        """
         parts = device_type_no.split('-')
         if len(parts) == 0:
-            return
+            return None
         device_class_no = parts[0]
         sequence = terminal_sequence
         route = route_num
 
         if is_group:
-            data_json = {"sequence": host_sequence}
             message_type = get_terminal_host()
-            data_json["service"] = {
-                "device_group_cmd_down": {
-                    "group_no": device_no,
-                    "property": commands,
-                    "service": {},
+            data_json = {
+                "service": {
+                    "device_group_cmd_down": {
+                        "group_no": device_no,
+                        "property": commands,
+                        "service": {},
+                    }
                 }
             }
         else:
@@ -291,33 +587,35 @@ class LanProcess:
             message_type = message_type_cases.get(device_class_no, lambda: "")()
             if message_type == "":
                 _LOGGER.error("message_type is empty ,device_no is %s", device_no)
-                return
+                return None
 
             if route != 0:
                 data_json["route"] = route
             else:
                 if is_virtual_device:
-                    data_json.sequence = device_no
+                    data_json["sequence"] = device_no
                     data_json["route"] = 1
                 else:
-                    return
+                    return None
 
             data_json["property"] = commands
+        return message_type, data_json
 
-        message = DeviceCmdMessage(str(uuid.uuid4()), "1.0", message_type, data_json)
+    def _get_operate_command(self, host_sequence: str, message_type: str, data_json: dict, is_group: bool,
+                             message_id=None) -> bytes:
         lan_secret_key = self.hosts_lan_secret_key.get(host_sequence, "")
         if lan_secret_key == "":
-            return
-        operate_command = get_send_command(
+            return b""
+        if is_group:
+            data_json = {"sequence": host_sequence, **data_json}
+        message = DeviceCmdMessage(next_trace_id(), "1.0", message_type, data_json)
+        return get_send_command(
             lan_secret_key,
-            json.dumps(message.to_dict()),
+            message.to_json(),
             "CON",
             DEVICE_ID,
+            message_id,
         )
-        # 发送
-        # _LOGGER.debug("------发送局域网的指令%s  %s", host_sequence, message)
-        if not operate_command == b"":
-            self._send(host_sequence, operate_command)
 
     def cancel(self):
         self.__receive = False
@@ -326,6 +624,7 @@ class LanProcess:
     def heart_beat(self):
         """心跳包"""
         while self.__hear_beat:
+            self._expire_seeded_ips()
             for entry_id in self.hosts_status:
                 handle_hosts_status = self.hosts_status[entry_id]
                 offline_hosts = [host for host, status in handle_hosts_status.items() if status is not True]
@@ -337,7 +636,7 @@ class LanProcess:
                     operate_command = get_send_heart("CON", DEVICE_ID)
                     if not operate_command == b"":
                         # 发送
-                        self._send(host_sequence, operate_command)
+                        self._send(host_sequence, operate_command, PRIORITY_BACKGROUND)
 
                 # 在线主机
                 for host_sequence in online_hosts:
@@ -356,18 +655,18 @@ class LanProcess:
                                 handle_hosts_ip[host_sequence] = ""
                             # 发送离线消息
                             online_message = DeviceCmdMessage(
-                                str(uuid.uuid4()),
+                                next_trace_id(),
                                 "1.0",
                                 "terminal.host",
                                 {"sequence": host_sequence, "property": {"online": False}}
                             )
-                            self._publish(online_message.to_dict())
+                            self._publish(online_message.to_dict(), (entry_id,))
                         else:
                             # 发送心跳包
                             operate_command = get_send_heart("CON", DEVICE_ID)
                             if not operate_command == b"":
                                 # 发送
-                                self._send(host_sequence, operate_command)
+                                self._send(host_sequence, operate_command, PRIORITY_BACKGROUND)
                                 handle_hosts_heart[host_sequence] += 1
 
             # 发送发现主机广播包
@@ -375,18 +674,34 @@ class LanProcess:
 
             time.sleep(30)
 
-    def _send(self, host_sequence, message):
+    def _send(self, host_sequence, message, priority=PRIORITY_QUERY, address=None):
         """
-        发送消息
+        按优先级排队发送消息
         :param host_sequence: 主机序列号
         :param message: 消息
+        :param priority: 优先级
+        :param address: 指定发送地址,默认按主机ip
+        :return: 入队成功返回None
+        """
+        if not self._scheduler.running:
+            return self._send_now(host_sequence, message, address)
+        if not self._scheduler.submit(host_sequence, message, priority, address):
+            _LOGGER.warning("局域网发送队列已满,丢弃报文 host_sequence: %s", host_sequence)
+            return 19996, "发送队列已满！"
+
+    def _send_now(self, host_sequence, message, address=None):
+        """
+        立即发送消息
+        :param host_sequence: 主机序列号
+        :param message: 消息
+        :param address: 指定发送地址
         :return:
         """
-        broadcast_address = ""
-        for entry_id in self.hosts_ip:
-            if host_sequence in self.hosts_ip[entry_id]:
-                handle_hosts_ip = self.hosts_ip[entry_id]
-                broadcast_address = handle_hosts_ip.get(host_sequence, "")
+        broadcast_address = address or ""
+        if broadcast_address == "":
+            for entry_id in self.get_host_entries(host_sequence):
+                if ip := self.hosts_ip.get(entry_id, {}).get(host_sequence, ""):
+                    broadcast_address = ip
 
         if broadcast_address == "":
             if not self.check_is_online(host_sequence):
@@ -398,10 +713,23 @@ class LanProcess:
             return 19997, "找不到主机！"
 
         try:
-            # 创建UDP套接字
-            udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-            udp_socket.sendto(message, (broadcast_address, self.lan_port))
-        finally:
-            if udp_socket:
-                udp_socket.close()
+            self._get_send_socket().sendto(message, (broadcast_address, self.lan_port))
+        except OSError as ex:
+            _LOGGER.error("发送局域网的指令失败 host_sequence: %s, %s", host_sequence, ex)
+            self._close_send_socket()
+            return 19998, "发送失败！"
+
+    def _get_send_socket(self) -> socket.socket:
+        with self._send_lock:
+            if self._send_socket is None:
+                # 创建UDP套接字,所有发送共用
+                udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+                self._send_socket = udp_socket
+            return self._send_socket
+
+    def _close_send_socket(self):
+        with self._send_lock:
+            if self._send_socket is not None:
+                self._send_socket.close()
+                self._send_socket = None
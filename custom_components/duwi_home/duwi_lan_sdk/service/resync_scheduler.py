@@ -0,0 +1,93 @@
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from ..const.const import LAN_RESYNC_CONCURRENCY, LAN_RESYNC_HOLD, LAN_RESYNC_STAGGER, _LOGGER
+
+
+class ResyncScheduler:
+    """
+    主机上线后的状态同步调度
+
+    同时进行同步的主机数量受限,每次开始同步之间错开一段随机时间,
+    避免大量主机同时上线时全量上报挤满局域网
+    """
+
+    def __init__(self, resync: Callable[[str], None], concurrency: int = LAN_RESYNC_CONCURRENCY,
+                 hold: float = LAN_RESYNC_HOLD, stagger: float = LAN_RESYNC_STAGGER):
+        self._resync = resync
+        self.concurrency = concurrency
+        self.hold = hold
+        self.stagger = stagger
+        # 等待同步的主机
+        self._pending: OrderedDict[str, None] = OrderedDict()
+        # 正在同步的主机 -> 占用结束时间
+        self._active: dict[str, float] = {}
+        self._next_start = 0.0
+        self._cond = threading.Condition()
+        self.running = False
+        self.stats = {"requested": 0, "sent": 0}
+
+    def start(self):
+        with self._cond:
+            if self.running:
+                return
+            self.running = True
+        threading.Thread(target=self._run, args=(), daemon=True).start()
+
+    def stop(self):
+        with self._cond:
+            self.running = False
+            self._pending.clear()
+            self._active.clear()
+            self._cond.notify_all()
+
+    def request(self, host_sequence: str):
+        """请求同步主机状态,已在等待的主机不重复请求,同步中的主机在占用结束后再同步一次"""
+        with self._cond:
+            if host_sequence in self._pending:
+                return
+            self._pending[host_sequence] = None
+            self.stats["requested"] += 1
+            self._cond.notify()
+
+    def cancel(self, host_sequence: str):
+        with self._cond:
+            self._pending.pop(host_sequence, None)
+
+    def _next_host(self, now: float):
+        """取出下一个可以开始同步的主机,没有时返回需要等待的时间"""
+        for host_sequence, until in list(self._active.items()):
+            if until <= now:
+                self._active.pop(host_sequence)
+        if not self._pending:
+            return None, None
+        waits = [self._next_start - now]
+        if len(self._active) >= self.concurrency:
+            waits.append(min(self._active.values()) - now)
+        wait = max(waits)
+        if wait > 0:
+            return None, wait
+        host_sequence, _ = self._pending.popitem(last=False)
+        self._active[host_sequence] = now + self.hold
+        self._next_start = now + random.uniform(0.5, 1.5) * self.stagger
+        return host_sequence, None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                host_sequence = None
+                while self.running:
+                    host_sequence, wait = self._next_host(time.monotonic())
+                    if host_sequence is not None:
+                        break
+                    self._cond.wait(wait)
+                if host_sequence is None:
+                    return
+            try:
+                self._resync(host_sequence)
+                self.stats["sent"] += 1
+            except Exception as ex:
+                _LOGGER.error("同步主机状态失败 host_sequence: %s, %s", host_sequence, ex)
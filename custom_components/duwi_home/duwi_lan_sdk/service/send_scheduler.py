@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable
+
+from ..const.const import LAN_HOST_SEND_INTERVAL, LAN_SEND_QUEUE_SIZE, _LOGGER
+
+# 发送优先级,数字越小越优先
+PRIORITY_CONTROL = 0
+PRIORITY_SCENE = 1
+PRIORITY_QUERY = 2
+PRIORITY_BACKGROUND = 3
+PRIORITIES = (PRIORITY_CONTROL, PRIORITY_SCENE, PRIORITY_QUERY, PRIORITY_BACKGROUND)
+
+
+class SendScheduler:
+    """
+    局域网发送调度
+
+    高优先级的报文先发送,同一主机的报文之间保持最小间隔,
+    同一优先级下各主机轮流发送
+    """
+
+    def __init__(self, send: Callable[[str, bytes, str | None], None],
+                 host_interval: float = LAN_HOST_SEND_INTERVAL, max_queue: int = LAN_SEND_QUEUE_SIZE):
+        self._send = send
+        self.host_interval = host_interval
+        self.max_queue = max_queue
+        # 每个优先级: 主机 -> 待发送报文 (报文, 指定地址)
+        self._queues: list[OrderedDict[str, deque[tuple[bytes, str | None]]]] = [OrderedDict() for _ in PRIORITIES]
+        self._next_send: dict[str, float] = {}
+        self._size = 0
+        self._cond = threading.Condition()
+        self.running = False
+        self.stats = {"sent": 0, "dropped": 0}
+
+    def start(self):
+        with self._cond:
+            if self.running:
+                return
+            self.running = True
+        threading.Thread(target=self._run, args=(), daemon=True).start()
+
+    def stop(self):
+        with self._cond:
+            self.running = False
+            for queues in self._queues:
+                queues.clear()
+            self._size = 0
+            self._cond.notify_all()
+
+    def submit(self, host_sequence: str, message: bytes, priority: int, address: str | None = None) -> bool:
+        """报文入队,队列满时丢弃优先级最低的报文"""
+        with self._cond:
+            if self._size >= self.max_queue and not self._drop_lower(priority):
+                self.stats["dropped"] += 1
+                return False
+            self._queues[priority].setdefault(host_sequence, deque()).append((message, address))
+            self._size += 1
+            self._cond.notify()
+        return True
+
+    def qsize(self) -> int:
+        return self._size
+
+    def _drop_lower(self, priority: int) -> bool:
+        for lower in reversed(PRIORITIES):
+            if lower <= priority:
+                return False
+            queues = self._queues[lower]
+            if not queues:
+                continue
+            host_sequence, items = next(iter(queues.items()))
+            items.popleft()
+            if not items:
+                queues.pop(host_sequence)
+            self._size -= 1
+            self.stats["dropped"] += 1
+            return True
+        return False
+
+    def _next_item(self, now: float):
+        """取出下一个可以发送的报文,没有时返回需要等待的时间"""
+        wait = None
+        for queues in self._queues:
+            for host_sequence, items in queues.items():
+                ready_at = self._next_send.get(host_sequence, 0)
+                if ready_at > now:
+                    wait = ready_at - now if wait is None else min(wait, ready_at - now)
+                    continue
+                message, address = items.popleft()
+                if items:
+                    # 轮到下一个主机
+                    queues.move_to_end(host_sequence)
+                else:
+                    queues.pop(host_sequence)
+                self._size -= 1
+                self._next_send[host_sequence] = now + self.host_interval
+                return (host_sequence, message, address), None
+        return None, wait
+
+    def _run(self):
+        while True:
+            with self._cond:
+                item = None
+                while self.running:
+                    item, wait = self._next_item(time.monotonic())
+                    if item is not None:
+                        break
+                    self._cond.wait(wait)
+                if item is None:
+                    return
+            host_sequence, message, address = item
+            try:
+                self._send(host_sequence, message, address)
+                self.stats["sent"] += 1
+            except Exception as ex:
+                _LOGGER.error("局域网发送失败 host_sequence: %s, %s", host_sequence, ex)
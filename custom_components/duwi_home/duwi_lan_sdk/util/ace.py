@@ -1,5 +1,6 @@
 # coding=utf-8
 import binascii
+from functools import lru_cache
 import hashlib
 from binascii import hexlify
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
@@ -31,12 +32,20 @@ def hex_to_binary(hex_string):
     return binary_data
 
 
+@lru_cache(maxsize=32)
+def get_cipher_params(key):
+    """每个密钥只计算一次 AES 密钥和向量"""
+    key_data = hex_to_binary(key)
+    iv = calculate_md5(key_data)  # 生成向量
+    return key_data, hex_to_binary(iv)
+
+
 def encrypt_AES(key, data):
     backend = default_backend()
 
-    iv = calculate_md5(hex_to_binary(key))  # 生成向量
+    key_data, iv = get_cipher_params(key)
 
-    cipher = Cipher(algorithms.AES(hex_to_binary(key)), modes.CBC(hex_to_binary(iv)), backend=backend)
+    cipher = Cipher(algorithms.AES(key_data), modes.CBC(iv), backend=backend)
     encryptor = cipher.encryptor()
 
     padder = padding.PKCS7(128).padder()
@@ -54,10 +63,10 @@ def encrypt_AES(key, data):
 
 def decrypt_AES(key, data):
     backend = default_backend()
-    iv = calculate_md5(hex_to_binary(key))
+    key_data, iv = get_cipher_params(key)
     ct = data
 
-    cipher = Cipher(algorithms.AES(hex_to_binary(key)), modes.CBC(hex_to_binary(iv)), backend=backend)
+    cipher = Cipher(algorithms.AES(key_data), modes.CBC(iv), backend=backend)
     decryptor = cipher.decryptor()
 
     padded_data = decryptor.update(ct) + decryptor.finalize()
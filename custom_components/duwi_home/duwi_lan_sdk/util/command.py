@@ -14,18 +14,23 @@ from ..util.convert import (
 from ..model.receive_command import ReceiveCommand
 
 
+def get_message_id():
+    """生成报文序号 Message ID"""
+    return (
+        decimal_to_hex(get_random(15))
+        + decimal_to_hex(get_random(15))
+        + decimal_to_hex(get_random(15))
+        + decimal_to_hex(get_random(15))
+    )
+
+
 def get_send_heart(lan_type, device_id):
     ver = DUWI_LAN_VERSION
     t = cases.get(lan_type, lambda: "9999")()
     if t == "9999":
         return 19998, "指令处理错误"
 
-    message_id = (
-        decimal_to_hex(get_random(15))
-        + decimal_to_hex(get_random(15))
-        + decimal_to_hex(get_random(15))
-        + decimal_to_hex(get_random(15))
-    )
+    message_id = get_message_id()
 
     vart = get_hex_by_binary(ver + t)
 
@@ -37,7 +42,7 @@ def get_send_heart(lan_type, device_id):
     return operate_command
 
 
-def get_send_command(lan_secretkey, terminal_data_up, lan_type, device_id):
+def get_send_command(lan_secretkey, terminal_data_up, lan_type, device_id, message_id=None):
     ver = DUWI_LAN_VERSION
     t = cases.get(lan_type, lambda: "9999")()
     if t == "9999":
@@ -53,12 +58,8 @@ def get_send_command(lan_secretkey, terminal_data_up, lan_type, device_id):
     if pay_load_len_hex.__len__() % 2 != 0:
         pay_load_len_hex = "0" + pay_load_len_hex
 
-    message_id = (
-        decimal_to_hex(get_random(15))
-        + decimal_to_hex(get_random(15))
-        + decimal_to_hex(get_random(15))
-        + decimal_to_hex(get_random(15))
-    )
+    if message_id is None:
+        message_id = get_message_id()
 
     vart = get_hex_by_binary(ver + t)
 
@@ -118,6 +119,8 @@ def get_receive_command(commandstr, hosts_lan_secret_key):
     device_id_str = middle_str[6:18]
 
     model.sequence = device_id_str
+    model.message_id = message_id_str
+    model.lan_type = t_str
 
     if device_id_str == DEVICE_ID:
         return model
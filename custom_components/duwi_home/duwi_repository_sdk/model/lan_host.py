@@ -0,0 +1,13 @@
+from sqlalchemy import Column, String, Integer
+
+from .base import Base
+
+
+class LanHost(Base):
+    __tablename__ = "lan_host"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    host_sequence = Column(String(50), unique=True)
+    ip = Column(String(50))
+    # 最后一次在局域网收到报文的时间戳(秒)
+    last_seen = Column(Integer)
@@ -0,0 +1,82 @@
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+import threading
+from typing import Any, Callable
+
+from ...duwi_repository_sdk.model.device_value import DeviceValue
+from ...duwi_repository_sdk.repo.device_value_repo import DeviceValueRepository
+from ..const.const import _LOGGER
+
+
+class DbWriter:
+    """Single thread that performs every write to the SQLite database.
+
+    Reported device values are buffered per (device, code) and written in one
+    batch whenever the thread gets to them, so a burst of reports costs one
+    transaction. Other writes, including rebuilding the database file, are
+    queued on the same thread and never interleave with each other.
+    """
+
+    def __init__(self, value_repository: DeviceValueRepository):
+        self._value_repository = value_repository
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="duwi_db")
+        self._lock = threading.Lock()
+        # (device_no, code) -> 待写入的最新值
+        self._values: dict[tuple[str, str], DeviceValue] = {}
+        self._flush_queued = False
+        self._closed = False
+        self.stats = {"values": 0, "batches": 0, "errors": 0}
+
+    def save_values(self, device_values: list[DeviceValue]):
+        """Buffer device values; safe to call from any thread, never blocks."""
+        with self._lock:
+            if self._closed:
+                return
+            for device_value in device_values:
+                self._values[(device_value.device_no, device_value.code)] = device_value
+            if self._flush_queued:
+                return
+            self._flush_queued = True
+        self._executor.submit(self._flush_values)
+
+    def submit(self, func: Callable[..., Any], *args: Any) -> Future:
+        """Queue a write; safe to call from any thread. Errors are logged."""
+        return self._executor.submit(self._call, func, *args)
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Queue a write and wait for its result on the event loop.
+
+        After close the queued writes are drained first, then func runs in a
+        worker thread.
+        """
+        if self._closed:
+            await asyncio.to_thread(self._executor.shutdown)
+            return await asyncio.to_thread(func, *args)
+        return await asyncio.wrap_future(self._executor.submit(func, *args))
+
+    def close(self):
+        """Write what is still buffered and stop the thread once the queue is empty.
+
+        Values saved after closing are ignored.
+        """
+        with self._lock:
+            self._closed = True
+        self._executor.shutdown(wait=False)
+
+    def _flush_values(self):
+        with self._lock:
+            values, self._values = list(self._values.values()), {}
+            self._flush_queued = False
+        if not values:
+            return
+        self.stats["values"] += len(values)
+        self.stats["batches"] += 1
+        self._call(self._value_repository.update_device_values, values)
+
+    def _call(self, func: Callable[..., Any], *args: Any):
+        try:
+            return func(*args)
+        except Exception as e:
+            self.stats["errors"] += 1
+            _LOGGER.error("db write %s failed: %s", getattr(func, "__name__", func), e)
+            return None
@@ -0,0 +1,40 @@
+from ...duwi_repository_sdk.model.lan_host import LanHost
+from ...duwi_repository_sdk.repo.base_repo import Repository
+
+
+class LanHostRepository:
+    def __init__(self, base_repo: Repository):
+        self.base_repo = base_repo
+
+    def list_hosts(self) -> list[LanHost]:
+        if self.base_repo.Session is None:
+            return []
+        return self.base_repo.list_entities(LanHost)
+
+    def list_host_ips(self) -> dict[str, str]:
+        """主机序列号 -> 最后一次学习到的ip"""
+        return {h.host_sequence: h.ip for h in self.list_hosts() if h.ip}
+
+    def save_host(self, host_sequence: str, ip: str, last_seen: int):
+        session = self.base_repo.get_session()
+        if session is None:
+            return
+        try:
+            host = session.query(LanHost).filter_by(host_sequence=host_sequence).first()
+            if host:
+                host.ip = ip
+                host.last_seen = last_seen
+            else:
+                session.add(LanHost(host_sequence=host_sequence, ip=ip, last_seen=last_seen))
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+
+    def restore_hosts(self, hosts: list[LanHost]):
+        """重建数据库后写回主机地址"""
+        self.base_repo.add_entities([
+            LanHost(host_sequence=h.host_sequence, ip=h.ip, last_seen=h.last_seen) for h in hosts
+        ])
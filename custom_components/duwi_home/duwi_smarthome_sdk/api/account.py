@@ -1,7 +1,7 @@
 from typing import Any
 
 from ..base.customer_api import CustomerApi
-from ..const.const import _LOGGER, API_MAX_RETRY, Code
+from ..const.const import _LOGGER, API_LOGIN_TIMEOUT, Code
 
 
 class AccountClient:
@@ -9,24 +9,13 @@ class AccountClient:
         self._client = client
 
     async def login(self, phone: str, password: str) -> dict[str, Any] | None:
-        for attempt in range(API_MAX_RETRY):
-            try:
-                body = {
-                    "phone": phone,
-                    "password": password,
-                }
-                data = await self._client.post("/account/login", None, body)
-                if data is not None and data.get("code") != Code.OPERATION_SUCCESS.value:
-                    _LOGGER.warning("AccountClient: control failed, code: %s", data.get("code"))
-                    return data
-                if data is not None and data.get("code") != Code.ACCOUNT_LOGIN_ERROR.value:
-                    return data
-            except Exception as e:
-                if attempt < API_MAX_RETRY - 1:
-                    _LOGGER.warning("AccountClient: control failed (attempt %d), error: %s", attempt+1, str(e))
-                else:
-                    _LOGGER.warning("AccountClient: control failed after %d attempts", API_MAX_RETRY)
-                if attempt == API_MAX_RETRY - 1:
-                    return None
-        return None
-
+        body = {
+            "phone": phone,
+            "password": password,
+        }
+        # 登录失败直接返回给用户,不在后台重试
+        data = await self._client.post("/account/login", None, body, auth=False, retry=False,
+                                       timeout=API_LOGIN_TIMEOUT)
+        if data.get("code") != Code.OPERATION_SUCCESS.value:
+            _LOGGER.warning("AccountClient: login failed, code: %s", data.get("code"))
+        return data
@@ -1,8 +1,7 @@
 from typing import Any
 
-from ..api.refresh_token import AuthTokenRefresherClient
 from ..base.customer_api import CustomerApi
-from ..const.const import _LOGGER, API_MAX_RETRY, Code
+from ..const.const import _LOGGER, Code
 from ..model.device_control import ControlDevice
 
 
@@ -11,40 +10,12 @@ class ControlClient:
     def __init__(self, client: CustomerApi):
         self._client = client
 
-    async def control(self, is_group: bool, body: ControlDevice | None) -> dict[str, Any] | None:
-
-        for attempt in range(API_MAX_RETRY):
-            try:
-                if is_group:
-                    data = await self._client.post("/deviceGroup/batchCommandOperate", None, body.to_dict())
-                else:
-                    data = await self._client.post("/device/batchCommandOperate", None, body.to_dict())
-                if data is not None:
-                    if data.get("code") == Code.OPERATION_SUCCESS.value:
-                        return data
-                    if data.get("code") == Code.OPERATION_ACCESSTOKEN_ERROR.value:
-                        authClient = AuthTokenRefresherClient(self._client)
-                        refreshData = await authClient.refresh()
-                        if refreshData is not None and refreshData.get("code") == Code.OPERATION_SUCCESS.value:
-                            # 更新 customer_api 实体
-                            await self._client.update_token(refreshData.get("data",{}).get("accessToken"),refreshData.get("data",{}).get("refreshToken"),refreshData.get("data",{}).get("accessTokenExpireTime"))
-
-                            # 同步通知更新token
-                            self._client.token_listener.update_token( is_refresh=True,
-                            token_info={
-                                "access_token": refreshData.get("data",{}).get("accessToken"),
-                                "refresh_token": refreshData.get("data",{}).get("refreshToken")
-                            })
-                        else:
-                            return  None
-                    else:
-                        _LOGGER.warning("ControlClient: control failed, code: %s", data.get("code"))
-            except Exception as e:
-                if attempt < API_MAX_RETRY - 1:
-                    _LOGGER.warning("ControlClient: control failed (attempt %d), error: %s", attempt+1, str(e))
-                else:
-                    _LOGGER.warning("ControlClient: control failed after %d attempts", API_MAX_RETRY)
-                if attempt == API_MAX_RETRY - 1:
-                    return None
-
-        return None
+    async def control(self, is_group: bool, body: ControlDevice | None) -> dict[str, Any]:
+        if is_group:
+            data = await self._client.post("/deviceGroup/batchCommandOperate", None, body.to_dict())
+        else:
+            data = await self._client.post("/device/batchCommandOperate", None, body.to_dict())
+        if data.get("code") != Code.OPERATION_SUCCESS.value:
+            # 失败也返回错误码,调用方据此决定是否切换到局域网
+            _LOGGER.warning("ControlClient: control failed, code: %s", data.get("code"))
+        return data
@@ -1,32 +1,63 @@
 import asyncio
 import json
+import random
 import time
 import traceback
-from typing import Callable
+from typing import Any, Awaitable, Callable
 
 import websockets
 
 from ..base.customer_api import CustomerApi
-from ..const.const import _LOGGER, Code
+from ..base.message_queue import WsMessageQueue
+from ..const.const import (
+    _LOGGER,
+    WS_CLOSE_TIMEOUT,
+    WS_CONSUMERS,
+    WS_DEAD_TIMEOUT,
+    WS_KEEPALIVE_INTERVAL,
+    WS_QUEUE_POLICY,
+    WS_QUEUE_SIZE,
+    WS_RECONNECT_BASE_DELAY,
+    WS_RECONNECT_MAX_DELAY,
+    Code,
+)
 from ..api.refresh_token import AuthTokenRefresherClient
 from ..util.sign import md5_encrypt, sha256_base64
 
 
 class DeviceSynchronizationWS:
-    def __init__(self, client: CustomerApi):
+    def __init__(self, client: CustomerApi, queue_size: int = WS_QUEUE_SIZE, policy: str = WS_QUEUE_POLICY,
+                 consumers: int = WS_CONSUMERS):
         self.is_connected = False
         self._client = client
         self._is_over = False
         self._connection = None
         self.message_listeners = set()
+        # 读取和处理分离,处理慢不影响读取和ping
+        self.queue = WsMessageQueue(queue_size, policy)
+        self._consumer_count = consumers
+        self._consumers: list[asyncio.Task] = []
+        self._reconnect_lock = asyncio.Lock()
+        # 连接活跃度: 最后收到消息的时间, 心跳往返时间
+        self._last_received = 0.0
+        self._keepalive_sent_at: float | None = None
+        self.rtt: float | None = None
+        # 断线时间窗口 (断开时间, 恢复时间), 重连后通知监听者补齐状态
+        self._disconnected_at: float | None = None
+        self.last_disconnect_window: tuple[float, float] | None = None
+        self.reconnect_listeners = set()
+        self._listener_tasks: set[asyncio.Task] = set()
 
     async def connect(self):
         _LOGGER.info('connect ws server...')
         self._connection = await websockets.connect(
             self._client.ws_address,
-            ping_interval=20,  # Disable automatic pings
-            ping_timeout=120,  # Disable automatic ping timeout
+            ping_interval=None,  # 关闭库自带的ping,由应用层KEEPALIVE检测连接
+            ping_timeout=None,
+            close_timeout=WS_CLOSE_TIMEOUT,
         )
+        self._last_received = time.monotonic()
+        self._keepalive_sent_at = None
 
     async def send(self, message):
         if self._connection:
@@ -38,14 +69,31 @@ class DeviceSynchronizationWS:
             self._is_over = True
             self.is_connected = False
             await self._connection.close()
+        for task in self._consumers:
+            task.cancel()
+        self._consumers = []
+        self.queue.clear()
 
     async def reconnect(self):
         if self._is_over:
             return
+        if self._reconnect_lock.locked():
+            # 已经在重连,等待其结果
+            async with self._reconnect_lock:
+                return
+        async with self._reconnect_lock:
+            await self._reconnect()
+
+    async def _reconnect(self):
+        if self.is_connected and self._disconnected_at is None:
+            self._disconnected_at = time.time()
         self.is_connected = False
+        await self._close_connection()
         _LOGGER.info('Reconnecting WS server...')
-        backoff_time = 1  # 设定初始等待时间
-        max_backoff_time = 60  # 最大等待时间
+        backoff_time = WS_RECONNECT_BASE_DELAY
+        if self._disconnected_at is not None:
+            # 断线重连先随机等待,避免大量客户端同时重连
+            await asyncio.sleep(random.uniform(0, WS_RECONNECT_BASE_DELAY))
         while not self._is_over:
             try:
                 await self.connect()
@@ -53,22 +101,54 @@ class DeviceSynchronizationWS:
                 await self.bind()
                 self.is_connected = True
                 _LOGGER.info('Reconnected successfully.')
+                self._on_reconnected()
                 break  # 成功后退出循环
             except Exception as e:
-                _LOGGER.error(f'Failed to reconnect: {e}, will retry in {backoff_time}s...')
+                # decorrelated jitter
+                backoff_time = min(WS_RECONNECT_MAX_DELAY, random.uniform(WS_RECONNECT_BASE_DELAY, backoff_time * 3))
+                _LOGGER.error(f'Failed to reconnect: {e}, will retry in {backoff_time:.1f}s...')
                 await asyncio.sleep(backoff_time)
-                backoff_time = min(backoff_time * 2, max_backoff_time)  # 指数退避
+
+    def _on_reconnected(self):
+        if self._disconnected_at is None:
+            return
+        window = self.last_disconnect_window = (self._disconnected_at, time.time())
+        self._disconnected_at = None
+        _LOGGER.info('ws was disconnected for %.1fs', window[1] - window[0])
+        loop = asyncio.get_running_loop()
+        for listener in list(self.reconnect_listeners):
+            task = loop.create_task(listener(*window))
+            self._listener_tasks.add(task)
+            task.add_done_callback(self._listener_tasks.discard)
+
+    async def _close_connection(self):
+        if self._connection is None:
+            return
+        try:
+            await self._connection.close()
+        except Exception as e:
+            _LOGGER.debug('close ws connection error: %s', e)
 
     async def listen(self):
+        if not self._consumers:
+            loop = asyncio.get_running_loop()
+            self._consumers = [loop.create_task(self.consume()) for _ in range(self._consumer_count)]
         while not self._is_over:
+            connection = self._connection
+            if connection is None or not self.is_connected:
+                # 等待首次连接或者正在进行的重连
+                await asyncio.sleep(1)
+                continue
             try:
                 await self.process_messages()
             except websockets.exceptions.ConnectionClosed:
                 _LOGGER.info('listen ws connection closed...')
-                await asyncio.sleep(10)
             except Exception as e:
+                _LOGGER.error(f'An error occurred during listen: {e}')
                 await asyncio.sleep(10)
-                # _LOGGER.error(f'An error occurred during listen: {e}')
+            # 读取结束说明连接已断开,没有被替换时直接重连
+            if not self._is_over and self._connection is connection:
+                await self.reconnect()
 
     async def link(self):
         _LOGGER.info('link...')
@@ -98,12 +178,21 @@ class DeviceSynchronizationWS:
         )
 
     async def keep_alive(self):
+        """Send KEEPALIVE, measure its round trip and reconnect a dead connection."""
         while not self._is_over:
             try:
-                _LOGGER.info("keep alive...")
-                await asyncio.sleep(20)
+                await asyncio.sleep(WS_KEEPALIVE_INTERVAL)
+                if self._is_over or not self.is_connected:
+                    continue
+                silence = time.monotonic() - self._last_received
+                if silence > WS_DEAD_TIMEOUT:
+                    _LOGGER.warning('ws no message for %.0fs, trying to reconnect...', silence)
+                    await self.reconnect()
+                    continue
+                _LOGGER.debug("keep alive... rtt %s", self.rtt)
+                self._keepalive_sent_at = time.monotonic()
                 await self.send('KEEPALIVE')
-            except websockets.exceptions.ConnectionClosedError:
+            except websockets.exceptions.ConnectionClosed:
                 _LOGGER.info('keep_alive ws,connection closed, trying to reconnect...')
                 await self.reconnect()
             except Exception as e:
@@ -111,31 +200,57 @@ class DeviceSynchronizationWS:
 
     async def process_messages(self):
         async for message in self._connection:
+            self._last_received = time.monotonic()
             try:
                 if message == "KEEPALIVE":
+                    if self._keepalive_sent_at is not None:
+                        self.rtt = self._last_received - self._keepalive_sent_at
+                        self._keepalive_sent_at = None
                     continue
                 message = str.replace(message, "&excision&", "")
                 try:
                     message_data = json.loads(message)
                 except json.JSONDecodeError:
                     _LOGGER.error("Failed to parse JSON message: %s", message)
-                    return
+                    continue
                 namespace = message_data.get("namespace")
                 if namespace == "Duwi.RPS.Link":
                     if message_data.get("result", {}).get("code") != "success":
                         _LOGGER.error(f"error message detail: \n{message}")
                         self._is_over = True
                         return
-                for listener in self.message_listeners:
-                    listener(message)
+                    continue
+                self.queue.put(message_data)
+
+            except Exception as e:
+                _LOGGER.error(f"error message detail: \n{traceback.format_exc()}")
 
+    async def consume(self):
+        """Hand queued messages to the listeners."""
+        while not self._is_over:
+            message_data = await self.queue.get()
+            try:
+                for listener in list(self.message_listeners):
+                    listener(message_data)
             except Exception as e:
                 _LOGGER.error(f"error message detail: \n{traceback.format_exc()}")
+            finally:
+                self.queue.task_done()
+            # 让出事件循环
+            await asyncio.sleep(0)
 
-    async def add_message_listener(self, listener: Callable[[str], None]):
+    async def add_message_listener(self, listener: Callable[[dict[str, Any]], None]):
         """Add ws message listener."""
         self.message_listeners.add(listener)
 
-    async def remove_message_listener(self, listener: Callable[[str], None]):
+    async def remove_message_listener(self, listener: Callable[[dict[str, Any]], None]):
         """Remove ws message listener."""
         self.message_listeners.discard(listener)
+
+    def add_reconnect_listener(self, listener: Callable[[float, float], Awaitable[None]]):
+        """Add a listener called with the disconnect window after a reconnect."""
+        self.reconnect_listeners.add(listener)
+
+    def remove_reconnect_listener(self, listener: Callable[[float, float], Awaitable[None]]):
+        """Remove reconnect listener."""
+        self.reconnect_listeners.discard(listener)
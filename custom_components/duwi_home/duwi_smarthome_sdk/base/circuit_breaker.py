@@ -0,0 +1,94 @@
+from collections import deque
+import time
+from typing import Callable
+
+from ..const.const import _LOGGER, CIRCUIT_BREAKER
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Circuit breaker over a rolling window of call outcomes and latency.
+
+    Opens when the share of failed or slow calls in the window passes the
+    threshold, then lets a single probe through after the open time.
+    """
+
+    def __init__(self, window: float, min_calls: int, error_rate: float, slow_call: float, open_time: float):
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call = slow_call
+        self.open_time = open_time
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        # (结束时间, 是否失败)
+        self._calls: deque[tuple[float, bool]] = deque()
+        self._listeners: list[Callable[[str], None]] = []
+
+    @classmethod
+    def default(cls) -> "CircuitBreaker":
+        return cls(**CIRCUIT_BREAKER)
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_time:
+            self._set_state(HALF_OPEN)
+        return self._state
+
+    def add_listener(self, callback: Callable[[str], None]):
+        """Call callback with the new state on every transition."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[str], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def allow(self) -> bool:
+        """Whether a call may go through now; half-open allows one probe."""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record(self, failed: bool, latency: float):
+        now = time.monotonic()
+        failed = failed or latency >= self.slow_call
+        if self._state == HALF_OPEN:
+            self._probing = False
+            if failed:
+                self._open(now)
+            else:
+                self._calls.clear()
+                self._set_state(CLOSED)
+            return
+        self._calls.append((now, failed))
+        while self._calls and now - self._calls[0][0] > self.window:
+            self._calls.popleft()
+        if self._state != CLOSED or len(self._calls) < self.min_calls:
+            return
+        failures = sum(1 for _, f in self._calls if f)
+        if failures / len(self._calls) >= self.error_rate:
+            self._open(now)
+
+    def _open(self, now: float):
+        self._opened_at = now
+        self._calls.clear()
+        self._set_state(OPEN)
+
+    def _set_state(self, state: str):
+        if state == self._state:
+            return
+        _LOGGER.warning("cloud circuit %s -> %s", self._state, state)
+        self._state = state
+        for callback in list(self._listeners):
+            try:
+                callback(state)
+            except Exception as e:
+                _LOGGER.error("circuit listener error: %s", e)
@@ -1,14 +1,51 @@
 from abc import ABCMeta, abstractmethod
 import asyncio
+from datetime import datetime
+from functools import lru_cache
 import json
 import time
 from typing import Any
+from urllib.parse import quote, urlencode
 
 import aiohttp
 from aiohttp import ClientTimeout
 
-from ..const.const import _LOGGER, Code
+from ..const.const import _LOGGER, TOKEN_REFRESH_AHEAD, Code
 from ..util.sign import md5_encrypt
+from .circuit_breaker import CircuitBreaker
+from .middleware import (
+    ApiRequest,
+    AuthRefreshMiddleware,
+    CircuitBreakerMiddleware,
+    Middleware,
+    RateLimitMiddleware,
+    RetryMiddleware,
+    TimingMiddleware,
+    build_pipeline,
+)
+
+
+@lru_cache(maxsize=128)
+def canonical_query(items: tuple[tuple[str, Any], ...]) -> tuple[str, str]:
+    """Return the string to sign and the encoded query for sorted params."""
+    sign_string = "&".join(f"{k}={v}" for k, v in items)  # 拼接成字符串
+    sign_string = sign_string.replace(" ", "").replace("\t", "").replace("\n", "").replace("\r", "")
+    return sign_string, urlencode(items, quote_via=quote)
+
+
+def serialize_request(request: ApiRequest) -> None:
+    """Serialize the request once; the signed bytes are the ones sent."""
+    if request.params:
+        # 按字母顺序排序, 固定参数的查询串直接复用缓存
+        sign_string, request.query = canonical_query(tuple(sorted(request.params.items())))
+    else:
+        sign_string = ""
+    if request.method != "GET":
+        body_string = json.dumps(request.body if request.body is not None else {}, separators=(',', ':'))
+        sign_string = body_string
+        if request.body is not None:
+            request.payload = body_string.encode("utf-8")
+    request.sign_string = sign_string
 
 
 class SharingTokenListener(metaclass=ABCMeta):
@@ -55,21 +92,28 @@ class CustomerApi:
         self.token_listener = listener
         self.timeout = ClientTimeout(total=15)
         self.access_token_expire_time = None
+        # 过期时间只在token更新时解析一次
+        self.access_token_expire_ts: float | None = None
+        self.token_refresh_at: float | None = None
         self.phone = phone
         self.password = pasword
-    def __generate_headers(self, method: str, body: dict[str, Any] | str) -> dict[str, str]:
-        if body is None:
-            body = {}
-
-        if method == "GET":
-            sorted_params = sorted(body.items())  # 按字母顺序排序
-            body_string = "&".join(f"{k}={v}" for k, v in sorted_params)  # 拼接成字符串
-            body_string = body_string.replace(" ", "").replace("\t", "").replace("\n", "").replace("\r", "")
-        else:
-            body_string = json.dumps(body, separators=(',', ':'))
-
+        # 正在进行的token刷新,并发的刷新请求共用它
+        self._refresh_task: asyncio.Task | None = None
+        # 请求管道: 计时 -> 熔断 -> 重试 -> 限流 -> token刷新 -> 发送
+        self.timing = TimingMiddleware()
+        self.circuit_breaker = CircuitBreaker.default()
+        self.middlewares: list[Middleware] = [
+            self.timing,
+            CircuitBreakerMiddleware(self.circuit_breaker),
+            RetryMiddleware(),
+            RateLimitMiddleware(),
+            AuthRefreshMiddleware(self),
+        ]
+        self._pipeline = build_pipeline(self.middlewares, self.__request)
+
+    def __generate_headers(self, sign_string: str) -> dict[str, str]:
         timestamp = int(time.time() * 1000)
-        sign = md5_encrypt(body_string + self.app_secret + str(timestamp))
+        sign = md5_encrypt(sign_string + self.app_secret + str(timestamp))
         headers = {
             'Content-Type': 'application/json',
             'accessToken': self.access_token,
@@ -82,18 +126,19 @@ class CustomerApi:
         }
         return headers
 
-    async def __request(
-            self,
-            method: str,
-            path: str,
-            params: dict[str, Any] | None = None,
-            body: dict[str, Any] = None,
-    ) -> dict[str, Any] | None:
-        headers = self.__generate_headers(method, params if method == "GET" else body)
-        session = aiohttp.ClientSession(timeout=self.timeout)
+    async def __request(self, request: ApiRequest) -> dict[str, Any] | None:
+        if request.sign_string is None:
+            serialize_request(request)
+        # 时间戳和token每次发送都要重新签名
+        headers = self.__generate_headers(request.sign_string)
+        url = self.address + request.path
+        if request.query:
+            url = f"{url}?{request.query}"
+        timeout = self.timeout if request.timeout is None else ClientTimeout(total=request.timeout)
+        session = aiohttp.ClientSession(timeout=timeout)
         try:
-            async with session.request(method=method, url=self.address + path, headers=headers, params=params,
-                                       json=body) as response:
+            async with session.request(method=request.method, url=url, headers=headers,
+                                       data=request.payload) as response:
                 response_data = await response.json()
                 if isinstance(response_data, dict):
                     return response_data
@@ -106,28 +151,81 @@ class CustomerApi:
             _LOGGER.error("Request timeout: %s", e)
             return {"code": Code.OPERATION_TIMEOUT.value}
         except asyncio.exceptions.CancelledError:
+            # 调用方主动取消时继续抛出,避免被当作超时重试
+            if asyncio.current_task().cancelling():
+                raise
             _LOGGER.error("Request canceled")
             return {"code": Code.OPERATION_TIMEOUT.value}
         finally:
             await session.close()
 
-    async def get(self, path: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
-        return await self.__request("GET", path, params, None)
+    async def get(self, path: str, params: dict[str, Any] | None = None, auth: bool = True) -> dict[str, Any]:
+        return await self._pipeline(ApiRequest("GET", path, params, None, auth))
 
-    async def post(self, path: str, params: dict[str, Any] | None = None, body: dict[str, Any] | None = None) -> dict[
-        str, Any]:
-        return await self.__request("POST", path, params, body)
+    async def post(self, path: str, params: dict[str, Any] | None = None, body: dict[str, Any] | None = None,
+                   auth: bool = True, retry: bool = True, timeout: float | None = None) -> dict[str, Any]:
+        return await self._pipeline(ApiRequest("POST", path, params, body, auth, retry, timeout))
 
-    async def put(self, path: str, body: dict[str, Any] | None = None) -> dict[str, Any]:
-        return await self.__request("PUT", path, None, body)
+    async def put(self, path: str, body: dict[str, Any] | None = None, auth: bool = True) -> dict[str, Any]:
+        return await self._pipeline(ApiRequest("PUT", path, None, body, auth))
 
-    async def delete(self, path: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
-        return await self.__request("DELETE", path, params, None)
+    async def delete(self, path: str, params: dict[str, Any] | None = None, auth: bool = True) -> dict[str, Any]:
+        return await self._pipeline(ApiRequest("DELETE", path, params, None, auth))
 
     async def update_token(self,accessToken:str,refreshToken:str,accessTokenExpireTime:str) ->None:
         self.access_token = accessToken
         self.refresh_token = refreshToken
         self.access_token_expire_time = accessTokenExpireTime
+        self.access_token_expire_ts = None
+        self.token_refresh_at = None
+        if accessTokenExpireTime:
+            try:
+                self.access_token_expire_ts = datetime.fromisoformat(accessTokenExpireTime).timestamp()
+            except (TypeError, ValueError):
+                _LOGGER.warning("Invalid access token expire time: %s", accessTokenExpireTime)
+        if self.access_token_expire_ts is not None:
+            lifetime = self.access_token_expire_ts - time.time()
+            self.token_refresh_at = self.access_token_expire_ts - min(TOKEN_REFRESH_AHEAD, max(lifetime, 0) / 2)
+
+    @property
+    def token_valid(self) -> bool:
+        """Whether the access token is present and not expired."""
+        if not self.access_token:
+            return False
+        return self.access_token_expire_ts is None or time.time() < self.access_token_expire_ts
+
+    async def refresh_access_token(self, stale_token: str | None = None) -> bool:
+        """Refresh the access token once for all concurrent callers.
+
+        stale_token is the token the failed request was sent with; if it has
+        already been replaced the caller can simply replay its request.
+        """
+        if stale_token is not None and stale_token != self.access_token:
+            return True
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.get_running_loop().create_task(self.__refresh_access_token())
+        return await asyncio.shield(self._refresh_task)
+
+    async def __refresh_access_token(self) -> bool:
+        # refresh_token 依赖 CustomerApi,这里延迟导入避免循环引用
+        from ..api.refresh_token import AuthTokenRefresherClient
+
+        refresh_data = await AuthTokenRefresherClient(self).refresh()
+        if refresh_data is None or refresh_data.get("code") != Code.OPERATION_SUCCESS.value:
+            return False
+        auth_data = refresh_data.get("data", {})
+        # 更新 customer_api 实体
+        await self.update_token(auth_data.get("accessToken"), auth_data.get("refreshToken"),
+                                auth_data.get("accessTokenExpireTime"))
+        # 同步通知更新token
+        if self.token_listener is not None:
+            self.token_listener.update_token(
+                is_refresh=True,
+                token_info={
+                    "access_token": auth_data.get("accessToken"),
+                    "refresh_token": auth_data.get("refreshToken")
+                })
+        return True
 
 
 
@@ -1,7 +1,7 @@
 from abc import ABCMeta
 import asyncio
-from datetime import datetime
-import json
+from dataclasses import dataclass
+import itertools
 import subprocess
 import time
 from typing import Any
@@ -17,15 +17,16 @@ from ...duwi_repository_sdk.model.room import Room
 from ...duwi_repository_sdk.model.sence import Scene
 from ...duwi_repository_sdk.model.terminal import Terminal
 from ...duwi_repository_sdk.repo.base_repo import Repository
+from ...duwi_repository_sdk.repo.db_writer import DbWriter
 from ...duwi_repository_sdk.repo.device_repo import DeviceRepository
 from ...duwi_repository_sdk.repo.device_value_repo import DeviceValueRepository
+from ...duwi_repository_sdk.repo.lan_host_repo import LanHostRepository
 from ..api.account import AccountClient
 from ..api.control import ControlClient
 from ..api.discover import DiscoverClient
 from ..api.floor import FloorInfoClient
 from ..api.group import GroupClient
 from ..api.house import HouseInfoClient
-from ..api.refresh_token import AuthTokenRefresherClient
 from ..api.room import RoomInfoClient
 from ..api.scene_op import SceneOpClient
 from ..api.scenes import SceneInfoClient
@@ -33,20 +34,58 @@ from ..api.terminal import TerminalClient
 from ..api.ws import DeviceSynchronizationWS
 from ..base.customer_api import CustomerApi, SharingTokenListener
 from ..base.customer_device import CustomerDevice
-from ..const.const import _LOGGER, DEVICE_TYPE_MAP, GROUP_TYPE, HAVC_TYPE_MAP, Code
+from ..const.const import (
+    _LOGGER,
+    CLOUD_CONTROL_FAILOVER_TIMEOUT,
+    COMMAND_BATCH_WINDOW,
+    DEVICE_TYPE_MAP,
+    GROUP_TYPE,
+    HAVC_TYPE_MAP,
+    RESYNC_RETRY_INTERVAL,
+    TOKEN_CHECK_INTERVAL,
+    TOKEN_RETRY_INTERVAL,
+    Code,
+)
 from ..model.device_control import ControlDevice
+from .circuit_breaker import OPEN
 from .customer_scene import CustomerScene
+from .metadata_cache import FLOOR, ROOM, SCENE, TERMINAL, MetadataCache
+from .middleware import THROTTLE_CODES, TRANSIENT_CODES
+
+
+# 状态上报来源
+REPORT_CLOUD = "cloud"
+REPORT_LAN = "lan"
+
+# ws状态上报中标识设备的key, 不是设备属性
+REPORT_ID_KEYS = ("deviceNo", "deviceGroupNo")
+
+# 云端控制返回这些错误码时切换到局域网: 临时错误 / 限流 / 熔断
+CLOUD_FAILOVER_CODES = TRANSIENT_CODES | THROTTLE_CODES | {Code.CIRCUIT_OPEN.value}
+
+
+@dataclass
+class ReportedValue:
+    """Last value applied for a device key, where it came from and its version.
+
+    The version is the order in which the report reached the event loop.
+    """
+
+    value: Any
+    source: str
+    version: int
 
 
 class SharingDeviceListener(metaclass=ABCMeta):
     """Sharing device listener."""
 
     @classmethod
-    def update_device(cls, device: CustomerDevice):
+    def update_device(cls, device: CustomerDevice, status: dict[str, Any] | None = None):
         """Update device info.
 
         Args:
             device(CustomerDevice): updated device info
+            status(dict): the reported keys and values, None when the whole device changed
 
         """
 
@@ -94,7 +133,8 @@ class Manager:
             house_key: str,
             customer_api: CustomerApi = None,
             token_listener: SharingTokenListener = None,
-            lp: LanProcess = None
+            lp: LanProcess = None,
+            metadata_cache: MetadataCache = None
     ) -> None:
         self._is_over = False
         self._is_init = True
@@ -109,6 +149,9 @@ class Manager:
         self.db_repository = Repository(self._id)
         self.device_repository = DeviceRepository(self.db_repository)
         self.device_value_repository = DeviceValueRepository(self.db_repository)
+        self.lan_host_repository = LanHostRepository(self.db_repository)
+        # 数据库写入都在单独的线程中执行,不阻塞事件循环
+        self.db_writer = DbWriter(self.device_value_repository)
         # 初始化account_api
         self._account_repository = AccountClient(self._customer_api)
         # 初始化ws
@@ -131,16 +174,41 @@ class Manager:
         self._scene_repository = SceneInfoClient(client=self._customer_api)
         # 控制场景
         self.scene_op_repository = SceneOpClient(client=self._customer_api)
-        # 初始化refresh_token_update
-        self._refresh_token_repository = AuthTokenRefresherClient(client=self._customer_api)
+        # 楼层/房间/主机/场景的缓存,重载时复用
+        self.metadata_cache = metadata_cache or MetadataCache()
         self._token_listener = token_listener
         self._device_listeners = set()
         # 局域网相关初始化
         self._lan_process = lp
+        # 持久化学习到的主机ip,重启后预置
+        self._lan_process.add_host_address_listener(self._id, self._on_lan_host_address)
         # 局域网指令解析相关类型
         self._valid_terminal_types = {"terminal.host", "terminal.slave"}
         self._valid_device_types = {"device.power", "device.light", "device.curtain", "device.hvac",
                                     "device.security_sensor", "device.video"}
+        # 待合并下发的指令
+        self._pending_commands: dict[str, dict[str, Any]] = {}
+        self._batch_handle: asyncio.TimerHandle | None = None
+        self._batch_tasks: set[asyncio.Task] = set()
+        # 唤醒后台token刷新
+        self._token_wakeup = asyncio.Event()
+        # 每个设备每个属性最后一次上报的值和版本(到达事件循环的顺序)
+        self._reported: dict[str, dict[str, ReportedValue]] = {}
+        self._report_version = itertools.count(1)
+        self.report_stats = {"duplicate": 0, "stale": 0}
+        # 局域网报文在接收线程中回调,转到事件循环中和云端上报统一排序
+        try:
+            self._loop: asyncio.AbstractEventLoop | None = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+        # 云端熔断时启用局域网主机
+        self._customer_api.circuit_breaker.add_listener(self._on_cloud_circuit_change)
+        # ws断线重连后补齐状态, 切换到云端模式时已经全量同步
+        self._cloud_syncing = False
+        self.ws.add_reconnect_listener(self._on_ws_reconnected)
+        # 补齐状态失败后的重试
+        self._resync_retry: asyncio.TimerHandle | None = None
+        self._resync_task: asyncio.Task | None = None
 
     async def init_manager(self, phone: str, password: str) -> bool:
         # 获取access_token
@@ -153,9 +221,11 @@ class Manager:
             _LOGGER.error("login error: %s", status)
             return False
 
-        self._customer_api.access_token = data.get("data", {}).get("accessToken")
-        self._customer_api.refresh_token = data.get("data", {}).get("refreshToken")
-        self._customer_api.access_token_expire_time = data.get("data", {}).get("accessTokenExpireTime")
+        await self._customer_api.update_token(
+            data.get("data", {}).get("accessToken"),
+            data.get("data", {}).get("refreshToken"),
+            data.get("data", {}).get("accessTokenExpireTime"),
+        )
         self._customer_api.phone = phone
         self._customer_api.password = password
 
@@ -165,6 +235,7 @@ class Manager:
         return True
 
     async def update_device_cache(self) -> bool:
+        self._loop = asyncio.get_running_loop()
         await self.ws.add_message_listener(self.on_ws_message)
         self.db_repository.init_db()
         if not self._is_connected:
@@ -183,7 +254,8 @@ class Manager:
                 host_sequence_list.append(value.get("host"))
 
         self.host_list = host_sequence_list
-        self._lan_process.sync_hosts(self._id, [], self.house_key)
+        # 云端模式下也保持局域网主机在线,云端失败时可以立即切换
+        self._lan_process.sync_hosts(self._id, host_sequence_list, self.house_key, self._known_host_ips())
 
         return True
 
@@ -194,13 +266,14 @@ class Manager:
         # 修改本地群组和设备的状态
         device_data = await self._discover_repository.discover()
         group_data = await self._group_repository.discover_groups()
-        floor_data = await self._floor_info_repository.fetch_floor_info()
-        room_data = await self._room_repository.fetch_room_info()
-        terminal_data = await self._terminal_repository.fetch_terminal_info()
-        scene_data = await self._scene_repository.fetch_scene_info()
+        floor_data = await self._fetch_metadata(FLOOR, self._floor_info_repository.fetch_floor_info)
+        room_data = await self._fetch_metadata(ROOM, self._room_repository.fetch_room_info)
+        terminal_data = await self._fetch_metadata(TERMINAL, self._terminal_repository.fetch_terminal_info)
+        scene_data = await self._fetch_metadata(SCENE, self._scene_repository.fetch_scene_info)
 
         # 房间和楼层映射
-        if floor_data.get("code") == Code.SUCCESS.value and room_data.get("code") == Code.SUCCESS.value:
+        if (floor_data is not None and room_data is not None and
+                floor_data.get("code") == Code.SUCCESS.value and room_data.get("code") == Code.SUCCESS.value):
             floors_dict = (
                 {floor.get("floorNo"): floor.get("floorName") for floor in
                  floor_data.get("data", {}).get("floors", [])} if floor_data.get("data") else {}
@@ -216,7 +289,7 @@ class Manager:
             return floor_data, room_data, terminal_data, terminal_dict
 
         # 主机和从机映射 从机是否跟随上线
-        if terminal_data.get("code") == Code.SUCCESS.value:
+        if terminal_data is not None and terminal_data.get("code") == Code.SUCCESS.value:
             terminal_dict = {terminal.get("terminalSequence"): {
                 "host": terminal.get("hostSequence"),
                 "isFollowOnline": terminal.get("isFollowOnline"),
@@ -283,6 +356,20 @@ class Manager:
         #                         )
         return floor_data, room_data, terminal_data, terminal_dict
 
+    def _known_host_ips(self) -> dict[str, str]:
+        try:
+            return self.lan_host_repository.list_host_ips()
+        except Exception as e:
+            _LOGGER.warning("read lan host ips error: %s", e)
+            return {}
+
+    def _on_lan_host_address(self, host_sequence: str, ip: str):
+        # 在局域网接收线程中执行,交给数据库写线程,和重建数据库串行
+        self.db_writer.submit(self.lan_host_repository.save_host, host_sequence, ip, int(time.time()))
+
+    async def _fetch_metadata(self, kind: str, fetch) -> dict[str, Any] | None:
+        return await self.metadata_cache.get(self._customer_api.house_no, kind, fetch)
+
     def __read_data_to_devices(self):
         devices = self.db_repository.list_entities(Device)
         device_values = self.db_repository.list_entities(DeviceValue)
@@ -298,7 +385,6 @@ class Manager:
                     (t.product_model == 'DXH' or t.product_model == "DXH-HMCUH743")):
                 host_sequence_list.append(t.host_sequence)
         self.host_list = host_sequence_list
-        self._lan_process.sync_hosts(self._id, host_sequence_list, self.house_key)
         for s in scenes:
             scene = CustomerScene(s.to_dict())
             for f in floors:
@@ -328,6 +414,8 @@ class Manager:
                 if t.terminal_sequence == customer_device.terminal_sequence:
                     customer_device.hosts.append(t.host_sequence)
             self.device_map[customer_device.device_no] = customer_device
+        # 设备加载完成后再同步主机,主机的应答能找到对应设备
+        self._lan_process.sync_hosts(self._id, host_sequence_list, self.house_key, self._known_host_ips())
 
     async def save_data_to_local(self,
                                  # floors: list[dict],
@@ -342,14 +430,12 @@ class Manager:
             "houseName": self._customer_api.house_name,
             "lanSecretKey": self.house_key
         }
-        floors_data = await self._floor_info_repository.fetch_floor_info()
-        rooms_data = await self._room_repository.fetch_room_info()
-        terminal_data = await self._terminal_repository.fetch_terminal_info()
+        floors_data = await self._fetch_metadata(FLOOR, self._floor_info_repository.fetch_floor_info)
+        rooms_data = await self._fetch_metadata(ROOM, self._room_repository.fetch_room_info)
+        terminal_data = await self._fetch_metadata(TERMINAL, self._terminal_repository.fetch_terminal_info)
         if floors_data is None or rooms_data is None or terminal_data is None:
             _LOGGER.error("Failed to fetch floor info")
             return
-        self.db_repository.clear_all_table()
-        self.db_repository.init_db()
         floors = floors_data.get("data").get("floors")
         rooms = rooms_data.get("data").get("rooms")
         terminals = terminal_data.get("data").get("terminals")
@@ -428,17 +514,22 @@ class Manager:
                 sync_host_sequences=s.sync_host_sequences
             )
             scene_datas.append(scene_data)
-        self.db_repository.add_entities(device_datas)
-        self.db_repository.add_entities(device_value_datas)
-        self.db_repository.add_entities(house_datas)
-        self.db_repository.add_entities(floor_datas)
-        self.db_repository.add_entities(room_datas)
-        self.db_repository.add_entities(terminal_datas)
-        self.db_repository.add_entities(scene_datas)
+        await self.db_writer.run(self._rebuild_local_db, [
+            device_datas, device_value_datas, house_datas, floor_datas, room_datas, terminal_datas, scene_datas,
+        ])
         # _LOGGER.debug("save data to local file success")
 
-    def on_ws_message(self, msg: str):
-        msg_dict = json.loads(msg)
+    def _rebuild_local_db(self, entity_lists: list[list[Any]]):
+        # 在数据库写线程中执行,和其他写入串行
+        # 主机地址不是云端数据,重建数据库时保留
+        lan_hosts = self.lan_host_repository.list_hosts()
+        self.db_repository.clear_all_table()
+        self.db_repository.init_db()
+        self.lan_host_repository.restore_hosts(lan_hosts)
+        for entities in entity_lists:
+            self.db_repository.add_entities(entities)
+
+    def on_ws_message(self, msg_dict: dict[str, Any]):
         namespace = msg_dict.get("namespace")
         if namespace not in [
             "Duwi.RPS.DeviceValue",
@@ -460,6 +551,10 @@ class Manager:
             if not device:
                 _LOGGER.warn(f"device {device_id} not found")
                 return
+            status = {k: v for k, v in status.items() if k not in REPORT_ID_KEYS}
+            status = self._fresh_report(device, status, REPORT_CLOUD)
+            if not status:
+                return
             device_values = []
             for v in status:
                 dv = DeviceValue(
@@ -468,9 +563,11 @@ class Manager:
                     value=status.get(v)
                 )
                 device_values.append(dv)
-            self.device_value_repository.update_device_values(device_values)
+            self.db_writer.save_values(device_values)
             self.__update_device(device, status)
             if "device_use" in status:
+                # 设备启用/停用后房屋拓扑可能变化
+                self.metadata_cache.invalidate(self._customer_api.house_no)
                 self.__change_device(device, status["device_use"])
 
         # 设备联网状态
@@ -528,12 +625,41 @@ class Manager:
                     )
                     device_value_datas.append(device_value_data)
                 # _LOGGER.debug("添加持久化的本地设备数据 = %s", device_data)
-                self.device_repository.add_device(device_data, device_value_datas)
+                self.db_writer.submit(self.device_repository.add_device, device_data, device_value_datas)
             else:
                 _LOGGER.info(f"设备 {device.device_no} 已被停用")
+                self._reported.pop(device.device_no, None)
                 listener.remove_device(device.device_no)
                 #     移除本地数据
-                self.device_repository.remove_one_device(device.device_no)
+                self.db_writer.submit(self.device_repository.remove_one_device, device.device_no)
+
+    def _fresh_report(self, device: CustomerDevice, status: dict[str, Any], source: str) -> dict[str, Any]:
+        """Version the keys of a report and drop those that carry nothing new.
+
+        How the channels interleave: both are applied on the event loop only.
+        WS reports arrive in the order the consumer takes them from the FIFO
+        queue, and LAN reports in the order the receive thread hands them
+        over. Neither the cloud nor the hosts stamp reports with a time or
+        sequence number, so the version of a key is the order its report
+        reached the loop, and the newest version wins. Each channel delivers
+        a device's changes in order and both end with its current state. A
+        late report from the slower channel is therefore followed by that
+        channel's newer one, and nothing is dropped for being "too soon".
+        Repeating the value already held, typically the same change seen on
+        the other channel, is a duplicate and does not notify listeners.
+        Snapshots fetched by resync_values are older than any report
+        versioned after the fetch started and do not override them.
+        """
+        reported = self._reported.setdefault(device.device_no, {})
+        fresh = {}
+        for k, v in status.items():
+            last = reported.get(k)
+            if last is not None and v == last.value and v == device.value.get(k):
+                self.report_stats["duplicate"] += 1
+                continue
+            reported[k] = ReportedValue(v, source, next(self._report_version))
+            fresh[k] = v
+        return fresh
 
     def __update_device(self, device: CustomerDevice, status: dict[str, Any]):
         # 改变全局的设备的状态
@@ -541,7 +667,7 @@ class Manager:
             device.value[k] = status[k]
         # 下发通知
         for listener in self._device_listeners:
-            listener.update_device(device)
+            listener.update_device(device, status)
 
     def add_device_listener(self, listener: SharingDeviceListener):
         """Add device listener."""
@@ -551,16 +677,80 @@ class Manager:
         """Remove device listener."""
         self._device_listeners.remove(listener)
 
-    async def activate_scene(self, scene: CustomerScene):
+    async def activate_scene(self, scene: CustomerScene) -> dict[str, bool] | None:
+        """Activate the scene.
+
+        Returns host_sequence -> acknowledged for scenes executed over the LAN.
+        """
         if scene.execute_way == 0 or self._is_connected:
-            await self.scene_op_repository.control(scene.scene_no)
-        elif scene.execute_way == 1:
-            for host_sequence in scene.sync_host_sequences:
-                self._lan_process.activate_scene(host_sequence, scene.scene_no)
+            data = await self.scene_op_repository.control(scene.scene_no)
+            # 主机同步的场景在云端失败时改由局域网执行
+            if (data is not None or scene.execute_way != 1
+                    or not any(self._lan_process.can_send(h) for h in scene.sync_host_sequences)):
+                return None
+            _LOGGER.warning("cloud scene %s failed, fail over to local", scene.scene_no)
+        if scene.execute_way == 1:
+            results = await self._lan_process.activate_scene_hosts(scene.sync_host_sequences, scene.scene_no)
+            failed = [host_sequence for host_sequence, acked in results.items() if not acked]
+            if failed:
+                _LOGGER.warning("scene %s not acknowledged by hosts %s", scene.scene_no, failed)
+            return results
+        return None
 
     async def send_commands(
             self, device_no: str, is_group: bool, commands: dict[str, Any]
-    ):
+    ) -> dict[str, Any] | None:
+        """Queue commands and wait for the result of the batched dispatch.
+
+        Commands arriving within COMMAND_BATCH_WINDOW are collected and sent
+        together, commands for the same device are merged into one request.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending_commands.get(device_no)
+        if pending is None:
+            pending = self._pending_commands[device_no] = {
+                "is_group": is_group,
+                "commands": {},
+                "futures": [],
+            }
+        pending["commands"].update(commands)
+        pending["futures"].append(future)
+        if self._batch_handle is None:
+            self._batch_handle = loop.call_later(COMMAND_BATCH_WINDOW, self._flush_commands)
+        return await future
+
+    def _flush_commands(self):
+        self._batch_handle = None
+        batch, self._pending_commands = self._pending_commands, {}
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._dispatch_batch(batch))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+
+    async def _dispatch_batch(self, batch: dict[str, dict[str, Any]]):
+        _LOGGER.info("dispatch %d device commands", len(batch))
+        if self._is_connected and not self._customer_api.token_valid:
+            # token由后台定时刷新,这里只唤醒刷新,不等待
+            self._token_wakeup.set()
+        results = await asyncio.gather(
+            *(self._dispatch_commands(device_no, pending["is_group"], pending["commands"])
+              for device_no, pending in batch.items()),
+            return_exceptions=True,
+        )
+        for pending, result in zip(batch.values(), results):
+            for future in pending["futures"]:
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    async def _dispatch_commands(
+            self, device_no: str, is_group: bool, commands: dict[str, Any]
+    ) -> dict[str, Any]:
         cd = ControlDevice(
             device_no=device_no,
             house_no=self._customer_api.house_no,
@@ -570,63 +760,104 @@ class Manager:
             cd.add_param_info(k, commands[k])
 
         # 这里进行局域网和云平台的判断
-        # 获取设备所属主机，如果所属多个主机，1个不在线就走云端
         device = self.device_map.get(device_no, None)
         if not device:
             _LOGGER.warn(f"device {device_no} not found")
-            return
-        # _LOGGER.debug(" -- 所有的在线的 device.hosts -- %s ", self._lan_process.get_online_hosts(self._id))
-        # _LOGGER.debug("当前设备的主机 %s", device.hosts)
+            return {"code": Code.DEVICE_NOT_EXISTS.value}
         host_sequences = device.hosts
-        is_host_lan_online = False
-        for host_sequence in host_sequences:
-            if self._lan_process.check_is_online(host_sequence):
-                is_host_lan_online = True
-                break
-            is_host_lan_online = False
-        # _LOGGER.debug("self._is_connected %s", self._is_connected)
+        # 应答过的主机在线; 预置ip或者还没应答的主机也可以单播/组播下发
+        is_host_lan_online = any(self._lan_process.check_is_online(h) for h in host_sequences)
+        can_send_lan = any(self._lan_process.can_send(h) for h in host_sequences)
         if self._is_connected:
             # 走云端的逻辑
             _LOGGER.info("go cloud")
-            expire_time_str = self._customer_api.access_token_expire_time
-            if expire_time_str:
-                expire_time_dt = datetime.fromisoformat(expire_time_str)
-                expire_time_ts = expire_time_dt.timestamp()
-                if expire_time_ts < time.time() + 2 * 24 * 60 * 60:
-                    refresh_token_data = await self._refresh_token_repository.refresh()
-                    auth_data = refresh_token_data.get("data", {})
-                    self._token_listener.update_token(
-                        is_refresh=refresh_token_data.get("code ") == Code.SUCCESS.value,
-                        token_info={
-                            "access_token": auth_data.get("accessToken"),
-                            "refresh_token": auth_data.get("refreshToken")
-                        })
-                    self._customer_api.access_token_expire_time = auth_data.get("accessTokenExpire")
-                    self._customer_api.access_token = auth_data.get("accessToken")
-                    self._customer_api.refresh_token = auth_data.get("refreshToken")
-            data = await self._control_repository.control(is_group, cd)
-            if data is not None:
-                if data.get("code") != Code.SUCCESS.value:
-                    _LOGGER.error("send_commands error = %s message %s", data.get("code"), data.get("message"))
-                else:
-                    _LOGGER.info("send_commands success = %s message %s", data.get("code"), data.get("message"))
-            else:
-                _LOGGER.error("send_commands error,data is None")
-        elif is_host_lan_online:
-            _LOGGER.info("go local")
-            # _LOGGER.debug(f"device {device_no} lan operation")
-            for host_sequence in host_sequences:
-                self._lan_process.device_operate(host_sequence, device.device_type_no, device.device_no,
-                                                 device.terminal_sequence, device.route_num, device.is_group,
-                                                 device.is_virtual_device, commands)
+            data = await self._cloud_control(is_group, cd, is_host_lan_online)
+            code = data.get("code")
+            if code == Code.SUCCESS.value:
+                _LOGGER.info("send_commands success = %s message %s", code, data.get("message"))
+                return data
+            if code not in CLOUD_FAILOVER_CODES or not can_send_lan:
+                _LOGGER.error("send_commands error, code: %s", code)
+                return data
+            # 云端熔断,限流或失败,切换到局域网
+            _LOGGER.warning("cloud control failed (%s), fail over to local", code)
+        elif not can_send_lan:
+            return {"code": Code.NETWORK_CONFIGURATION_NOT_SUPPORTED.value}
+        _LOGGER.info("go local")
+        # _LOGGER.debug(f"device {device_no} lan operation")
+        results = await self._lan_process.device_operate_hosts(
+            host_sequences, device.device_type_no, device.device_no, device.terminal_sequence, device.route_num,
+            device.is_group, device.is_virtual_device, commands)
+        failed = [host_sequence for host_sequence, acked in results.items() if not acked]
+        if failed:
+            _LOGGER.warning("device %s not acknowledged by hosts %s", device_no, failed)
+        if len(failed) == len(results):
+            return {"code": Code.OPERATION_TIMEOUT.value}
+        return {"code": Code.SUCCESS.value, "acks": results}
+
+    async def _cloud_control(self, is_group: bool, cd: ControlDevice, lan_online: bool) -> dict[str, Any]:
+        if not lan_online:
+            return await self._control_repository.control(is_group, cd)
+        # 局域网主机在线时不等待慢的云端请求
+        try:
+            return await asyncio.wait_for(self._control_repository.control(is_group, cd),
+                                          CLOUD_CONTROL_FAILOVER_TIMEOUT)
+        except TimeoutError:
+            _LOGGER.warning("cloud control timeout after %ss", CLOUD_CONTROL_FAILOVER_TIMEOUT)
+            return {"code": Code.OPERATION_TIMEOUT.value}
+
+    def _on_cloud_circuit_change(self, state: str):
+        if not self._is_connected or self._is_over:
+            return
+        if state == OPEN:
+            # 立即探测还没有应答的局域网主机,熔断期间的指令直接走局域网
+            _LOGGER.info("cloud circuit open, discover lan hosts")
+            self._lan_process.sync_hosts(self._id, self.host_list, self.house_key, self._known_host_ips())
+
+    async def token_scheduler(self):
+        """Refresh the access token ahead of expiry in the background."""
+        while not self._is_over:
+            refresh_at = self._customer_api.token_refresh_at
+            delay = TOKEN_CHECK_INTERVAL if refresh_at is None else refresh_at - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._token_wakeup.wait(), timeout=delay)
+                except TimeoutError:
+                    pass
+            self._token_wakeup.clear()
+            if self._is_over:
+                break
+            refresh_at = self._customer_api.token_refresh_at
+            due = refresh_at is not None and refresh_at <= time.time()
+            if not due and self._customer_api.token_valid:
+                continue
+            if not self._is_connected:
+                await asyncio.sleep(TOKEN_RETRY_INTERVAL)
+                continue
+            _LOGGER.info("refresh access token in background")
+            if not await self._customer_api.refresh_access_token():
+                _LOGGER.warning("refresh access token failed, retry in %ss", TOKEN_RETRY_INTERVAL)
+                await asyncio.sleep(TOKEN_RETRY_INTERVAL)
+            elif (refresh_at := self._customer_api.token_refresh_at) is not None and refresh_at <= time.time():
+                # 新token的有效期异常,避免连续刷新
+                await asyncio.sleep(TOKEN_RETRY_INTERVAL)
 
     async def unload(self, clear_local: bool = False):
         self._is_over = True
+        self._token_wakeup.set()
+        self._customer_api.circuit_breaker.remove_listener(self._on_cloud_circuit_change)
+        self.ws.remove_reconnect_listener(self._on_ws_reconnected)
+        self._lan_process.remove_host_address_listener(self._id)
+        self._cancel_resync_retry()
+        if self._batch_handle is not None:
+            self._batch_handle.cancel()
+            self._flush_commands()
         await self.ws.remove_message_listener(self.on_ws_message)
         await self.ws.disconnect()
         if clear_local:
             self.device_map.clear()
-            self.db_repository.clear_all_table()
+            await self.db_writer.run(self.db_repository.clear_all_table)
+        self.db_writer.close()
 
     async def ping(self, host):
         """执行 ping 命令并返回是否成功"""
@@ -681,13 +912,101 @@ class Manager:
                 if last != self._is_connected or self._is_init:
                     _LOGGER.info("开启局域网查询")
                     await self.enter_lan_mode()
-                    self._lan_process.sync_hosts(self._id, self.host_list, self.house_key)
+                    self._lan_process.sync_hosts(self._id, self.host_list, self.house_key, self._known_host_ips())
                     self._is_init = False
                 await asyncio.sleep(10)
 
     async def enter_cloud_mode(self):
+        self._cloud_syncing = True
+        try:
+            await self._enter_cloud_mode()
+        finally:
+            self._cloud_syncing = False
+
+    async def _on_ws_reconnected(self, disconnected_at: float, reconnected_at: float):
+        if self._is_over or not self._is_connected or self._cloud_syncing:
+            return
+        _LOGGER.info("ws reconnected after %.1fs, resync device values", reconnected_at - disconnected_at)
+        await self.resync_values()
+
+    async def resync_values(self) -> bool:
+        """Fetch all device and group values in one batch and apply only the changes.
+
+        Returns whether both lists were fetched. What was fetched is applied
+        either way, and a failed resync is retried after RESYNC_RETRY_INTERVAL.
+        """
+        self._cancel_resync_retry()
+        # 拉取期间收到的上报比快照新,不被快照覆盖
+        started = next(self._report_version)
+        device_data, group_data = await asyncio.gather(
+            self._discover_repository.discover(),
+            self._group_repository.discover_groups(),
+        )
+        device_ok = device_data is not None and device_data.get("code") == Code.SUCCESS.value
+        group_ok = group_data is not None and group_data.get("code") == Code.SUCCESS.value
+        if not device_ok or not group_ok:
+            _LOGGER.warning("resync fetch failed, device code: %s, group code: %s",
+                            device_data.get("code") if device_data else None,
+                            group_data.get("code") if group_data else None)
+        values: dict[str, dict[str, Any]] = {}
+        if device_ok:
+            for device in device_data.get("data", {}).get("devices") or []:
+                if device.get("isUse") == 0:
+                    continue
+                value = dict(device.get("value") or {})
+                value["online"] = device.get("isOnline", False)
+                values[device.get("deviceNo")] = value
+        if group_ok:
+            for group in group_data.get("data", {}).get("deviceGroups") or []:
+                values[group.get("deviceGroupNo")] = dict(group.get("value") or {})
+
+        device_values = []
+        for device_no, value in values.items():
+            device = self.device_map.get(device_no)
+            if device is None:
+                continue
+            reported = self._reported.setdefault(device_no, {})
+            changed = {}
+            for k, v in value.items():
+                if k in device.value and device.value[k] == v:
+                    continue
+                if (last := reported.get(k)) is not None and last.version > started:
+                    self.report_stats["stale"] += 1
+                    continue
+                changed[k] = v
+            if not changed:
+                continue
+            for k, v in changed.items():
+                reported[k] = ReportedValue(v, REPORT_CLOUD, next(self._report_version))
+                device_values.append(DeviceValue(device_no=device_no, code=k, value=v))
+            self.__update_device(device, changed)
+        if device_values:
+            self.db_writer.save_values(device_values)
+        _LOGGER.info("resync updated %d values", len(device_values))
+        if device_ok and group_ok:
+            return True
+        self._schedule_resync_retry()
+        return False
+
+    def _schedule_resync_retry(self):
+        if self._is_over or self._loop is None:
+            return
+        _LOGGER.info("retry resync in %ss", RESYNC_RETRY_INTERVAL)
+        self._resync_retry = self._loop.call_later(RESYNC_RETRY_INTERVAL, self._start_resync_retry)
+
+    def _start_resync_retry(self):
+        self._resync_retry = None
+        if self._is_over or not self._is_connected:
+            return
+        self._resync_task = self._loop.create_task(self.resync_values())
+
+    def _cancel_resync_retry(self):
+        if self._resync_retry is not None:
+            self._resync_retry.cancel()
+            self._resync_retry = None
+
+    async def _enter_cloud_mode(self):
         _LOGGER.info("enter_cloud_mode")
-        self._lan_process.clear_hosts(self._id)
         await self.ws.reconnect()
         # 这边要等云端数据更新到最新版本的联网状态,不然拉取的数据就是假数据
         for i in range(3):
@@ -759,10 +1078,14 @@ class Manager:
                 listener.update_scene(s)
 
     def handle_lan_message(self, message: dict[str, any]):
-        # _LOGGER.debug(f"------Manager接收到局域网的消息 {message}")
-        # _LOGGER.debug("self.is_connected %s", self._is_connected)
-        if self._is_connected:
-            return
+        # 在局域网接收线程中执行,转到事件循环中处理
+        if self._loop is None:
+            self._handle_lan_message(message)
+        elif not self._is_over:
+            self._loop.call_soon_threadsafe(self._handle_lan_message, message)
+
+    def _handle_lan_message(self, message: dict[str, any]):
+        # 云端模式下局域网主机保持在线,设备状态上报同样处理,在线状态以云端为准
         # 解析局域网指令
         msg_type = message["type"]
         msg_data = message["data"]
@@ -783,7 +1106,7 @@ class Manager:
         if "property" in command_keys:
             # 属性
             cmd_property = command["property"]
-            if "online" in cmd_property.keys():
+            if "online" in cmd_property.keys() and not self._is_connected:
                 online = cmd_property["online"]
                 # _LOGGER.debug("sequence %s ----- online %s", sequence, online)
                 for d in self.device_map:
@@ -839,7 +1162,8 @@ class Manager:
         if not device:
             _LOGGER.warning(f"device {device_no} not found")
             return
-        self.__update_device(device, status)
+        if status := self._fresh_report(device, status, REPORT_LAN):
+            self.__update_device(device, status)
         # _LOGGER.debug(f"------向HA发送局域网的消息 _resolve_terminal_lan_message {device_no} {status}")
 
     def _resolve_device_lan_message(self, command: dict[str, any]):
@@ -870,5 +1194,6 @@ class Manager:
         if not device:
             _LOGGER.warning(f"device {device_no} not found")
             return
-        self.__update_device(device, status)
+        if status := self._fresh_report(device, status, REPORT_LAN):
+            self.__update_device(device, status)
         # _LOGGER.debug(f"------向HA发送局域网的消息 _resolve_device_lan_message {device_no} {status}")
@@ -0,0 +1,91 @@
+import asyncio
+from collections import OrderedDict
+import itertools
+from typing import Any
+
+from ..const.const import _LOGGER
+
+# 溢出策略: 按设备合并 / 丢弃最旧的消息
+COALESCE = "coalesce"
+DROP_OLDEST = "drop_oldest"
+
+# 可以按设备合并的消息
+COALESCE_NAMESPACES = {
+    "Duwi.RPS.DeviceValue",
+    "Duwi.RPS.DeviceGroupValue",
+    "Duwi.RPS.TerminalOnline",
+}
+
+
+class WsMessageQueue:
+    """Bounded FIFO queue between the WS reader and its consumers.
+
+    Messages are delivered one by one in arrival order. Only when the queue
+    is full does the overflow policy apply: with coalesce a device report is
+    merged into the latest queued report of the same device, otherwise (and
+    for messages that cannot be merged) the oldest message is dropped.
+    """
+
+    def __init__(self, maxsize: int, policy: str = COALESCE):
+        self.maxsize = maxsize
+        self.policy = policy
+        # 序号 -> (合并key, 消息)
+        self._items: OrderedDict[int, tuple[Any, dict[str, Any]]] = OrderedDict()
+        # 合并key -> 队列中该设备最新一条消息的序号
+        self._latest: dict[Any, int] = {}
+        self._not_empty = asyncio.Event()
+        self._seq = itertools.count()
+        self.stats = {"enqueued": 0, "coalesced": 0, "dropped": 0, "processed": 0, "max_depth": 0}
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+    def put(self, message: dict[str, Any]):
+        """Enqueue without blocking the reader."""
+        self.stats["enqueued"] += 1
+        key = self._coalesce_key(message)
+        if len(self._items) >= self.maxsize:
+            if key is not None and (seq := self._latest.get(key)) is not None:
+                # 队列已满,合并到该设备排队中的最新消息
+                self._items[seq][1]["result"]["msg"].update(message["result"]["msg"])
+                self.stats["coalesced"] += 1
+                return
+            seq, (dropped_key, dropped) = self._items.popitem(last=False)
+            self._forget(dropped_key, seq)
+            self.stats["dropped"] += 1
+            _LOGGER.warning("ws queue full, drop message %s", dropped.get("namespace"))
+        seq = next(self._seq)
+        self._items[seq] = (key, message)
+        if key is not None:
+            self._latest[key] = seq
+        self.stats["max_depth"] = max(self.stats["max_depth"], len(self._items))
+        self._not_empty.set()
+
+    async def get(self) -> dict[str, Any]:
+        while not self._items:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        seq, (key, message) = self._items.popitem(last=False)
+        self._forget(key, seq)
+        return message
+
+    def task_done(self):
+        self.stats["processed"] += 1
+
+    def clear(self):
+        self._items.clear()
+        self._latest.clear()
+
+    def _forget(self, key: Any, seq: int):
+        if key is not None and self._latest.get(key) == seq:
+            del self._latest[key]
+
+    def _coalesce_key(self, message: dict[str, Any]) -> tuple[str, str] | None:
+        if self.policy != COALESCE:
+            return None
+        namespace = message.get("namespace")
+        msg = message.get("result", {}).get("msg")
+        if namespace not in COALESCE_NAMESPACES or not isinstance(msg, dict):
+            return None
+        target = msg.get("deviceNo") or msg.get("deviceGroupNo") or msg.get("sequence")
+        return (namespace, target) if target else None
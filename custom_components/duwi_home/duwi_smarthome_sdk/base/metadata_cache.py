@@ -0,0 +1,86 @@
+import asyncio
+from dataclasses import dataclass
+import hashlib
+import json
+import time
+from typing import Any, Awaitable, Callable
+
+from ..const.const import _LOGGER, METADATA_CACHE_TTL
+
+# 房屋拓扑数据类型
+FLOOR = "floor"
+ROOM = "room"
+TERMINAL = "terminal"
+SCENE = "scene"
+
+
+@dataclass
+class MetadataEntry:
+    data: dict[str, Any]
+    digest: str
+    fetched_at: float
+
+
+class MetadataCache:
+    """Cache of rarely changing house topology: floors, rooms, terminals and scenes.
+
+    Entries expire after a per-kind TTL; a refetch is compared by content hash
+    so callers can tell whether the topology actually changed.
+    """
+
+    def __init__(self, ttl: dict[str, float] | None = None):
+        self.ttl = ttl or METADATA_CACHE_TTL
+        self._entries: dict[tuple[str, str], MetadataEntry] = {}
+        self._locks: dict[tuple[str, str], asyncio.Lock] = {}
+        self.stats = {"hits": 0, "misses": 0, "changed": 0}
+
+    async def get(
+            self, house_no: str, kind: str, fetch: Callable[[], Awaitable[dict[str, Any] | None]]
+    ) -> dict[str, Any] | None:
+        """Return the cached response for kind, fetching it when missing or expired."""
+        key = (house_no, kind)
+        if (entry := self._fresh(key)) is not None:
+            self.stats["hits"] += 1
+            return entry.data
+        # 同一份数据只拉取一次
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            if (entry := self._fresh(key)) is not None:
+                self.stats["hits"] += 1
+                return entry.data
+            self.stats["misses"] += 1
+            data = await fetch()
+            if data is None:
+                return None
+            digest = self._digest(data)
+            old = self._entries.get(key)
+            if old is not None and old.digest == digest:
+                # 内容未变化,沿用原数据
+                old.fetched_at = time.monotonic()
+                return old.data
+            if old is not None:
+                self.stats["changed"] += 1
+                _LOGGER.info("house %s %s metadata changed", house_no, kind)
+            self._entries[key] = MetadataEntry(data, digest, time.monotonic())
+            return data
+
+    def digest(self, house_no: str, kind: str) -> str | None:
+        """Content hash of the cached data, None when not cached."""
+        entry = self._entries.get((house_no, kind))
+        return entry.digest if entry is not None else None
+
+    def invalidate(self, house_no: str | None = None, kind: str | None = None):
+        """Expire cached entries, all of them when no house or kind is given."""
+        for key in list(self._entries):
+            if (house_no is None or key[0] == house_no) and (kind is None or key[1] == kind):
+                self._entries[key].fetched_at = float("-inf")
+
+    def _fresh(self, key: tuple[str, str]) -> MetadataEntry | None:
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry.fetched_at >= self.ttl.get(key[1], 0):
+            return None
+        return entry
+
+    @staticmethod
+    def _digest(data: dict[str, Any]) -> str:
+        content = json.dumps(data.get("data"), sort_keys=True, separators=(',', ':'))
+        return hashlib.sha1(content.encode("utf-8")).hexdigest()
@@ -0,0 +1,195 @@
+from abc import ABCMeta, abstractmethod
+import asyncio
+from dataclasses import dataclass, field
+import random
+import time
+from typing import Any, Awaitable, Callable
+import uuid
+
+from ..const.const import (
+    _LOGGER,
+    API_MAX_RETRY,
+    API_RETRY_BASE_DELAY,
+    API_RETRY_MAX_DELAY,
+    Code,
+)
+from .circuit_breaker import CircuitBreaker
+from .rate_limiter import CONTROL, AdaptiveRateLimiter
+
+# 可以重试的临时错误
+TRANSIENT_CODES = {
+    Code.SYS_ERROR.value,
+    Code.GATEWAY_SYS_ERROR.value,
+    Code.NETWORK_CONFIGURATION_NOT_SUPPORTED.value,
+    Code.OPERATION_TIMEOUT.value,
+}
+
+# 云端限流返回码
+THROTTLE_CODES = {
+    Code.SYSTEM_RATE_LIMIT.value,
+    Code.SYSTEM_MINUTE_RATE_LIMIT.value,
+    Code.SYSTEM_HOUR_RATE_LIMIT.value,
+}
+
+
+@dataclass
+class ApiRequest:
+    """A request passing through the middleware pipeline."""
+
+    method: str
+    path: str
+    params: dict[str, Any] | None = None
+    body: dict[str, Any] | None = None
+    # 是否需要在accessToken失效时刷新
+    auth: bool = True
+    # 临时错误是否重试, 以及单次请求的超时(秒), None使用客户端默认值
+    retry: bool = True
+    timeout: float | None = None
+    attempt: int = 0
+    trace_id: str = field(default_factory=lambda: uuid.uuid4().hex[:8])
+    # 序列化结果: 签名串 / 查询串 / 请求体, 重试时复用
+    sign_string: str | None = field(default=None, repr=False)
+    query: str = field(default="", repr=False)
+    payload: bytes | None = field(default=None, repr=False)
+
+
+Handler = Callable[[ApiRequest], Awaitable[dict[str, Any]]]
+
+
+class Middleware(metaclass=ABCMeta):
+    """A step of the request pipeline, wrapping the next handler."""
+
+    @abstractmethod
+    async def __call__(self, request: ApiRequest, call_next: Handler) -> dict[str, Any]:
+        """Handle the request, calling call_next to continue the pipeline."""
+
+
+def build_pipeline(middlewares: list[Middleware], handler: Handler) -> Handler:
+    """Compose middlewares around handler, the first one being the outermost."""
+    for middleware in reversed(middlewares):
+        handler = _bind(middleware, handler)
+    return handler
+
+
+def _bind(middleware: Middleware, call_next: Handler) -> Handler:
+    async def handle(request: ApiRequest) -> dict[str, Any]:
+        return await middleware(request, call_next)
+
+    return handle
+
+
+class TimingMiddleware(Middleware):
+    """Trace requests and collect latency per path."""
+
+    def __init__(self):
+        self.stats: dict[str, dict[str, float]] = {}
+
+    async def __call__(self, request: ApiRequest, call_next: Handler) -> dict[str, Any]:
+        start = time.monotonic()
+        data = await call_next(request)
+        elapsed = (time.monotonic() - start) * 1000
+        stat = self.stats.setdefault(request.path, {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+        stat["count"] += 1
+        stat["total_ms"] += elapsed
+        stat["max_ms"] = max(stat["max_ms"], elapsed)
+        if data.get("code") != Code.SUCCESS.value:
+            stat["errors"] += 1
+        _LOGGER.debug("[%s] %s %s -> %s in %.1fms (attempts %d)", request.trace_id, request.method,
+                      request.path, data.get("code"), elapsed, request.attempt + 1)
+        return data
+
+
+class CircuitBreakerMiddleware(Middleware):
+    """Fail control requests fast while the cloud is failing or slow."""
+
+    def __init__(self, breaker: CircuitBreaker | None = None):
+        self.breaker = breaker or CircuitBreaker.default()
+
+    async def __call__(self, request: ApiRequest, call_next: Handler) -> dict[str, Any]:
+        if AdaptiveRateLimiter.endpoint_class(request.path) != CONTROL:
+            return await call_next(request)
+        if not self.breaker.allow():
+            return {"code": Code.CIRCUIT_OPEN.value}
+        start = time.monotonic()
+        failed = True
+        try:
+            data = await call_next(request)
+            failed = data.get("code") in TRANSIENT_CODES
+            return data
+        finally:
+            # 包括重试在内的总耗时
+            self.breaker.record(failed, time.monotonic() - start)
+
+
+class RetryMiddleware(Middleware):
+    """Retry transient failures with jittered exponential backoff."""
+
+    def __init__(self, max_retry: int = API_MAX_RETRY, base_delay: float = API_RETRY_BASE_DELAY,
+                 max_delay: float = API_RETRY_MAX_DELAY):
+        self.max_retry = max_retry
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    async def __call__(self, request: ApiRequest, call_next: Handler) -> dict[str, Any]:
+        if not request.retry:
+            return await call_next(request)
+        data = {"code": Code.SYS_ERROR.value}
+        for attempt in range(self.max_retry):
+            request.attempt = attempt
+            try:
+                data = await call_next(request)
+            except Exception as e:
+                _LOGGER.warning("[%s] %s failed (attempt %d), error: %s", request.trace_id, request.path,
+                                attempt + 1, e)
+                data = {"code": Code.SYS_ERROR.value}
+            if data.get("code") not in TRANSIENT_CODES:
+                return data
+            if attempt < self.max_retry - 1:
+                await asyncio.sleep(self.backoff(attempt))
+        _LOGGER.warning("[%s] %s failed after %d attempts, code: %s", request.trace_id, request.path,
+                        self.max_retry, data.get("code"))
+        return data
+
+    def backoff(self, attempt: int) -> float:
+        # full jitter
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class RateLimitMiddleware(Middleware):
+    """Pace requests through the adaptive limiter and honour throttle codes."""
+
+    def __init__(self, limiter: AdaptiveRateLimiter | None = None):
+        self.limiter = limiter or AdaptiveRateLimiter()
+
+    async def __call__(self, request: ApiRequest, call_next: Handler) -> dict[str, Any]:
+        endpoint = self.limiter.endpoint_class(request.path)
+        data = {"code": Code.SYSTEM_RATE_LIMIT.value}
+        # 秒级限流在退避后重试一次
+        for _ in range(2):
+            if not await self.limiter.acquire(endpoint):
+                _LOGGER.warning("[%s] %s dropped by client rate limit", request.trace_id, request.path)
+                return {"code": Code.SYSTEM_RATE_LIMIT.value}
+            data = await call_next(request)
+            self.limiter.on_result(endpoint, data.get("code"))
+            if data.get("code") != Code.SYSTEM_RATE_LIMIT.value:
+                break
+        if data.get("code") in THROTTLE_CODES:
+            _LOGGER.warning("[%s] %s throttled, code: %s", request.trace_id, request.path, data.get("code"))
+        return data
+
+
+class AuthRefreshMiddleware(Middleware):
+    """Refresh an expired access token and replay the request."""
+
+    def __init__(self, client):
+        self._client = client
+
+    async def __call__(self, request: ApiRequest, call_next: Handler) -> dict[str, Any]:
+        access_token = self._client.access_token
+        data = await call_next(request)
+        if not request.auth or data.get("code") != Code.OPERATION_ACCESSTOKEN_ERROR.value:
+            return data
+        # 共用同一次token刷新,刷新成功后重放请求
+        if not await self._client.refresh_access_token(access_token):
+            return data
+        return await call_next(request)
@@ -0,0 +1,140 @@
+import asyncio
+import time
+
+from ..const.const import (
+    RATE_LIMIT_AUTH,
+    RATE_LIMIT_CONTROL,
+    RATE_LIMIT_DISCOVERY,
+    Code,
+)
+
+# 接口分类: 交互控制 / 后台发现和刷新 / 登录和刷新token
+CONTROL = "control"
+DISCOVERY = "discovery"
+AUTH = "auth"
+
+CONTROL_PATHS = {
+    "/device/batchCommandOperate",
+    "/deviceGroup/batchCommandOperate",
+    "/scene/execute",
+}
+
+AUTH_PATHS = {
+    "/account/login",
+    "/account/token",
+}
+
+# 限流返回码 -> 各分类的暂停时间(秒), 后台接口让出额度给交互控制
+# 交互控制只降低速率不暂停,用户的指令不在本地拒绝
+# 登录和刷新token不暂停,否则token在暂停期间过期会让所有请求鉴权失败
+THROTTLE_PENALTY = {
+    Code.SYSTEM_RATE_LIMIT.value: {CONTROL: 0, DISCOVERY: 2},
+    Code.SYSTEM_MINUTE_RATE_LIMIT.value: {CONTROL: 0, DISCOVERY: 60},
+    Code.SYSTEM_HOUR_RATE_LIMIT.value: {CONTROL: 0, DISCOVERY: 600},
+}
+
+
+class TokenBucket:
+    """Token bucket whose refill rate backs off on throttling."""
+
+    def __init__(self, rate: float, capacity: float, min_rate: float, max_wait: float):
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.max_wait = max_wait
+        self.tokens = capacity
+        self.blocked_until = 0.0
+        self._updated = time.monotonic()
+
+    def delay(self, now: float) -> float:
+        """Return how long to wait until a token is available."""
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        wait = max(self.blocked_until - now, 0)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    def take(self):
+        self.tokens -= 1
+
+    def throttle(self, penalty: float, now: float):
+        # 乘性减少
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = min(self.tokens, 0)
+        self.blocked_until = max(self.blocked_until, now + penalty)
+
+    def recover(self):
+        # 加性恢复
+        if self.rate < self.base_rate:
+            self.rate = min(self.base_rate, self.rate + self.base_rate / 10)
+
+
+class AdaptiveRateLimiter:
+    """Client-side limiter per endpoint class, adapting to cloud throttle codes.
+
+    Interactive control is served first: background requests wait while a
+    control request is waiting for a token. Control is only paced, never
+    rejected: once it has waited max_wait it is sent on credit.
+    """
+
+    def __init__(self):
+        self.buckets = {
+            CONTROL: TokenBucket(**RATE_LIMIT_CONTROL),
+            DISCOVERY: TokenBucket(**RATE_LIMIT_DISCOVERY),
+            AUTH: TokenBucket(**RATE_LIMIT_AUTH),
+        }
+        self._control_waiters = 0
+        self.stats = {"throttled": 0, "rejected": 0, "overdrawn": 0}
+
+    @staticmethod
+    def endpoint_class(path: str) -> str:
+        if path in CONTROL_PATHS:
+            return CONTROL
+        return AUTH if path in AUTH_PATHS else DISCOVERY
+
+    async def acquire(self, endpoint: str) -> bool:
+        """Wait for a token; False if it would take longer than the class allows.
+
+        Control always gets True, at the latest after its max_wait.
+        """
+        bucket = self.buckets[endpoint]
+        deadline = time.monotonic() + bucket.max_wait
+        is_control = endpoint == CONTROL
+        if is_control:
+            self._control_waiters += 1
+        try:
+            while True:
+                now = time.monotonic()
+                wait = bucket.delay(now)
+                if not is_control and self._control_waiters:
+                    wait = max(wait, 0.05)
+                if wait <= 0:
+                    bucket.take()
+                    return True
+                if now + wait > deadline:
+                    if is_control:
+                        # 超过等待上限的控制指令透支额度发送,由云端决定是否限流
+                        bucket.take()
+                        self.stats["overdrawn"] += 1
+                        return True
+                    self.stats["rejected"] += 1
+                    return False
+                await asyncio.sleep(wait)
+        finally:
+            if is_control:
+                self._control_waiters -= 1
+
+    def on_result(self, endpoint: str, code: str | None):
+        penalty = THROTTLE_PENALTY.get(code)
+        if penalty is None:
+            if code == Code.SUCCESS.value:
+                self.buckets[endpoint].recover()
+            return
+        # 限流针对整个账号,两类接口都要退避
+        self.stats["throttled"] += 1
+        now = time.monotonic()
+        for name, bucket in self.buckets.items():
+            if name in penalty:
+                bucket.throttle(penalty[name], now)
@@ -4,6 +4,49 @@ from enum import Enum
 _LOGGER = logging.getLogger(__package__)
 
 API_MAX_RETRY = 3
+# 重试退避的基础时间和上限(秒)
+API_RETRY_BASE_DELAY = 0.5
+API_RETRY_MAX_DELAY = 8
+# 登录是用户在等待的交互请求,不重试且使用较短的超时(秒)
+API_LOGIN_TIMEOUT = 8
+# 客户端限流: 交互控制 / 后台发现和刷新 (每秒请求数, 突发容量, 最低速率, 最长等待秒数)
+RATE_LIMIT_CONTROL = {"rate": 10, "capacity": 20, "min_rate": 1, "max_wait": 5}
+RATE_LIMIT_DISCOVERY = {"rate": 2, "capacity": 5, "min_rate": 0.1, "max_wait": 30}
+# 登录和刷新token不受限流暂停影响,只限制频率
+RATE_LIMIT_AUTH = {"rate": 1, "capacity": 3, "min_rate": 1, "max_wait": 10}
+
+# 云端控制熔断: 统计窗口(秒), 最少调用次数, 失败率阈值, 慢调用阈值(秒), 熔断时长(秒)
+CIRCUIT_BREAKER = {"window": 60, "min_calls": 4, "error_rate": 0.5, "slow_call": 5, "open_time": 30}
+# 局域网可用时,云端控制超过该时间(秒)直接切换到局域网
+CLOUD_CONTROL_FAILOVER_TIMEOUT = 3
+
+# ws应用层心跳间隔(秒), 超过该时间(秒)没有收到任何消息视为连接已断开
+WS_KEEPALIVE_INTERVAL = 20
+WS_DEAD_TIMEOUT = 45
+WS_CLOSE_TIMEOUT = 5
+# ws重连退避(decorrelated jitter)的基础时间和上限(秒)
+WS_RECONNECT_BASE_DELAY = 1
+WS_RECONNECT_MAX_DELAY = 60
+
+# ws消息队列长度, 溢出策略(coalesce/drop_oldest), 消费者数量
+WS_QUEUE_SIZE = 1000
+WS_QUEUE_POLICY = "coalesce"
+WS_CONSUMERS = 1
+
+# 房屋拓扑缓存有效期(秒), 场景变化更频繁
+METADATA_CACHE_TTL = {"floor": 600, "room": 600, "terminal": 600, "scene": 120}
+
+# 指令合并窗口(秒),窗口内的并发指令合并后统一下发
+COMMAND_BATCH_WINDOW = 0.05
+
+# token在过期前多久刷新(秒),token有效期较短时取有效期的一半
+TOKEN_REFRESH_AHEAD = 2 * 24 * 60 * 60
+# token刷新失败后的重试间隔(秒)
+TOKEN_RETRY_INTERVAL = 60
+# 未知过期时间时的检查间隔(秒)
+TOKEN_CHECK_INTERVAL = 60 * 60
+# 断线重连后补齐状态失败时,重试的间隔(秒)
+RESYNC_RETRY_INTERVAL = 30
 
 
 class Code(Enum):
@@ -50,6 +93,8 @@ class Code(Enum):
     OPERATION_BUSINESS_ERROR = '19997'
     OPERATION_SERVICE_ERROR = '19998'
     OPERATION_SYSTEM_ERROR = '19999'
+    # 云端熔断中(客户端错误码)
+    CIRCUIT_OPEN = '19990'
 
     # 账户返回码
     ACCOUNT_LOGIN_ERROR = '11000'
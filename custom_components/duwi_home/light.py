@@ -148,7 +148,7 @@ class DuwiLightEntity(DuwiEntity, LightEntity):
     @property
     def extra_state_attributes(self) -> dict[str, Any]:
         """Return the state attributes of the switch."""
-        v = self.device.value
+        v = self.value
         attrs = {}
         if v.get("oap_s") is not None:
             attrs["过载保护状态"] = "过载" if v.get("oap_s", False) else "正常"
@@ -200,21 +200,21 @@ class DuwiLightEntity(DuwiEntity, LightEntity):
     @property
     def is_on(self) -> bool | None:
         """Return true if light is on."""
-        return self.device.value.get("switch", "off") == "on"
+        return self.value.get("switch", "off") == "on"
 
     @property
     def brightness(self) -> int | None:
         """Return the brightness of this light between 0..255."""
         if ColorMode.HS in self.supported_color_modes:
-            return int(self.device.value.get("color", {}).get("v", 0) / 100 * 255)
+            return int(self.value.get("color", {}).get("v", 0) / 100 * 255)
         else:
-            return int(self.device.value.get("light", 0) / 100 * 255)
+            return int(self.value.get("light", 0) / 100 * 255)
 
     @property
     def color_temp(self) -> int | None:
         """Return the CT color value in mireds."""
         if ColorMode.COLOR_TEMP in self.supported_color_modes:
-            ct = self.device.value.get("color_temp")
+            ct = self.value.get("color_temp")
             if ct:
                 return 1000000 // ct
         return None
@@ -224,8 +224,8 @@ class DuwiLightEntity(DuwiEntity, LightEntity):
         """Return the hue and saturation color value [float, float]."""
         if ColorMode.HS in self.supported_color_modes:
             return (
-                self.device.value.get("color", {}).get("h", 0),
-                self.device.value.get("color", {}).get("s", 0)
+                self.value.get("color", {}).get("h", 0),
+                self.value.get("color", {}).get("s", 0)
             )
 
     @property
@@ -239,7 +239,7 @@ class DuwiLightEntity(DuwiEntity, LightEntity):
                 "min": 2000,
                 "max": 8000,
             }
-            color_temp_range = self.device.value.get("color_temp_range", r)
+            color_temp_range = self.value.get("color_temp_range", r)
             color_temp_max = color_temp_range.get("max")
             return 1000000 // color_temp_max
 
@@ -254,14 +254,14 @@ class DuwiLightEntity(DuwiEntity, LightEntity):
                 "min": 2000,
                 "max": 8000,
             }
-            color_temp_range = self.device.value.get("color_temp_range", r)
+            color_temp_range = self.value.get("color_temp_range", r)
             color_temp_min = color_temp_range.get("min")
             return 1000000 // color_temp_min
 
     # @debounce(10)
     async def async_turn_on(self, **kwargs: Any) -> None:
         """Turn the switch on."""
-        if self.device.value.get("lock_s", False):
+        if self.value.get("lock_s", False):
             return
         command = {}
         if ATTR_BRIGHTNESS in kwargs:
@@ -293,8 +293,6 @@ class DuwiLightEntity(DuwiEntity, LightEntity):
                     "v": int(round(self.brightness / 255 * 100))
                 }
             }
-            self.device.value["color"] = command["color"]
-            self.async_write_ha_state()
 
         if not command:
             command = {"switch": "on"}
@@ -307,6 +305,6 @@ class DuwiLightEntity(DuwiEntity, LightEntity):
 
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Turn the switch off."""
-        if self.device.value.get("lock_s", False):
+        if self.value.get("lock_s", False):
             return
         await self._send_command({"switch": "off"})
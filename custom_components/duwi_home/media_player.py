@@ -203,13 +203,13 @@ class DuwiMediaPlayerEntity(DuwiEntity, MediaPlayerEntity):
     @property
     def media_image_url(self) -> str | None:
         """Image url of current playing media."""
-        v = self.device.value
+        v = self.value
         return v.get("audio_full_info", v.get("audio_info", {})).get("pic_url", "")
 
     @property
     def media_artist(self) -> str | None:
         """Artist of current playing media, music track only."""
-        v = self.device.value
+        v = self.value
         singer = v.get("audio_full_info", v.get("audio_info", {}), ).get("singer")
         singer_name = (
             singer[0].get("name", "")
@@ -221,24 +221,24 @@ class DuwiMediaPlayerEntity(DuwiEntity, MediaPlayerEntity):
     @property
     def media_title(self) -> str | None:
         """Title of current playing media, music track only."""
-        v = self.device.value
+        v = self.value
         song_name = v.get("audio_full_info", {}).get("song_name") or v.get("audio_info", {}).get("name", "")
         return song_name
 
     @property
     def volume_level(self) -> float | None:
         """Image url of current playing media."""
-        return self.device.value.get("volume", 0) / self._max_volume
+        return self.value.get("volume", 0) / self._max_volume
 
     @property
     def is_volume_muted(self) -> bool | None:
         """Return true if volume is muted."""
-        return self.device.value.get("mute", "off") == "on"
+        return self.value.get("mute", "off") == "on"
 
     @property
     def media_content_id(self) -> str | None:
         """Content ID of current playing media."""
-        v = self.device.value
+        v = self.value
         audio_info = v.get("audio_full_info") or v.get("audio_info")
         if audio_info:
             return audio_info.get("song_id")
@@ -252,7 +252,7 @@ class DuwiMediaPlayerEntity(DuwiEntity, MediaPlayerEntity):
     @property
     def media_duration(self) -> int | None:
         """Duration of current playing media in seconds."""
-        v = self.device.value
+        v = self.value
         duration = v.get("duration", v.get("audio_full_info", v.get("audio_info", {})).get("duration", "00:00"))
         minutes, seconds = map(int, duration.split(":"))
         return minutes * 60 + seconds
@@ -260,7 +260,7 @@ class DuwiMediaPlayerEntity(DuwiEntity, MediaPlayerEntity):
     @property
     def media_position(self) -> int | None:
         """Position of current playing media in seconds."""
-        v = self.device.value
+        v = self.value
         play_progress = v.get("play_progress", "00:00")
         minutes, seconds = map(int, play_progress.split(":"))
         return minutes * 60 + seconds
@@ -273,20 +273,20 @@ class DuwiMediaPlayerEntity(DuwiEntity, MediaPlayerEntity):
     @property
     def state(self) -> MediaPlayerState | None:
         """State of the player."""
-        v = self.device.value
+        v = self.value
         return MediaPlayerState.PLAYING if v.get("play", "off") == "on" else MediaPlayerState.PAUSED
 
     @property
     def repeat(self) -> RepeatMode | str | None:
         """Return current repeat mode."""
-        v = self.device.value
+        v = self.value
         repeat, shuffle = self.get_mode(v.get("play_mode", "list"))
         return repeat
 
     @property
     def shuffle(self) -> bool | None:
         """Return if shuffle is enabled."""
-        v = self.device.value
+        v = self.value
         repeat, shuffle = self.get_mode(v.get("play_mode", "list"))
         return shuffle
 
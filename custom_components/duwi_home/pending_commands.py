@@ -0,0 +1,103 @@
+"""Per-entity table of command values waiting for the device to confirm them."""
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+_UNSET = object()
+
+
+@dataclass
+class PendingCommand:
+    """A command value waiting for the device to confirm it."""
+
+    expected: Any
+    deadline: float
+    # 与期望不一致的上报值
+    reported: Any = _UNSET
+
+
+class PendingCommands:
+    """Unconfirmed command values, kept apart from the reported device value.
+
+    The device value only ever holds what the device reported; the entity
+    renders the pending values on top of it until they are confirmed, the
+    send fails or the deadline passes. Keys the device never reports back
+    are not tracked at all.
+    """
+
+    def __init__(self, timeout: float, unechoed: Iterable[str] = ()) -> None:
+        self.timeout = timeout
+        self.unechoed = frozenset(unechoed)
+        self._commands: dict[str, PendingCommand] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self._commands)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._commands
+
+    @property
+    def overlay(self) -> dict[str, Any]:
+        """Values to render on top of the device value."""
+        return {key: pending.expected for key, pending in self._commands.items()}
+
+    @property
+    def next_deadline(self) -> float | None:
+        if not self._commands:
+            return None
+        return min(pending.deadline for pending in self._commands.values())
+
+    def add(self, commands: Mapping[str, Any], now: float) -> dict[str, PendingCommand]:
+        """Track sent command values, replacing older values of the same keys."""
+        deadline = now + self.timeout
+        sent = {
+            key: PendingCommand(value, deadline) for key, value in commands.items() if key not in self.unechoed
+        }
+        self._commands.update(sent)
+        return sent
+
+    def discard(self, sent: Mapping[str, PendingCommand]) -> bool:
+        """Drop the values of a failed send that were not superseded by a later command.
+
+        Returns whether anything was dropped.
+        """
+        dropped = False
+        for key, pending in sent.items():
+            if self._commands.get(key) is pending:
+                del self._commands[key]
+                dropped = True
+        return dropped
+
+    def reconcile(self, status: Mapping[str, Any]) -> bool:
+        """Apply the keys of an incoming report.
+
+        Only keys present in the report confirm or contradict a pending value.
+        Returns whether the report touched anything that is not pending, i.e.
+        whether the rendered state may have changed.
+        """
+        changed = False
+        for key, reported in status.items():
+            pending = self._commands.get(key)
+            if pending is None:
+                changed = True
+            elif reported == pending.expected:
+                # 收到确认
+                del self._commands[key]
+            else:
+                # 上报的值与期望不一致,在超时前保持乐观值
+                pending.reported = reported
+        return changed
+
+    def expire(self, now: float, value: Mapping[str, Any]) -> bool:
+        """Roll back values past their deadline to the reported device value.
+
+        Returns whether the rendered state changed.
+        """
+        changed = False
+        for key, pending in list(self._commands.items()):
+            if pending.deadline > now:
+                continue
+            del self._commands[key]
+            if value.get(key, _UNSET) != pending.expected:
+                changed = True
+        return changed
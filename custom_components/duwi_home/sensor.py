@@ -159,6 +159,6 @@ class DuwiSensorEntity(DuwiEntity, SensorEntity):
     @property
     def native_value(self) -> Any:
         """Return the state of the sensor."""
-        return self.device.value.get(self.entity_description.key + "_value")
+        return self.value.get(self.entity_description.key + "_value")
 
 
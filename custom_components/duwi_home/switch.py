@@ -134,12 +134,12 @@ class DuwiSwitchEntity(DuwiEntity, SwitchEntity):
     @property
     def is_on(self) -> bool:
         """Return true if switch is on."""
-        return self.device.value.get(self.entity_description.key, "off") == "on"
+        return self.value.get(self.entity_description.key, "off") == "on"
 
     @property
     def extra_state_attributes(self) -> dict[str, Any]:
         """Return the state attributes of the switch."""
-        v = self.device.value
+        v = self.value
         attrs = {}
         if v.get("oap_s") is not None:
             attrs["过载保护状态"] = "过载" if v.get("oap_s", False) else "正常"
@@ -163,12 +163,12 @@ class DuwiSwitchEntity(DuwiEntity, SwitchEntity):
 
     async def async_turn_on(self, **kwargs: Any) -> None:
         """Turn the switch on."""
-        if self.device.value.get("lock_s", False):
+        if self.value.get("lock_s", False):
             return
         await self._send_command({self.entity_description.key: "on"})
 
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Turn the switch off."""
-        if self.device.value.get("lock_s", False):
+        if self.value.get("lock_s", False):
             return
         await self._send_command({self.entity_description.key: "off"})
@@ -0,0 +1,15 @@
+"""Import paths for the tests.
+
+The integration is imported as ``custom_components.duwi_home`` (needs Home
+Assistant). The vendored SDKs under it only import each other relatively and
+are also importable on their own as ``duwi_lan_sdk`` / ``duwi_smarthome_sdk``,
+the same way the tools use them.
+"""
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+
+for path in (ROOT, ROOT / "custom_components" / "duwi_home"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
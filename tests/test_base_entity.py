@@ -0,0 +1,126 @@
+"""Tests for the optimistic state of DuwiEntity."""
+import asyncio
+from typing import Any
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from custom_components.duwi_home.base import DuwiEntity  # noqa: E402
+from custom_components.duwi_home.duwi_smarthome_sdk.base.customer_device import CustomerDevice  # noqa: E402
+from custom_components.duwi_home.duwi_smarthome_sdk.const.const import Code  # noqa: E402
+
+SUCCESS = {"code": Code.SUCCESS.value}
+FAILED = {"code": Code.OPERATION_TIMEOUT.value}
+
+
+class StubManager:
+    def __init__(self, result: dict[str, Any] | None = None):
+        self.result = SUCCESS if result is None else result
+        self.sent: list[dict[str, Any]] = []
+
+    async def send_commands(self, device_no: str, is_group: bool, commands: dict[str, Any]):
+        self.sent.append(commands)
+        return self.result
+
+
+def create_entity(value: dict[str, Any], result: dict[str, Any] | None = None) -> DuwiEntity:
+    device = CustomerDevice({"deviceNo": "D-1", "isOnline": True, "value": value})
+    entity = DuwiEntity(device, StubManager(result))
+    entity.writes = 0
+
+    def write_state():
+        entity.writes += 1
+
+    entity.async_write_ha_state = write_state
+    return entity
+
+
+def report(entity: DuwiEntity, status: dict[str, Any]):
+    """What the Manager does with a report: merge it, then signal the entity."""
+    entity.device.value.update(status)
+    asyncio.run(entity.handle_signal(status))
+
+
+def test_send_renders_optimistic_value_without_touching_device():
+    entity = create_entity({"switch": "off"})
+
+    asyncio.run(entity._send_command({"switch": "on"}))
+
+    assert entity.device_manager.sent == [{"switch": "on"}]
+    assert entity.value["switch"] == "on"
+    assert entity.device.value["switch"] == "off"
+    assert entity.writes == 1
+
+
+def test_unrelated_report_does_not_confirm():
+    entity = create_entity({"switch": "off", "light": 10})
+    asyncio.run(entity._send_command({"switch": "on"}))
+
+    report(entity, {"light": 20})
+
+    assert "switch" in entity._pending_commands
+    assert entity.value["switch"] == "on"
+    assert entity.value["light"] == 20
+    assert entity.writes == 2
+
+
+def test_matching_report_confirms_without_write():
+    entity = create_entity({"switch": "off"})
+    asyncio.run(entity._send_command({"switch": "on"}))
+
+    report(entity, {"switch": "on"})
+
+    assert not entity._pending_commands
+    assert entity.value["switch"] == "on"
+    assert entity.writes == 1
+
+
+def test_mismatch_then_unrelated_report_then_timeout():
+    entity = create_entity({"switch": "off", "light": 10})
+    entity._pending_commands.timeout = 0
+    asyncio.run(entity._send_command({"switch": "on"}))
+
+    report(entity, {"switch": "off"})
+    assert entity.value["switch"] == "on"
+
+    report(entity, {"light": 20})
+    assert "switch" in entity._pending_commands
+    assert entity.value["switch"] == "on"
+
+    entity._async_pending_timeout(None)
+    assert not entity._pending_commands
+    assert entity.value["switch"] == "off"
+    assert entity.device.value["switch"] == "off"
+
+
+def test_timeout_without_report_rolls_back():
+    entity = create_entity({"switch": "off"})
+    entity._pending_commands.timeout = 0
+    asyncio.run(entity._send_command({"switch": "on"}))
+
+    entity._async_pending_timeout(None)
+
+    assert not entity._pending_commands
+    assert entity.value["switch"] == "off"
+    assert entity.device.value["switch"] == "off"
+
+
+def test_failed_send_restores_reported_value():
+    entity = create_entity({"switch": "off"}, FAILED)
+
+    asyncio.run(entity._send_command({"switch": "on"}))
+
+    assert not entity._pending_commands
+    assert entity.value["switch"] == "off"
+    assert entity.writes == 2
+
+
+def test_unechoed_command_is_not_held():
+    entity = create_entity({"control_percent": 0})
+
+    asyncio.run(entity._send_command({"control": "open"}))
+
+    assert entity.device_manager.sent == [{"control": "open"}]
+    assert not entity._pending_commands
+    assert "control" not in entity.value
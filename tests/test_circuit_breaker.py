@@ -0,0 +1,64 @@
+"""Tests for the cloud circuit breaker state transitions."""
+from duwi_smarthome_sdk.base.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def create_breaker(open_time=60.0):
+    breaker = CircuitBreaker(window=60, min_calls=4, error_rate=0.5, slow_call=1.0, open_time=open_time)
+    transitions = []
+    breaker.add_listener(transitions.append)
+    return breaker, transitions
+
+
+def test_opens_when_failure_rate_reached():
+    breaker, transitions = create_breaker()
+    for failed in (False, True, False):
+        breaker.record(failed, 0.1)
+    assert breaker.state == CLOSED
+
+    breaker.record(True, 0.1)
+
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert transitions == [OPEN]
+
+
+def test_slow_calls_count_as_failures():
+    breaker, _ = create_breaker()
+    for latency in (0.1, 0.1, 2.0, 2.0):
+        breaker.record(False, latency)
+
+    assert breaker.state == OPEN
+
+
+def test_too_few_calls_do_not_open():
+    breaker, _ = create_breaker()
+    for _ in range(3):
+        breaker.record(True, 0.1)
+
+    assert breaker.state == CLOSED
+
+
+def test_half_open_allows_one_probe_and_closes_on_success():
+    breaker, transitions = create_breaker(open_time=0)
+    for _ in range(4):
+        breaker.record(True, 0.1)
+
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record(False, 0.1)
+
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+    assert transitions == [OPEN, HALF_OPEN, CLOSED]
+
+
+def test_failed_probe_opens_again():
+    breaker, transitions = create_breaker(open_time=0)
+    for _ in range(4):
+        breaker.record(True, 0.1)
+    assert breaker.allow()
+
+    breaker.record(True, 0.1)
+
+    assert transitions[-2:] == [HALF_OPEN, OPEN]
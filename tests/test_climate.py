@@ -0,0 +1,35 @@
+"""Tests for the climate entity schema."""
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from homeassistant.components.climate import HVACMode  # noqa: E402
+
+from custom_components.duwi_home.climate import climate_schema  # noqa: E402
+from custom_components.duwi_home.const import DPCode  # noqa: E402
+
+
+def test_mode_lists_are_lists_built_once():
+    schema = climate_schema("5-001-001", DPCode.AC)
+
+    assert isinstance(schema.hvac_modes, list)
+    assert isinstance(schema.preset_modes, list)
+    assert isinstance(schema.fan_modes, list)
+    assert schema.hvac_modes[-1] == HVACMode.OFF
+    assert schema.preset_modes == ["lock", "half_lock", "unlock"]
+    assert climate_schema("5-001-001", DPCode.AC) is schema
+
+
+def test_mode_temperature_range():
+    schema = climate_schema("5-001-005", DPCode.AC)
+
+    assert schema.mode_temp_range["heat"] == (16, 45)
+    assert "mix" in schema.mode_temp_range
+
+
+def test_floor_heating_without_mode_list():
+    schema = climate_schema("unknown", DPCode.FH)
+
+    assert schema.hvac_modes == [HVACMode.HEAT, HVACMode.OFF]
+    assert schema.preset_modes is None
+    assert schema.fan_modes is None
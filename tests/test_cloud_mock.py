@@ -0,0 +1,61 @@
+"""Tests running the Manager against the mock cloud."""
+import asyncio
+import socket
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from custom_components.duwi_home.duwi_smarthome_sdk.base.customer_api import CustomerApi  # noqa: E402
+from custom_components.duwi_home.duwi_smarthome_sdk.const.const import Code  # noqa: E402
+from tools.cloud_load import build_parser, run  # noqa: E402
+from tools.cloud_mock import MockCloud  # noqa: E402
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_manager_load_against_mock_cloud():
+    args = build_parser().parse_args([
+        "--port", str(free_port()), "--devices", "3", "--rate", "50", "--duration", "0.3",
+        "--commands", "10", "--concurrency", "5", "--seed", "1",
+    ])
+
+    result = asyncio.run(run(args))
+
+    # 2 个主机各 3 个设备, 加 2 个组
+    assert result["devices"] == 8
+    assert result["control_codes"] == {Code.SUCCESS.value: 10}
+    assert result["mock_ws"]["bound"] == 1
+    assert result["ws_queue"]["processed"] == result["ws_queue"]["enqueued"]
+    assert result["ws_push_update_ms"]["count"] > 0
+    assert result["circuit"] == "closed"
+    assert result["mock_http"]["/account/login"]["count"] == 1
+
+
+async def request_with_expired_token(cloud: MockCloud, port: int):
+    await cloud.start("127.0.0.1", port)
+    try:
+        api = CustomerApi(f"http://127.0.0.1:{port}", "", "mock", "mock", "1.0", "1.0", "test",
+                          house_no=cloud.house_no)
+        login = await api.post("/account/login", body={"phone": "mock", "password": "mock"}, auth=False)
+        data = login["data"]
+        await api.update_token(data["accessToken"], data["refreshToken"], data["accessTokenExpireTime"])
+        cloud.expire_tokens()
+        return await api.get("/device/infos", {"houseNo": cloud.house_no})
+    finally:
+        await cloud.stop()
+
+
+def test_expired_token_is_refreshed_once():
+    cloud = MockCloud(devices=1, seed=1)
+
+    data = asyncio.run(request_with_expired_token(cloud, free_port()))
+
+    assert data["code"] == Code.SUCCESS.value
+    assert len(data["data"]["devices"]) == 2
+    assert cloud.stats["/account/token"]["count"] == 1
+    assert cloud.stats["/device/infos"]["count"] == 2
@@ -0,0 +1,77 @@
+"""Tests for request serialization and signing."""
+import asyncio
+import hashlib
+
+from aiohttp import web
+
+from duwi_smarthome_sdk.base.customer_api import CustomerApi, canonical_query, serialize_request
+from duwi_smarthome_sdk.base.middleware import ApiRequest, RetryMiddleware
+from duwi_smarthome_sdk.const.const import Code
+
+APP_SECRET = "app-secret"
+
+
+def test_query_is_sorted_and_cached():
+    request = ApiRequest("GET", "/device/infos", {"name": "living room", "houseNo": "H-1"})
+
+    serialize_request(request)
+
+    # 签名串去掉空白, 查询串保留编码后的原值
+    assert request.sign_string == "houseNo=H-1&name=livingroom"
+    assert request.query == "houseNo=H-1&name=living%20room"
+    assert request.payload is None
+    items = (("houseNo", "H-1"),)
+    assert canonical_query(items) is canonical_query(items)
+
+
+def test_body_is_serialized_compact_and_signed_as_sent():
+    request = ApiRequest("POST", "/device/batchCommandOperate", None, {"deviceNo": "T-1-1", "commands": [1, 2]})
+
+    serialize_request(request)
+
+    assert request.payload == b'{"deviceNo":"T-1-1","commands":[1,2]}'
+    assert request.sign_string == request.payload.decode("utf-8")
+
+
+class SigningCloud:
+    """Checks the sign header against the bytes actually received."""
+
+    def __init__(self, *codes):
+        self.codes = list(codes)
+        self.bodies = []
+        self.valid = []
+
+    async def handle(self, request: web.Request):
+        body = await request.read()
+        sign = hashlib.md5((body.decode("utf-8") + APP_SECRET + request.headers["time"]).encode("utf-8"))
+        self.bodies.append(body)
+        self.valid.append(sign.hexdigest() == request.headers["sign"])
+        return web.json_response({"code": self.codes.pop(0)})
+
+
+async def post_to(cloud: SigningCloud, body):
+    app = web.Application()
+    app.router.add_post("/device/list", cloud.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    try:
+        address = "http://127.0.0.1:%d" % runner.addresses[0][1]
+        api = CustomerApi(address, "", "app-key", APP_SECRET, "1.0", "1.0", "test", access_token="token")
+        for middleware in api.middlewares:
+            if isinstance(middleware, RetryMiddleware):
+                middleware.base_delay = 0
+        return await api.post("/device/list", body=body)
+    finally:
+        await runner.cleanup()
+
+
+def test_retry_resends_the_signed_bytes():
+    cloud = SigningCloud(Code.OPERATION_TIMEOUT.value, Code.SUCCESS.value)
+
+    data = asyncio.run(post_to(cloud, {"houseNo": "H-1", "name": "客厅"}))
+
+    assert data == {"code": Code.SUCCESS.value}
+    assert cloud.valid == [True, True]
+    assert cloud.bodies[0] == cloud.bodies[1] == '{"houseNo":"H-1","name":"\\u5ba2\\u5385"}'.encode("utf-8")
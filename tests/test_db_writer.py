@@ -0,0 +1,74 @@
+"""Tests for the single-thread database writer."""
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from custom_components.duwi_home.duwi_repository_sdk.model.device_value import DeviceValue  # noqa: E402
+from custom_components.duwi_home.duwi_repository_sdk.repo.db_writer import DbWriter  # noqa: E402
+
+
+class StubValueRepository:
+    def __init__(self):
+        self.batches = []
+        self.release = threading.Event()
+
+    def update_device_values(self, device_values):
+        self.release.wait(5)
+        self.batches.append({(v.device_no, v.code): v.value for v in device_values})
+
+
+def value(device_no, code, v):
+    return DeviceValue(device_no=device_no, code=code, value=v)
+
+
+def test_values_written_in_batches_with_latest_value():
+    repository = StubValueRepository()
+    writer = DbWriter(repository)
+
+    # 第一批写入时线程被占用,后续上报合并为一批
+    writer.save_values([value("D-1", "light", 10)])
+    writer.save_values([value("D-1", "light", 20), value("D-2", "switch", "on")])
+    writer.save_values([value("D-1", "light", 30)])
+    repository.release.set()
+    asyncio.run(writer.run(lambda: None))
+
+    assert repository.batches[-1] == {("D-1", "light"): 30, ("D-2", "switch"): "on"}
+    assert len(repository.batches) <= 2
+    assert writer.stats["errors"] == 0
+    writer.close()
+
+
+def test_writes_are_serialized_and_errors_logged():
+    repository = StubValueRepository()
+    repository.release.set()
+    writer = DbWriter(repository)
+    order = []
+
+    def fail():
+        order.append("fail")
+        raise OSError("disk full")
+
+    writer.save_values([value("D-1", "light", 10)])
+    writer.submit(fail)
+    asyncio.run(writer.run(order.append, "rebuild"))
+
+    assert order == ["fail", "rebuild"]
+    assert repository.batches == [{("D-1", "light"): 10}]
+    assert writer.stats["errors"] == 1
+    writer.close()
+
+
+def test_run_after_close_drains_queue_first():
+    repository = StubValueRepository()
+    repository.release.set()
+    writer = DbWriter(repository)
+    writer.save_values([value("D-1", "light", 10)])
+    writer.close()
+
+    writer.save_values([value("D-1", "light", 20)])
+    asyncio.run(writer.run(lambda: None))
+
+    assert repository.batches == [{("D-1", "light"): 10}]
@@ -0,0 +1,35 @@
+"""Tests for the LAN command payload encoding."""
+import json
+
+import pytest
+
+from duwi_lan_sdk.model.device_cmd_message import DeviceCmdMessage, next_trace_id
+
+
+@pytest.mark.parametrize("data", [
+    {"sequence": "T-1", "route": 1, "property": {"switch": "on", "light": 50}},
+    {"sequence": "T-1", "property": {"name": "客厅 \"灯\"", "color": {"h": 1.5, "s": None}}},
+    {"service": {"device_group_cmd_down": {"group_no": "G-1", "property": {}, "service": {}}}},
+])
+def test_to_json_is_compact_dict(data):
+    message = DeviceCmdMessage("trace", "1.0", "device.light", data)
+
+    encoded = message.to_json()
+
+    assert encoded == json.dumps(message.to_dict(), separators=(",", ":"))
+    assert json.loads(encoded) == message.to_dict()
+
+
+def test_type_fragment_does_not_leak_between_types():
+    light = DeviceCmdMessage("t1", "1.0", "device.light", {})
+    curtain = DeviceCmdMessage("t2", "1.0", "device.curtain", {})
+
+    assert json.loads(light.to_json())["type"] == "device.light"
+    assert json.loads(curtain.to_json())["type"] == "device.curtain"
+
+
+def test_trace_ids_are_short_and_unique():
+    trace_ids = [next_trace_id() for _ in range(1000)]
+
+    assert len(set(trace_ids)) == len(trace_ids)
+    assert all(len(trace_id) < 16 for trace_id in trace_ids)
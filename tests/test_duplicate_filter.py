@@ -0,0 +1,42 @@
+"""Tests for the LAN duplicate frame filter."""
+from duwi_lan_sdk.service.duplicate_filter import DuplicateFilter
+
+
+def frame(device_id: bytes, message_id: bytes, payload: bytes = b"payload") -> bytes:
+    return b"\xfa\xaf\x10" + message_id + device_id + payload + b"\xfb\xbf"
+
+
+HOST = bytes.fromhex("A1B2C3D4E5F6")
+OTHER_HOST = bytes.fromhex("A1B2C3D4E5F7")
+
+
+def test_identical_frame_is_duplicate():
+    duplicate_filter = DuplicateFilter()
+
+    assert not duplicate_filter.is_duplicate(frame(HOST, b"\x00\x01"))
+    assert duplicate_filter.is_duplicate(frame(HOST, b"\x00\x01"))
+
+
+def test_frames_differing_in_any_part_are_not_duplicates():
+    duplicate_filter = DuplicateFilter()
+    duplicate_filter.is_duplicate(frame(HOST, b"\x00\x01"))
+
+    assert not duplicate_filter.is_duplicate(frame(OTHER_HOST, b"\x00\x01"))
+    assert not duplicate_filter.is_duplicate(frame(HOST, b"\x00\x02"))
+    assert not duplicate_filter.is_duplicate(frame(HOST, b"\x00\x01", b"other"))
+
+
+def test_frame_outside_window_is_accepted_again():
+    duplicate_filter = DuplicateFilter(window=0)
+    duplicate_filter.is_duplicate(frame(HOST, b"\x00\x01"))
+
+    assert not duplicate_filter.is_duplicate(frame(HOST, b"\x00\x01"))
+
+
+def test_oldest_frames_are_forgotten_when_full():
+    duplicate_filter = DuplicateFilter(max_size=2)
+    for message_id in (b"\x00\x01", b"\x00\x02", b"\x00\x03"):
+        duplicate_filter.is_duplicate(frame(HOST, message_id))
+
+    assert duplicate_filter.is_duplicate(frame(HOST, b"\x00\x03"))
+    assert not duplicate_filter.is_duplicate(frame(HOST, b"\x00\x01"))
@@ -0,0 +1,291 @@
+"""Tests for LanProcess host addressing and acknowledged sends."""
+import asyncio
+import json
+import socket
+
+import pytest
+
+from duwi_lan_sdk.service.lan_process import LanProcess
+from duwi_lan_sdk.util.command import get_send_command
+from tools.lan_emulator import parse_frame
+
+ENTRY_ID = "test-entry"
+HOST = "HOST-1"
+OTHER_HOST = "HOST-2"
+SEEDED_IP = "192.168.1.50"
+OTHER_IP = "192.168.1.51"
+LAN_KEY = "00112233445566778899aabbccddeeff"
+
+
+class RecordingSocket:
+    """Records sent frames; frames sent to ack_addresses are acknowledged like a host would."""
+
+    def __init__(self, lp: LanProcess):
+        self.lp = lp
+        self.ack_addresses = set()
+        self.addresses = []
+        self.frames = []
+
+    def sendto(self, message, address):
+        self.addresses.append(address[0])
+        self.frames.append(message)
+        if address[0] in self.ack_addresses:
+            # 主机按报文序号应答
+            message_id = message[3:5].hex().upper()
+            for host_sequence, waiting_id in list(self.lp._ack_waiters):
+                if waiting_id == message_id:
+                    self.lp._resolve_ack(host_sequence, message_id)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def lan_process(monkeypatch):
+    lp = LanProcess()
+    sock = RecordingSocket(lp)
+    monkeypatch.setattr(lp, "_get_send_socket", lambda: sock)
+    lp.sync_hosts(ENTRY_ID, [HOST], LAN_KEY, {HOST: SEEDED_IP})
+    sock.addresses.clear()
+    sock.frames.clear()
+    return lp, sock
+
+
+def operate(lp: LanProcess) -> dict[str, bool]:
+    return asyncio.run(lp.device_operate_hosts([HOST], "1-002", "T-1-1", "T-1", 1, False, False,
+                                               {"switch": "on"}, timeout=0.05))
+
+
+def test_seeded_host_is_sendable_before_it_replied(lan_process):
+    lp, sock = lan_process
+    sock.ack_addresses.add(SEEDED_IP)
+
+    assert not lp.check_is_online(HOST)
+    assert lp.can_send(HOST)
+    assert operate(lp) == {HOST: True}
+    assert sock.addresses == [SEEDED_IP]
+
+
+def test_unacknowledged_seeded_ip_is_dropped_and_retried_by_multicast(lan_process):
+    lp, sock = lan_process
+
+    assert operate(lp) == {HOST: False}
+
+    assert sock.addresses == [SEEDED_IP, lp.broadcast_ip]
+    assert HOST not in lp.hosts_ip_seeded
+    assert lp.hosts_ip[ENTRY_ID][HOST] == ""
+
+
+def test_unknown_host_cannot_send(lan_process):
+    lp, _ = lan_process
+
+    assert not lp.can_send("HOST-2")
+
+
+def test_every_reconnect_requests_full_state(lan_process):
+    lp, sock = lan_process
+
+    lp._request_resync(HOST)
+    lp._request_resync(HOST)
+
+    assert sock.addresses == [SEEDED_IP, SEEDED_IP]
+
+
+def activate_scene(lp: LanProcess) -> dict[str, bool]:
+    return asyncio.run(lp.activate_scene_hosts([HOST, OTHER_HOST], "S-1", timeout=0.05))
+
+
+def test_scene_is_sent_to_every_host_before_waiting(lan_process):
+    lp, sock = lan_process
+    lp.sync_hosts(ENTRY_ID, [HOST, OTHER_HOST], LAN_KEY, {OTHER_HOST: OTHER_IP})
+    sock.addresses.clear()
+    sock.frames.clear()
+    sock.ack_addresses.update({SEEDED_IP, OTHER_IP})
+
+    assert activate_scene(lp) == {HOST: True, OTHER_HOST: True}
+
+    assert sock.addresses == [SEEDED_IP, OTHER_IP]
+    # 每个主机的报文带各自的序列号和报文序号
+    payloads = [parse_frame(frame, LAN_KEY).payload["data"] for frame in sock.frames]
+    assert [payload["sequence"] for payload in payloads] == [HOST, OTHER_HOST]
+    assert payloads[0]["service"] == {"scene_execute": {"scene_no": "S-1"}}
+    assert sock.frames[0][3:5] != sock.frames[1][3:5]
+
+
+def test_scene_reports_hosts_that_did_not_acknowledge(lan_process):
+    lp, sock = lan_process
+    lp.sync_hosts(ENTRY_ID, [HOST, OTHER_HOST], LAN_KEY, {OTHER_HOST: OTHER_IP})
+    sock.addresses.clear()
+    sock.ack_addresses.add(SEEDED_IP)
+
+    assert activate_scene(lp) == {HOST: True, OTHER_HOST: False}
+    assert sock.addresses == [SEEDED_IP, OTHER_IP, lp.broadcast_ip]
+
+
+# 主机报文中的设备序号是 6 字节
+LAN_HOST = "A1B2C3D4E5F6"
+OTHER_LAN_HOST = "A1B2C3D4E5F7"
+OTHER_ENTRY_ID = "other-entry"
+HOST_IP = "192.168.1.60"
+
+
+class ReceiveSocket:
+    """Delivers the given datagrams like the multicast socket, then stops the receive loop."""
+
+    def __init__(self, lp: LanProcess, datagrams: list[bytes]):
+        self.lp = lp
+        self.datagrams = list(datagrams)
+
+    def bind(self, address):
+        pass
+
+    def setsockopt(self, *args):
+        pass
+
+    def recvmsg(self, size):
+        data = self.datagrams.pop(0)
+        if not self.datagrams:
+            self.lp.cancel()
+        flags = socket.MSG_TRUNC if len(data) > size else 0
+        return data[:size], [], flags, (HOST_IP, 54283)
+
+
+def host_frame(host_sequence: str, property_data: dict) -> bytes:
+    message = {"traceId": "1", "version": "1.0", "type": "device.light",
+               "data": {"sequence": "T-1", "route": 1, "property": property_data}}
+    return get_send_command(LAN_KEY, json.dumps(message), "NON", host_sequence)
+
+
+def receive(lp: LanProcess, monkeypatch, *datagrams: bytes) -> dict[str, list]:
+    """Run the receive loop over datagrams; returns entry_id -> published messages."""
+    published = {}
+    for entry_id in lp.hosts_status:
+        lp.add_message_listener(published.setdefault(entry_id, []).append, entry_id)
+    monkeypatch.setattr(lp, "_create_receive_socket", lambda: ReceiveSocket(lp, list(datagrams)))
+    lp._join_group()
+    return published
+
+
+def test_frames_are_published_only_to_owning_entry(lan_process, monkeypatch):
+    lp, sock = lan_process
+    lp.sync_hosts(ENTRY_ID, [LAN_HOST], LAN_KEY)
+    lp.sync_hosts(OTHER_ENTRY_ID, [OTHER_LAN_HOST], LAN_KEY)
+
+    published = receive(lp, monkeypatch, host_frame(LAN_HOST, {"switch": "on"}))
+
+    assert [message["type"] for message in published[ENTRY_ID]] == ["terminal.host", "device.light"]
+    assert published[OTHER_ENTRY_ID] == []
+    assert lp.check_is_online(LAN_HOST)
+    assert not lp.check_is_online(OTHER_LAN_HOST)
+    assert lp.hosts_ip[ENTRY_ID][LAN_HOST] == HOST_IP
+
+
+def test_host_shared_by_entries_is_published_to_both(lan_process, monkeypatch):
+    lp, _ = lan_process
+    lp.sync_hosts(ENTRY_ID, [LAN_HOST], LAN_KEY)
+    lp.sync_hosts(OTHER_ENTRY_ID, [LAN_HOST], LAN_KEY)
+    lp.sync_hosts(OTHER_ENTRY_ID, [], LAN_KEY)
+
+    published = receive(lp, monkeypatch, host_frame(LAN_HOST, {"switch": "on"}))
+
+    assert lp.get_host_entries(LAN_HOST) == (ENTRY_ID,)
+    assert len(published[ENTRY_ID]) == 2
+    assert published[OTHER_ENTRY_ID] == []
+
+
+def test_frame_from_unknown_host_is_dropped(lan_process, monkeypatch):
+    lp, _ = lan_process
+
+    published = receive(lp, monkeypatch, host_frame(LAN_HOST, {"switch": "on"}))
+
+    assert published[ENTRY_ID] == []
+    assert lp.stats["unknown_host"] == 1
+
+
+def test_large_frame_is_received_whole(lan_process, monkeypatch):
+    lp, _ = lan_process
+    lp.sync_hosts(ENTRY_ID, [LAN_HOST], LAN_KEY)
+    frame = host_frame(LAN_HOST, {"name": "x" * 2000})
+    assert len(frame) > 1024
+
+    published = receive(lp, monkeypatch, frame)
+
+    assert published[ENTRY_ID][-1]["data"]["property"]["name"] == "x" * 2000
+    assert lp.stats["truncated"] == 0
+
+
+def test_truncated_frame_is_counted_and_dropped(monkeypatch):
+    lp = LanProcess(max_datagram_size=64)
+    monkeypatch.setattr(lp, "_get_send_socket", lambda: RecordingSocket(lp))
+    lp.sync_hosts(ENTRY_ID, [LAN_HOST], LAN_KEY)
+
+    published = receive(lp, monkeypatch, host_frame(LAN_HOST, {"switch": "on"}))
+
+    assert published[ENTRY_ID] == []
+    assert lp.stats["received"] == 1
+    assert lp.stats["truncated"] == 1
+    assert not lp.check_is_online(LAN_HOST)
+
+
+def test_frame_with_bad_payload_length_is_undecryptable(lan_process, monkeypatch):
+    lp, _ = lan_process
+    lp.sync_hosts(ENTRY_ID, [LAN_HOST], LAN_KEY)
+    frame = host_frame(LAN_HOST, {"switch": "on"})
+
+    published = receive(lp, monkeypatch, frame[:-3] + frame[-2:])
+
+    assert published[ENTRY_ID] == []
+    assert lp.stats["undecryptable"] == 1
+
+
+def test_repeated_frame_is_dropped_before_decoding(lan_process, monkeypatch):
+    lp, _ = lan_process
+    lp.sync_hosts(ENTRY_ID, [LAN_HOST], LAN_KEY)
+    frame = host_frame(LAN_HOST, {"switch": "on"})
+
+    published = receive(lp, monkeypatch, frame, frame, host_frame(LAN_HOST, {"switch": "on"}))
+
+    assert [message["type"] for message in published[ENTRY_ID]] == ["terminal.host", "device.light", "device.light"]
+    assert lp.stats["duplicate"] == 1
+
+
+def sent_payloads(sock: RecordingSocket) -> list[dict]:
+    return [parse_frame(frame, LAN_KEY).payload for frame in sock.frames]
+
+
+def test_group_command_is_sent_to_each_host_with_its_sequence(lan_process):
+    lp, sock = lan_process
+    lp.sync_hosts(ENTRY_ID, [HOST, OTHER_HOST], LAN_KEY, {OTHER_HOST: OTHER_IP})
+    sock.addresses.clear()
+    sock.frames.clear()
+    sock.ack_addresses.add(SEEDED_IP)
+
+    results = asyncio.run(lp.device_operate_hosts([HOST, OTHER_HOST], "1-002", "G-1", "", 0, True, False,
+                                                  {"switch": "on"}, timeout=0.05))
+
+    assert results == {HOST: True, OTHER_HOST: False}
+    payloads = sent_payloads(sock)[:2]
+    assert [payload["data"]["sequence"] for payload in payloads] == [HOST, OTHER_HOST]
+    assert payloads[0]["data"]["service"] == payloads[1]["data"]["service"] == {
+        "device_group_cmd_down": {"group_no": "G-1", "property": {"switch": "on"}, "service": {}}}
+
+
+def test_virtual_device_is_addressed_by_device_no(lan_process):
+    lp, sock = lan_process
+    sock.ack_addresses.add(SEEDED_IP)
+
+    results = asyncio.run(lp.device_operate_hosts([HOST], "1-002", "V-1", "T-1", 0, False, True,
+                                                  {"switch": "on"}, timeout=0.05))
+
+    assert results == {HOST: True}
+    assert sent_payloads(sock)[0]["data"] == {"sequence": "V-1", "route": 1, "property": {"switch": "on"}}
+
+
+def test_unknown_device_type_is_not_sent(lan_process):
+    lp, sock = lan_process
+
+    results = asyncio.run(lp.device_operate_hosts([HOST], "999-001", "T-1-1", "T-1", 1, False, False,
+                                                  {"switch": "on"}, timeout=0.05))
+
+    assert results == {HOST: False}
+    assert sock.frames == []
@@ -0,0 +1,216 @@
+"""Tests for the Manager's cloud/LAN command dispatch."""
+import asyncio
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from custom_components.duwi_home.duwi_lan_sdk.service.lan_process import LanProcess  # noqa: E402
+from custom_components.duwi_home.duwi_smarthome_sdk.base.customer_api import CustomerApi  # noqa: E402
+from custom_components.duwi_home.duwi_smarthome_sdk.base.customer_device import CustomerDevice  # noqa: E402
+from custom_components.duwi_home.duwi_smarthome_sdk.base.manager import Manager, SharingDeviceListener  # noqa: E402
+from custom_components.duwi_home.duwi_smarthome_sdk.const.const import Code  # noqa: E402
+
+ENTRY_ID = "test-entry"
+HOST = "HOST-1"
+DEVICE_NO = "T-1-1"
+VALUE = "Duwi.RPS.DeviceValue"
+LAN_KEY = "00112233445566778899aabbccddeeff"
+
+
+class StubControl:
+    def __init__(self, code: str):
+        self.code = code
+        self.calls = 0
+
+    async def control(self, is_group, body):
+        self.calls += 1
+        return {"code": self.code}
+
+
+class StubLanOperate:
+    def __init__(self):
+        self.calls = []
+        self.acked = True
+
+    async def __call__(self, host_sequences, *args, **kwargs):
+        self.calls.append(list(host_sequences))
+        return {host_sequence: self.acked for host_sequence in host_sequences}
+
+
+@pytest.fixture
+def lan_process(monkeypatch):
+    lp = LanProcess()
+    # 不发送真实的报文
+    sent = []
+    monkeypatch.setattr(lp, "_send_now", lambda host_sequence, message, address=None: sent.append(host_sequence))
+    monkeypatch.setattr(lp, "device_operate_hosts", StubLanOperate())
+    return lp
+
+
+def create_manager(lp: LanProcess, cloud_code: str) -> Manager:
+    api = CustomerApi("http://cloud.test", "ws://cloud.test", "app-key", "app-secret", "1.0", "1.0", "test",
+                      house_no="H-1")
+    manager = Manager(ENTRY_ID, LAN_KEY, api, lp=lp)
+    manager._control_repository = StubControl(cloud_code)
+    manager.device_map[DEVICE_NO] = CustomerDevice({
+        "deviceNo": DEVICE_NO,
+        "deviceTypeNo": "1-002",
+        "terminalSequence": "T-1",
+        "routeNum": 1,
+        "hosts": [HOST],
+        "value": {"switch": "off"},
+    })
+    manager.host_list = [HOST]
+    return manager
+
+
+def dispatch(manager: Manager):
+    return asyncio.run(manager._dispatch_commands(DEVICE_NO, False, {"switch": "on"}))
+
+
+def test_cloud_success_does_not_touch_lan(lan_process):
+    lan_process.sync_hosts(ENTRY_ID, [HOST], LAN_KEY)
+    manager = create_manager(lan_process, Code.SUCCESS.value)
+
+    assert dispatch(manager)["code"] == Code.SUCCESS.value
+    assert lan_process.device_operate_hosts.calls == []
+
+
+@pytest.mark.parametrize("cloud_code", [
+    Code.CIRCUIT_OPEN.value,
+    Code.SYSTEM_HOUR_RATE_LIMIT.value,
+    Code.OPERATION_TIMEOUT.value,
+])
+def test_cloud_failure_fails_over_to_synced_host_before_it_replied(lan_process, cloud_code):
+    lan_process.sync_hosts(ENTRY_ID, [HOST], LAN_KEY)
+    manager = create_manager(lan_process, cloud_code)
+    assert not lan_process.check_is_online(HOST)
+
+    data = dispatch(manager)
+
+    assert data["code"] == Code.SUCCESS.value
+    assert data["acks"] == {HOST: True}
+    assert lan_process.device_operate_hosts.calls == [[HOST]]
+
+
+def test_lan_command_without_ack_times_out(lan_process):
+    lan_process.sync_hosts(ENTRY_ID, [HOST], LAN_KEY)
+    lan_process.device_operate_hosts.acked = False
+    manager = create_manager(lan_process, Code.CIRCUIT_OPEN.value)
+
+    assert dispatch(manager) == {"code": Code.OPERATION_TIMEOUT.value}
+    assert lan_process.device_operate_hosts.calls == [[HOST]]
+
+
+def test_cloud_rejection_is_not_failed_over(lan_process):
+    lan_process.sync_hosts(ENTRY_ID, [HOST], LAN_KEY)
+    manager = create_manager(lan_process, Code.DEVICE_NOT_EXISTS.value)
+
+    assert dispatch(manager)["code"] == Code.DEVICE_NOT_EXISTS.value
+    assert lan_process.device_operate_hosts.calls == []
+
+
+def test_circuit_open_without_lan_returns_code(lan_process):
+    manager = create_manager(lan_process, Code.CIRCUIT_OPEN.value)
+
+    assert dispatch(manager) == {"code": Code.CIRCUIT_OPEN.value}
+    assert lan_process.device_operate_hosts.calls == []
+
+
+class RecordingListener(SharingDeviceListener):
+    def __init__(self):
+        self.updates = []
+
+    def update_device(self, device, status=None):
+        self.updates.append(status)
+
+
+def lan_report(**status):
+    return {"type": "device.light", "data": {"sequence": "T-1", "route": 1, "property": status}}
+
+
+@pytest.fixture
+def reporting_manager(lan_process):
+    manager = create_manager(lan_process, Code.SUCCESS.value)
+    listener = RecordingListener()
+    manager.add_device_listener(listener)
+    return manager, listener
+
+
+def test_newer_cloud_report_right_after_lan_report_is_applied(reporting_manager):
+    manager, listener = reporting_manager
+
+    manager.handle_lan_message(lan_report(switch="on"))
+    manager._on_device_report(VALUE, DEVICE_NO, {"deviceNo": DEVICE_NO, "switch": "off"})
+
+    assert manager.device_map[DEVICE_NO].value["switch"] == "off"
+    assert listener.updates == [{"switch": "on"}, {"switch": "off"}]
+
+
+def test_same_change_on_both_channels_notifies_once(reporting_manager):
+    manager, listener = reporting_manager
+
+    manager.handle_lan_message(lan_report(switch="on", light=50))
+    manager._on_device_report(VALUE, DEVICE_NO, {"deviceNo": DEVICE_NO, "switch": "on", "light": 60})
+
+    assert listener.updates == [{"switch": "on", "light": 50}, {"light": 60}]
+    assert manager.report_stats["duplicate"] == 1
+
+
+def test_lan_host_offline_is_ignored_in_cloud_mode(reporting_manager):
+    manager, listener = reporting_manager
+    manager.device_map[DEVICE_NO].value["online"] = True
+
+    manager.handle_lan_message({"type": "terminal.host", "data": {"sequence": "T-1", "property": {"online": False}}})
+
+    assert manager.device_map[DEVICE_NO].value["online"] is True
+    assert listener.updates == []
+
+
+def test_resync_snapshot_does_not_override_report_received_during_fetch(reporting_manager):
+    manager, listener = reporting_manager
+
+    async def discover():
+        # 拉取期间收到了更新的上报
+        manager._on_device_report(VALUE, DEVICE_NO, {"deviceNo": DEVICE_NO, "switch": "on"})
+        return {"code": Code.SUCCESS.value, "data": {"devices": [
+            {"deviceNo": DEVICE_NO, "isOnline": True, "value": {"switch": "off", "light": 20}},
+        ]}}
+
+    async def discover_groups():
+        return {"code": Code.SUCCESS.value, "data": {"deviceGroups": []}}
+
+    manager._discover_repository.discover = discover
+    manager._group_repository.discover_groups = discover_groups
+    asyncio.run(manager.resync_values())
+
+    value = manager.device_map[DEVICE_NO].value
+    assert value["switch"] == "on"
+    assert value["light"] == 20
+    assert manager.report_stats["stale"] == 1
+
+
+def test_failed_resync_applies_what_was_fetched_and_schedules_retry(reporting_manager):
+    manager, listener = reporting_manager
+
+    async def discover():
+        return {"code": Code.SUCCESS.value, "data": {"devices": [
+            {"deviceNo": DEVICE_NO, "isOnline": True, "value": {"switch": "on"}},
+        ]}}
+
+    async def discover_groups():
+        return {"code": Code.SYS_ERROR.value}
+
+    async def resync():
+        manager._loop = asyncio.get_running_loop()
+        ok = await manager.resync_values()
+        scheduled = manager._resync_retry is not None
+        manager._cancel_resync_retry()
+        return ok, scheduled
+
+    manager._discover_repository.discover = discover
+    manager._group_repository.discover_groups = discover_groups
+
+    assert asyncio.run(resync()) == (False, True)
+    assert manager.device_map[DEVICE_NO].value["switch"] == "on"
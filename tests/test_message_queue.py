@@ -0,0 +1,69 @@
+"""Tests for the WS message queue and its overflow policies."""
+import asyncio
+
+from duwi_smarthome_sdk.base.message_queue import COALESCE, DROP_OLDEST, WsMessageQueue
+
+VALUE = "Duwi.RPS.DeviceValue"
+
+
+def report(device_no: str, **value):
+    return {"namespace": VALUE, "result": {"msg": {"deviceNo": device_no, **value}}}
+
+
+def drain(queue: WsMessageQueue) -> list[dict]:
+    async def get_all():
+        return [await queue.get() for _ in range(queue.qsize())]
+
+    return asyncio.run(get_all())
+
+
+def test_reports_are_not_coalesced_while_there_is_room():
+    queue = WsMessageQueue(10, COALESCE)
+
+    queue.put(report("D-1", light=10))
+    queue.put(report("D-1", light=20))
+
+    assert [m["result"]["msg"]["light"] for m in drain(queue)] == [10, 20]
+    assert queue.stats["coalesced"] == 0
+
+
+def test_full_queue_coalesces_into_latest_report_of_device():
+    queue = WsMessageQueue(3, COALESCE)
+    queue.put(report("D-1", light=10))
+    queue.put(report("D-2", switch="on"))
+    queue.put(report("D-1", light=20))
+
+    queue.put(report("D-1", light=30, switch="off"))
+
+    messages = [m["result"]["msg"] for m in drain(queue)]
+    assert messages == [
+        {"deviceNo": "D-1", "light": 10},
+        {"deviceNo": "D-2", "switch": "on"},
+        {"deviceNo": "D-1", "light": 30, "switch": "off"},
+    ]
+    assert queue.stats["coalesced"] == 1
+    assert queue.stats["dropped"] == 0
+
+
+def test_full_queue_drops_oldest_when_device_not_queued():
+    queue = WsMessageQueue(2, COALESCE)
+    queue.put(report("D-1", light=10))
+    queue.put(report("D-2", light=20))
+
+    queue.put(report("D-3", light=30))
+    # D-1 已被丢弃,不能再合并到它
+    queue.put(report("D-1", light=40))
+
+    assert [m["result"]["msg"]["deviceNo"] for m in drain(queue)] == ["D-3", "D-1"]
+    assert queue.stats["dropped"] == 2
+
+
+def test_drop_oldest_policy_never_merges():
+    queue = WsMessageQueue(2, DROP_OLDEST)
+    queue.put(report("D-1", light=10))
+    queue.put(report("D-1", light=20))
+
+    queue.put(report("D-1", light=30))
+
+    assert [m["result"]["msg"]["light"] for m in drain(queue)] == [20, 30]
+    assert queue.stats == {"enqueued": 3, "coalesced": 0, "dropped": 1, "processed": 0, "max_depth": 2}
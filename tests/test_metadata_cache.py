@@ -0,0 +1,54 @@
+"""Tests for the house metadata cache."""
+import asyncio
+
+from duwi_smarthome_sdk.base.metadata_cache import ROOM, MetadataCache
+
+
+class Fetch:
+    def __init__(self, *rooms):
+        self.rooms = list(rooms)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return {"code": "10000", "data": {"rooms": self.rooms[min(self.calls, len(self.rooms)) - 1]}}
+
+
+def test_cached_until_invalidated():
+    cache = MetadataCache({ROOM: 3600})
+    fetch = Fetch(["kitchen"], ["kitchen", "bedroom"])
+
+    first = asyncio.run(cache.get("H-1", ROOM, fetch))
+    assert asyncio.run(cache.get("H-1", ROOM, fetch)) is first
+    assert fetch.calls == 1
+
+    cache.invalidate("H-1")
+    data = asyncio.run(cache.get("H-1", ROOM, fetch))
+
+    assert fetch.calls == 2
+    assert data["data"]["rooms"] == ["kitchen", "bedroom"]
+    assert cache.stats["changed"] == 1
+
+
+def test_unchanged_refetch_keeps_data():
+    cache = MetadataCache({ROOM: 3600})
+    fetch = Fetch(["kitchen"])
+    first = asyncio.run(cache.get("H-1", ROOM, fetch))
+    digest = cache.digest("H-1", ROOM)
+
+    cache.invalidate("H-1")
+
+    assert asyncio.run(cache.get("H-1", ROOM, fetch)) is first
+    assert cache.digest("H-1", ROOM) == digest
+    assert cache.stats["changed"] == 0
+
+
+def test_invalidate_other_house_keeps_entry():
+    cache = MetadataCache({ROOM: 3600})
+    fetch = Fetch(["kitchen"])
+    asyncio.run(cache.get("H-1", ROOM, fetch))
+
+    cache.invalidate("H-2")
+    asyncio.run(cache.get("H-1", ROOM, fetch))
+
+    assert fetch.calls == 1
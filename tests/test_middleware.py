@@ -0,0 +1,38 @@
+"""Tests for the cloud request pipeline."""
+import asyncio
+
+from duwi_smarthome_sdk.base.middleware import ApiRequest, RetryMiddleware
+from duwi_smarthome_sdk.const.const import Code
+
+TIMEOUT = {"code": Code.OPERATION_TIMEOUT.value}
+SUCCESS = {"code": Code.SUCCESS.value}
+
+
+class Handler:
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+
+    async def __call__(self, request):
+        self.calls += 1
+        return self.results.pop(0)
+
+
+def test_retry_transient_failure():
+    handler = Handler(TIMEOUT, SUCCESS)
+    retry = RetryMiddleware(base_delay=0)
+
+    data = asyncio.run(retry(ApiRequest("POST", "/device/list"), handler))
+
+    assert data == SUCCESS
+    assert handler.calls == 2
+
+
+def test_non_retryable_request_fails_once():
+    handler = Handler(TIMEOUT, SUCCESS)
+    retry = RetryMiddleware(base_delay=0)
+
+    data = asyncio.run(retry(ApiRequest("POST", "/account/login", auth=False, retry=False), handler))
+
+    assert data == TIMEOUT
+    assert handler.calls == 1
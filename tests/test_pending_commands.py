@@ -0,0 +1,52 @@
+"""Tests for the per-entity pending command table."""
+from pending_commands import PendingCommands
+
+TIMEOUT = 5.0
+
+
+def test_unechoed_keys_are_not_tracked():
+    pending = PendingCommands(TIMEOUT, {"control"})
+
+    sent = pending.add({"control": "open", "control_percent": 50}, 0.0)
+
+    assert list(sent) == ["control_percent"]
+    assert "control" not in pending
+
+
+def test_reconcile_reports_only_keys_that_are_not_pending():
+    pending = PendingCommands(TIMEOUT)
+    pending.add({"switch": "on"}, 0.0)
+
+    assert not pending.reconcile({"switch": "off"})
+    assert "switch" in pending
+    assert pending.reconcile({"light": 20})
+    assert not pending.reconcile({"switch": "on"})
+    assert not pending
+
+
+def test_expire_rolls_back_at_deadline():
+    pending = PendingCommands(TIMEOUT)
+    pending.add({"switch": "on"}, 0.0)
+    value = {"switch": "off"}
+
+    assert not pending.expire(TIMEOUT - 1, value)
+    assert pending.expire(TIMEOUT, value)
+    assert not pending
+    assert value == {"switch": "off"}
+
+
+def test_expire_of_already_reported_value_is_not_a_change():
+    pending = PendingCommands(TIMEOUT)
+    pending.add({"switch": "on"}, 0.0)
+
+    assert not pending.expire(TIMEOUT, {"switch": "on"})
+    assert not pending
+
+
+def test_failed_send_keeps_newer_command():
+    pending = PendingCommands(TIMEOUT)
+    first = pending.add({"light": 50}, 0.0)
+    pending.add({"light": 80}, 1.0)
+
+    assert not pending.discard(first)
+    assert pending.overlay == {"light": 80}
@@ -0,0 +1,54 @@
+"""Tests for the adaptive client-side rate limiter."""
+import asyncio
+
+from duwi_smarthome_sdk.base.rate_limiter import AUTH, CONTROL, DISCOVERY, AdaptiveRateLimiter
+from duwi_smarthome_sdk.const.const import Code
+
+
+def test_endpoint_class():
+    assert AdaptiveRateLimiter.endpoint_class("/device/batchCommandOperate") == CONTROL
+    assert AdaptiveRateLimiter.endpoint_class("/account/login") == AUTH
+    assert AdaptiveRateLimiter.endpoint_class("/device/list") == DISCOVERY
+
+
+def test_hour_throttle_pauses_discovery_but_not_control():
+    limiter = AdaptiveRateLimiter()
+
+    limiter.on_result(CONTROL, Code.SYSTEM_HOUR_RATE_LIMIT.value)
+
+    assert limiter.stats["throttled"] == 1
+    assert limiter.buckets[CONTROL].rate == limiter.buckets[CONTROL].base_rate / 2
+    assert asyncio.run(limiter.acquire(CONTROL))
+    assert not asyncio.run(limiter.acquire(DISCOVERY))
+    assert limiter.stats["rejected"] == 1
+
+
+def test_control_is_sent_on_credit_instead_of_rejected():
+    limiter = AdaptiveRateLimiter()
+    bucket = limiter.buckets[CONTROL]
+    bucket.max_wait = 0
+    bucket.tokens = 0
+
+    assert asyncio.run(limiter.acquire(CONTROL))
+    assert limiter.stats["overdrawn"] == 1
+    assert limiter.stats["rejected"] == 0
+
+
+def test_auth_is_not_throttled():
+    limiter = AdaptiveRateLimiter()
+
+    limiter.on_result(DISCOVERY, Code.SYSTEM_MINUTE_RATE_LIMIT.value)
+
+    assert limiter.buckets[AUTH].blocked_until == 0
+    assert asyncio.run(limiter.acquire(AUTH))
+
+
+def test_success_recovers_rate():
+    limiter = AdaptiveRateLimiter()
+    bucket = limiter.buckets[CONTROL]
+    limiter.on_result(CONTROL, Code.SYSTEM_RATE_LIMIT.value)
+    throttled = bucket.rate
+
+    limiter.on_result(CONTROL, Code.SUCCESS.value)
+
+    assert throttled < bucket.rate <= bucket.base_rate
@@ -0,0 +1,46 @@
+"""Tests for the staggered LAN state resync."""
+from duwi_lan_sdk.service.resync_scheduler import ResyncScheduler
+
+
+def create_scheduler(concurrency=2, hold=3.0, stagger=0.0):
+    return ResyncScheduler(lambda host_sequence: None, concurrency, hold, stagger)
+
+
+def test_concurrency_is_limited_until_hold_ends():
+    scheduler = create_scheduler(concurrency=2)
+    for host_sequence in ("H1", "H2", "H3"):
+        scheduler.request(host_sequence)
+
+    assert scheduler._next_host(0.0) == ("H1", None)
+    assert scheduler._next_host(0.0) == ("H2", None)
+    assert scheduler._next_host(1.0) == (None, 2.0)
+    assert scheduler._next_host(3.0) == ("H3", None)
+
+
+def test_starts_are_staggered():
+    scheduler = create_scheduler(concurrency=10, stagger=1.0)
+    scheduler.request("H1")
+    scheduler.request("H2")
+
+    assert scheduler._next_host(0.0)[0] == "H1"
+    host_sequence, wait = scheduler._next_host(0.0)
+    assert host_sequence is None and 0.5 <= wait <= 1.5
+
+
+def test_pending_request_is_not_duplicated():
+    scheduler = create_scheduler()
+    scheduler.request("H1")
+    scheduler.request("H1")
+
+    assert scheduler.stats["requested"] == 1
+
+
+def test_host_back_online_during_resync_is_resynced_again():
+    scheduler = create_scheduler()
+    scheduler.request("H1")
+    assert scheduler._next_host(0.0) == ("H1", None)
+
+    scheduler.request("H1")
+
+    assert scheduler.stats["requested"] == 2
+    assert scheduler._next_host(0.0) == ("H1", None)
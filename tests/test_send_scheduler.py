@@ -0,0 +1,86 @@
+"""Tests for the LAN send scheduler."""
+import threading
+
+from duwi_lan_sdk.service.send_scheduler import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_CONTROL,
+    PRIORITY_QUERY,
+    PRIORITY_SCENE,
+    SendScheduler,
+)
+
+
+def create_scheduler(host_interval=0.0, max_queue=100):
+    return SendScheduler(lambda host_sequence, message, address: None, host_interval, max_queue)
+
+
+def drain(scheduler: SendScheduler, now=0.0) -> list[bytes]:
+    messages = []
+    while (item := scheduler._next_item(now)[0]) is not None:
+        messages.append(item[1])
+    return messages
+
+
+def test_higher_priority_is_sent_first():
+    scheduler = create_scheduler()
+    scheduler.submit("H1", b"heart", PRIORITY_BACKGROUND)
+    scheduler.submit("H1", b"query", PRIORITY_QUERY)
+    scheduler.submit("H1", b"scene", PRIORITY_SCENE)
+    scheduler.submit("H1", b"control", PRIORITY_CONTROL)
+
+    assert drain(scheduler) == [b"control", b"scene", b"query", b"heart"]
+    assert scheduler.qsize() == 0
+
+
+def test_hosts_take_turns_within_a_priority():
+    scheduler = create_scheduler()
+    for message in (b"a1", b"a2", b"a3"):
+        scheduler.submit("A", message, PRIORITY_CONTROL)
+    scheduler.submit("B", b"b1", PRIORITY_CONTROL)
+
+    assert drain(scheduler) == [b"a1", b"b1", b"a2", b"a3"]
+
+
+def test_host_is_paced_but_other_hosts_are_not_held_back():
+    scheduler = create_scheduler(host_interval=1.0)
+    scheduler.submit("A", b"a1", PRIORITY_CONTROL)
+    scheduler.submit("A", b"a2", PRIORITY_CONTROL)
+    scheduler.submit("B", b"b1", PRIORITY_BACKGROUND)
+
+    assert drain(scheduler, 0.0) == [b"a1", b"b1"]
+    assert scheduler._next_item(0.5) == (None, 0.5)
+    assert scheduler._next_item(1.0)[0] == ("A", b"a2", None)
+
+
+def test_full_queue_drops_lower_priority_first():
+    scheduler = create_scheduler(max_queue=2)
+    scheduler.submit("H1", b"heart", PRIORITY_BACKGROUND)
+    scheduler.submit("H1", b"query", PRIORITY_QUERY)
+
+    assert scheduler.submit("H1", b"control", PRIORITY_CONTROL)
+    # 没有更低优先级的报文可以丢弃
+    assert not scheduler.submit("H1", b"heart2", PRIORITY_BACKGROUND)
+    assert drain(scheduler) == [b"control", b"query"]
+    assert scheduler.stats["dropped"] == 2
+
+
+def test_thread_sends_queued_frames():
+    sent = []
+    done = threading.Event()
+
+    def send(host_sequence, message, address):
+        sent.append((host_sequence, message, address))
+        if len(sent) == 2:
+            done.set()
+
+    scheduler = SendScheduler(send, host_interval=0.0)
+    scheduler.start()
+    try:
+        scheduler.submit("H1", b"m1", PRIORITY_QUERY)
+        scheduler.submit("H1", b"m2", PRIORITY_QUERY, "239.0.0.188")
+        assert done.wait(2)
+    finally:
+        scheduler.stop()
+
+    assert sent == [("H1", b"m1", None), ("H1", b"m2", "239.0.0.188")]
+    assert scheduler.stats["sent"] >= 1
@@ -0,0 +1,94 @@
+"""Tests for the WS keepalive and reconnect."""
+import asyncio
+
+import pytest
+import websockets
+
+from duwi_smarthome_sdk.api import ws as ws_module
+from duwi_smarthome_sdk.api.ws import DeviceSynchronizationWS
+from duwi_smarthome_sdk.base.customer_api import CustomerApi
+
+
+class WsServer:
+    """Records the frames of every connection; echoes KEEPALIVE unless silent."""
+
+    def __init__(self, silent: bool = False):
+        self.silent = silent
+        self.connections = []
+
+    async def handle(self, connection):
+        frames = []
+        self.connections.append(frames)
+        async for message in connection:
+            frames.append(message.split("|")[0])
+            if message == "KEEPALIVE" and not self.silent:
+                await connection.send("KEEPALIVE")
+
+
+@pytest.fixture(autouse=True)
+def fast_keepalive(monkeypatch):
+    monkeypatch.setattr(ws_module, "WS_KEEPALIVE_INTERVAL", 0.02)
+    monkeypatch.setattr(ws_module, "WS_DEAD_TIMEOUT", 0.1)
+    monkeypatch.setattr(ws_module, "WS_RECONNECT_BASE_DELAY", 0)
+
+
+async def run_client(server: WsServer, drive):
+    async with websockets.serve(server.handle, "127.0.0.1", 0) as ws_server:
+        port = ws_server.sockets[0].getsockname()[1]
+        client = CustomerApi("", f"ws://127.0.0.1:{port}", "app-key", "app-secret", "1.0", "1.0", "test",
+                             house_no="H-1")
+        ws = DeviceSynchronizationWS(client)
+        await ws.reconnect()
+        tasks = [asyncio.create_task(ws.listen()), asyncio.create_task(ws.keep_alive())]
+        try:
+            return await drive(ws)
+        finally:
+            await ws.disconnect()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def test_keepalive_echo_measures_rtt():
+    server = WsServer()
+
+    async def drive(ws):
+        while ws.rtt is None:
+            await asyncio.sleep(0.01)
+        return ws.rtt
+
+    rtt = asyncio.run(asyncio.wait_for(run_client(server, drive), 5))
+
+    assert 0 <= rtt < 1
+    assert len(server.connections) == 1
+    assert server.connections[0][:3] == ["LINK", "BIND", "KEEPALIVE"]
+
+
+def test_silent_connection_is_reconnected():
+    server = WsServer(silent=True)
+    windows = []
+
+    async def drive(ws):
+        async def on_reconnect(disconnected_at, reconnected_at):
+            windows.append((disconnected_at, reconnected_at))
+
+        ws.add_reconnect_listener(on_reconnect)
+        while len(server.connections) < 2:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+
+    asyncio.run(asyncio.wait_for(run_client(server, drive), 5))
+
+    assert server.connections[1][:2] == ["LINK", "BIND"]
+    assert len(windows) >= 1
+
+
+def test_concurrent_reconnects_open_one_connection():
+    server = WsServer()
+
+    async def drive(ws):
+        await asyncio.gather(ws.reconnect(), ws.reconnect(), ws.reconnect())
+        return ws.is_connected
+
+    assert asyncio.run(asyncio.wait_for(run_client(server, drive), 5))
+    assert len(server.connections) == 2
@@ -0,0 +1,204 @@
+"""Drive a real Manager against the mock cloud and measure it.
+
+Starts MockCloud, runs the integration's startup sequence (login,
+update_device_cache, save_data_to_local, WS connect) against it, then at the
+same time
+
+* replays WS events at --rate messages/s, either synthesized switch toggles
+  or a recorded stream (--events, one cloud WS message as JSON per line,
+  replayed in order and looped), and
+* sends --commands control requests through Manager.send_commands with
+  --concurrency in flight.
+
+Reports startup phase timings, WS push -> device listener latency, control
+latency and result codes, plus the middleware, WS queue and mock counters.
+
+    python tools/cloud_load.py --devices 100 --rate 200 --duration 30 --commands 500 --throttle 0.02
+
+Runs inside the Home Assistant dev environment (the Manager imports the
+integration package).
+"""
+import argparse
+import asyncio
+from collections import Counter
+import itertools
+import json
+from pathlib import Path
+import sys
+import threading
+import time
+from typing import Any
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from cloud_mock import MockCloud, add_arguments, create_cloud  # noqa: E402
+from lan_benchmark import summarize  # noqa: E402
+
+from custom_components.duwi_home.duwi_lan_sdk.service.lan_process import LanProcess  # noqa: E402
+from custom_components.duwi_home.duwi_smarthome_sdk.base.customer_api import CustomerApi  # noqa: E402
+from custom_components.duwi_home.duwi_smarthome_sdk.base.manager import (  # noqa: E402
+    Manager,
+    SharingDeviceListener,
+)
+from custom_components.duwi_home.duwi_smarthome_sdk.base.metadata_cache import MetadataCache  # noqa: E402
+
+ENTRY_ID = "cloud-load"
+
+
+class PushLatency(SharingDeviceListener):
+    """Match device updates with the values the mock pushed."""
+
+    def __init__(self):
+        self._sent: dict[tuple[str, str], tuple[Any, float]] = {}
+        self._lock = threading.Lock()
+        self.samples: list[float] = []
+
+    def on_push(self, message: dict[str, Any], sent_at: float):
+        msg = message.get("result", {}).get("msg", {})
+        device_no = msg.get("deviceNo") or msg.get("deviceGroupNo")
+        with self._lock:
+            for key, value in msg.items():
+                if key not in ("deviceNo", "deviceGroupNo"):
+                    self._sent[(device_no, key)] = (value, sent_at)
+
+    def update_device(self, device, status=None):
+        now = time.monotonic()
+        with self._lock:
+            for key, value in device.value.items():
+                sent = self._sent.get((device.device_no, key))
+                if sent is not None and sent[0] == value:
+                    self.samples.append(now - sent[1])
+                    del self._sent[(device.device_no, key)]
+
+
+def load_events(path: str | None, cloud: MockCloud):
+    """Recorded WS messages, or switch toggles over every device."""
+    if path:
+        with open(path, encoding="utf-8") as f:
+            events = [json.loads(line) for line in f if line.strip()]
+        return itertools.cycle(events)
+
+    def toggles():
+        for i in itertools.count():
+            for device_no in cloud.devices:
+                yield {"namespace": "Duwi.RPS.DeviceValue", "result": {"code": "success", "msg": {
+                    "deviceNo": device_no, "switch": "on" if i % 2 == 0 else "off"}}}
+
+    return toggles()
+
+
+async def replay(cloud: MockCloud, events, rate: float, duration: float) -> int:
+    if rate <= 0:
+        return 0
+    started = time.monotonic()
+    sent = 0
+    while time.monotonic() - started < duration:
+        await cloud.push(next(events))
+        sent += 1
+        # 按绝对时间调度,不累积误差
+        delay = started + sent / rate - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    return sent
+
+
+async def control(manager: Manager, cloud: MockCloud, commands: int, concurrency: int):
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    device_nos = list(cloud.devices)
+    samples: list[float] = []
+    codes: Counter = Counter()
+
+    async def one(i: int):
+        async with semaphore:
+            started = time.monotonic()
+            result = await manager.send_commands(device_nos[i % len(device_nos)], False,
+                                                 {"switch": "on" if i % 2 else "off"})
+            samples.append(time.monotonic() - started)
+            codes[result.get("code") if result else None] += 1
+
+    await asyncio.gather(*(one(i) for i in range(commands)))
+    return samples, codes
+
+
+async def run(args) -> dict[str, Any]:
+    cloud = create_cloud(args)
+    await cloud.start(args.host, args.port, args.drop_interval)
+    api = CustomerApi(
+        address=f"http://{args.host}:{args.port}",
+        ws_address=f"ws://{args.host}:{args.port}/ws",
+        app_key="mock",
+        app_secret="mock",
+        house_no=cloud.house_no,
+        house_name="Mock house",
+        client_version="load",
+        client_model="load",
+        app_version="load",
+    )
+    manager = Manager(id=ENTRY_ID, house_key=cloud.lan_secret_key, customer_api=api, lp=LanProcess(),
+                      metadata_cache=MetadataCache())
+    latency = PushLatency()
+    cloud.push_listeners.append(latency.on_push)
+    manager.add_device_listener(latency)
+    tasks: list[asyncio.Task] = []
+    startup: dict[str, float] = {}
+    try:
+        started = time.monotonic()
+        await manager.init_manager("mock", "mock")
+        startup["login_s"] = time.monotonic() - started
+        await manager.update_device_cache()
+        startup["device_cache_s"] = time.monotonic() - started
+        await manager.save_data_to_local()
+        startup["save_local_s"] = time.monotonic() - started
+        await manager.ws.reconnect()
+        startup["ws_connected_s"] = time.monotonic() - started
+        devices = len(manager.device_map)
+        loop = asyncio.get_running_loop()
+        tasks = [loop.create_task(manager.ws.listen()), loop.create_task(manager.ws.keep_alive()),
+                 loop.create_task(manager.token_scheduler())]
+
+        pushed, (control_samples, codes) = await asyncio.gather(
+            replay(cloud, load_events(args.events, cloud), args.rate, args.duration),
+            control(manager, cloud, args.commands, args.concurrency),
+        )
+        # 等待队列处理完
+        deadline = time.monotonic() + 5
+        while manager.ws.queue.qsize() and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+    finally:
+        await manager.unload(clear_local=True)
+        for task in tasks:
+            task.cancel()
+        await cloud.stop()
+
+    return {
+        "startup": {key: round(value, 3) for key, value in startup.items()},
+        "devices": devices,
+        "ws_pushed": pushed,
+        "ws_push_update_ms": summarize(latency.samples),
+        "ws_queue": manager.ws.queue.stats,
+        "ws_rtt_ms": round(manager.ws.rtt * 1000, 2) if manager.ws.rtt is not None else None,
+        "control_ms": summarize(control_samples),
+        "control_codes": dict(codes),
+        "api_timing": api.timing.stats,
+        "circuit": api.circuit_breaker.state,
+        "report_stats": manager.report_stats,
+        "mock_http": cloud.stats,
+        "mock_ws": cloud.ws_stats,
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    parser.add_argument("--events", default=None, help="recorded WS messages, one JSON per line")
+    parser.add_argument("--rate", type=float, default=50.0, help="WS messages per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="replay time (s)")
+    parser.add_argument("--commands", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    return parser
+
+
+if __name__ == "__main__":
+    print(json.dumps(asyncio.run(run(build_parser().parse_args())), indent=2, ensure_ascii=False))
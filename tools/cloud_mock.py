@@ -0,0 +1,330 @@
+"""Local stand-in for the Duwi cloud: REST endpoints and the WS push channel.
+
+Serves the endpoints CustomerApi uses (login, token refresh, house / floor /
+room / terminal / scene / device / group infos, device and group control,
+scene execute) and the LINK / BIND / KEEPALIVE WebSocket protocol. Control
+requests change the stored values and are pushed back over the WS like the
+real cloud does.
+
+Faults can be injected: latency and jitter on every request, a share of
+requests answered with a throttle code or a system error, and dropping all
+WS connections on demand or periodically.
+
+    python tools/cloud_mock.py --port 8765 --hosts 4 --devices 50 --latency 0.05 --throttle 0.02
+
+Point an entry at it with address ``http://127.0.0.1:8765`` and ws address
+``ws://127.0.0.1:8765/ws``. Needs aiohttp.
+"""
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+import json
+import logging
+import random
+import time
+from typing import Any, Callable
+import uuid
+
+from aiohttp import WSMsgType, web
+
+_LOGGER = logging.getLogger("cloud_mock")
+
+SUCCESS = "10000"
+SYS_ERROR = "10001"
+ACCESS_TOKEN_ERROR = "10005"
+REFRESH_TOKEN_ERROR = "10006"
+DATA_NOT_EXISTS = "10009"
+SYSTEM_RATE_LIMIT = "99004"
+
+# 不需要accessToken的接口
+PUBLIC_PATHS = {"/account/login", "/account/token", "/ws"}
+
+
+class MockCloud:
+    """House data, tokens and WS sessions of the mock cloud."""
+
+    def __init__(self, house_no: str = "MOCK0001", lan_secret_key: str = "00112233445566778899aabbccddeeff",
+                 hosts: int = 2, devices: int = 10, groups: int = 2, scenes: int = 3,
+                 latency: float = 0.0, jitter: float = 0.0, throttle: float = 0.0,
+                 throttle_code: str = SYSTEM_RATE_LIMIT, error_rate: float = 0.0,
+                 token_lifetime: float = 7200, seed: int | None = None):
+        self.house_no = house_no
+        self.lan_secret_key = lan_secret_key
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle = throttle
+        self.throttle_code = throttle_code
+        self.error_rate = error_rate
+        self.token_lifetime = token_lifetime
+        self.rng = random.Random(seed)
+        self.access_tokens: dict[str, float] = {}
+        self.refresh_tokens: set[str] = set()
+        self.sockets: set[web.WebSocketResponse] = set()
+        # 推送回调 (消息, 发送时间)
+        self.push_listeners: list[Callable[[dict[str, Any], float], None]] = []
+        self.stats: dict[str, dict[str, int]] = {}
+        self.ws_stats = {"linked": 0, "bound": 0, "keepalive": 0, "pushed": 0, "dropped": 0}
+        self._build_house(hosts, devices, groups, scenes)
+        self._runner: web.AppRunner | None = None
+        self._drop_task: asyncio.Task | None = None
+
+    def _build_house(self, hosts: int, devices: int, groups: int, scenes: int):
+        self.floors = [{"floorNo": "F1", "floorName": "1F", "houseNo": self.house_no}]
+        self.rooms = [{"roomNo": "R1", "roomName": "客厅", "floorNo": "F1", "houseNo": self.house_no}]
+        host_sequences = [f"E0{i:010X}" for i in range(hosts)]
+        self.terminals = [{
+            "terminalSequence": sequence,
+            "hostSequence": sequence,
+            "terminalName": f"主机{i + 1}",
+            "productModel": "DXH",
+            "isFollowOnline": True,
+            "houseNo": self.house_no,
+        } for i, sequence in enumerate(host_sequences)]
+        self.devices: dict[str, dict[str, Any]] = {}
+        for sequence in host_sequences:
+            for route in range(1, devices + 1):
+                device_no = f"{sequence}-{route}"
+                self.devices[device_no] = {
+                    "deviceNo": device_no,
+                    "deviceName": f"灯{route}",
+                    "deviceTypeNo": "1-001",
+                    "deviceSubTypeNo": "1-001-001",
+                    "terminalSequence": sequence,
+                    "routeNum": route,
+                    "houseNo": self.house_no,
+                    "roomNo": "R1",
+                    "isUse": 1,
+                    "isOnline": True,
+                    "value": {"switch": "off"},
+                }
+        self.groups: dict[str, dict[str, Any]] = {
+            f"G{i:04d}": {
+                "deviceGroupNo": f"G{i:04d}",
+                "deviceGroupName": f"群组{i + 1}",
+                "deviceGroupType": "Breaker",
+                "syncHostSequences": host_sequences,
+                "houseNo": self.house_no,
+                "roomNo": "R1",
+                "value": {"switch": "off"},
+            } for i in range(groups)
+        }
+        self.scenes = [{
+            "sceneNo": f"S{i:04d}",
+            "sceneName": f"场景{i + 1}",
+            "houseNo": self.house_no,
+            "roomNo": "R1",
+            "isUse": True,
+            "isManualExecute": True,
+            "executeWay": 0,
+            "syncHostSequences": host_sequences,
+        } for i in range(scenes)]
+
+    # ---- tokens ----
+
+    def _issue_tokens(self) -> dict[str, Any]:
+        access_token, refresh_token = uuid.uuid4().hex, uuid.uuid4().hex
+        expires = time.time() + self.token_lifetime
+        self.access_tokens[access_token] = expires
+        self.refresh_tokens.add(refresh_token)
+        return {
+            "accessToken": access_token,
+            "refreshToken": refresh_token,
+            "accessTokenExpireTime": (datetime.now() + timedelta(seconds=self.token_lifetime)).isoformat(),
+        }
+
+    def _token_valid(self, token: str | None) -> bool:
+        return token is not None and self.access_tokens.get(token, 0) > time.time()
+
+    def expire_tokens(self):
+        """Invalidate every access token, the next request has to refresh."""
+        self.access_tokens.clear()
+
+    # ---- ws ----
+
+    async def push(self, message: dict[str, Any]):
+        """Send a message to every bound WS session."""
+        text = json.dumps(message, ensure_ascii=False)
+        sent_at = time.monotonic()
+        for listener in self.push_listeners:
+            listener(message, sent_at)
+        for ws in list(self.sockets):
+            try:
+                await ws.send_str(text)
+                self.ws_stats["pushed"] += 1
+            except ConnectionError:
+                self.sockets.discard(ws)
+
+    async def push_value(self, device_no: str, status: dict[str, Any], group: bool = False):
+        key = "deviceGroupNo" if group else "deviceNo"
+        namespace = "Duwi.RPS.DeviceGroupValue" if group else "Duwi.RPS.DeviceValue"
+        await self.push({"namespace": namespace, "result": {"code": "success", "msg": {key: device_no, **status}}})
+
+    async def drop_connections(self):
+        """Close every WS session as if the cloud restarted."""
+        for ws in list(self.sockets):
+            self.ws_stats["dropped"] += 1
+            await ws.close()
+        self.sockets.clear()
+
+    async def _drop_periodically(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await self.drop_connections()
+
+    # ---- http ----
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._inject])
+        app.router.add_post("/account/login", self._login)
+        app.router.add_put("/account/token", self._refresh)
+        app.router.add_get("/house/infos", self._houses)
+        app.router.add_get("/floor/infos", self._list("floors", lambda: self.floors))
+        app.router.add_get("/room/infos", self._list("rooms", lambda: self.rooms))
+        app.router.add_get("/terminal/infos", self._list("terminals", lambda: self.terminals))
+        app.router.add_get("/scene/infos", self._list("scenes", lambda: self.scenes))
+        app.router.add_get("/device/infos", self._list("devices", lambda: list(self.devices.values())))
+        app.router.add_get("/deviceGroup/infos", self._list("deviceGroups", lambda: list(self.groups.values())))
+        app.router.add_post("/device/batchCommandOperate", self._control)
+        app.router.add_post("/deviceGroup/batchCommandOperate", self._control_group)
+        app.router.add_post("/scene/execute", self._scene)
+        app.router.add_get("/ws", self._ws)
+        return app
+
+    @web.middleware
+    async def _inject(self, request: web.Request, handler):
+        stat = self.stats.setdefault(request.path, {"count": 0, "throttled": 0, "errors": 0})
+        stat["count"] += 1
+        if request.path == "/ws":
+            return await handler(request)
+        delay = self.latency + self.rng.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.rng.random() < self.throttle:
+            stat["throttled"] += 1
+            return web.json_response({"code": self.throttle_code, "message": "rate limit"})
+        if self.rng.random() < self.error_rate:
+            stat["errors"] += 1
+            return web.json_response({"code": SYS_ERROR, "message": "system error"})
+        if request.path not in PUBLIC_PATHS and not self._token_valid(request.headers.get("accessToken")):
+            return web.json_response({"code": ACCESS_TOKEN_ERROR, "message": "accessToken invalid"})
+        return await handler(request)
+
+    async def _login(self, request: web.Request):
+        return web.json_response({"code": SUCCESS, "data": self._issue_tokens()})
+
+    async def _refresh(self, request: web.Request):
+        body = await request.json()
+        if body.get("refreshToken") not in self.refresh_tokens:
+            return web.json_response({"code": REFRESH_TOKEN_ERROR, "message": "refreshToken invalid"})
+        self.refresh_tokens.discard(body["refreshToken"])
+        return web.json_response({"code": SUCCESS, "data": self._issue_tokens()})
+
+    async def _houses(self, request: web.Request):
+        return web.json_response({"code": SUCCESS, "data": {"houseInfos": [{
+            "houseNo": self.house_no, "houseName": "Mock house", "lanSecretKey": self.lan_secret_key,
+        }]}})
+
+    def _list(self, key: str, items: Callable[[], list[dict[str, Any]]]):
+        async def handle(request: web.Request):
+            return web.json_response({"code": SUCCESS, "data": {key: items()}})
+
+        return handle
+
+    async def _control(self, request: web.Request):
+        return await self._apply(await request.json(), "deviceNo", self.devices, False)
+
+    async def _control_group(self, request: web.Request):
+        return await self._apply(await request.json(), "deviceGroupNo", self.groups, True)
+
+    async def _apply(self, body: dict[str, Any], key: str, items: dict[str, dict[str, Any]], group: bool):
+        item = items.get(body.get(key))
+        if item is None:
+            return web.json_response({"code": DATA_NOT_EXISTS, "message": "not found"})
+        status = {command["code"]: command["value"] for command in body.get("commands", [])}
+        item["value"].update(status)
+        # 和云端一样,控制结果通过ws推送
+        asyncio.get_running_loop().create_task(self.push_value(item[key], status, group))
+        return web.json_response({"code": SUCCESS, "message": "success"})
+
+    async def _scene(self, request: web.Request):
+        return web.json_response({"code": SUCCESS, "message": "success"})
+
+    async def _ws(self, request: web.Request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                command, _, payload = msg.data.partition("|")
+                if command == "KEEPALIVE":
+                    self.ws_stats["keepalive"] += 1
+                    await ws.send_str("KEEPALIVE")
+                elif command == "LINK":
+                    self.ws_stats["linked"] += 1
+                    await ws.send_str(json.dumps({"namespace": "Duwi.RPS.Link", "result": {"code": "success"}}))
+                elif command == "BIND":
+                    data = json.loads(payload or "{}")
+                    if data.get("houseNo") == self.house_no and self._token_valid(data.get("accessToken")):
+                        self.ws_stats["bound"] += 1
+                        self.sockets.add(ws)
+        finally:
+            self.sockets.discard(ws)
+        return ws
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765, drop_interval: float = 0.0):
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        if drop_interval > 0:
+            self._drop_task = asyncio.get_running_loop().create_task(self._drop_periodically(drop_interval))
+
+    async def stop(self):
+        if self._drop_task is not None:
+            self._drop_task.cancel()
+        await self.drop_connections()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--hosts", type=int, default=2)
+    parser.add_argument("--devices", type=int, default=10, help="devices per host")
+    parser.add_argument("--groups", type=int, default=2)
+    parser.add_argument("--scenes", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.0, help="per request latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency (s)")
+    parser.add_argument("--throttle", type=float, default=0.0, help="share of requests answered with 99004")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 10001")
+    parser.add_argument("--drop-interval", type=float, default=0.0, help="drop all WS connections every N s")
+    parser.add_argument("--token-lifetime", type=float, default=7200)
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def create_cloud(args) -> MockCloud:
+    return MockCloud(hosts=args.hosts, devices=args.devices, groups=args.groups, scenes=args.scenes,
+                     latency=args.latency, jitter=args.jitter, throttle=args.throttle,
+                     error_rate=args.error_rate, token_lifetime=args.token_lifetime, seed=args.seed)
+
+
+async def _main(args):
+    cloud = create_cloud(args)
+    await cloud.start(args.host, args.port, args.drop_interval)
+    print(f"mock cloud on http://{args.host}:{args.port}, ws://{args.host}:{args.port}/ws")
+    try:
+        while True:
+            await asyncio.sleep(10)
+            print(json.dumps({"http": cloud.stats, "ws": cloud.ws_stats}))
+    finally:
+        await cloud.stop()
+
+
+if __name__ == "__main__":
+    _parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(_parser)
+    try:
+        asyncio.run(_main(_parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,201 @@
+"""Benchmark the LAN path against emulated hosts.
+
+Starts a HostEmulator on loopback, a real LanProcess pointed at it, and
+measures:
+
+* command -> ACK latency of LanProcess.device_operate_hosts
+* report -> update latency, either up to the LanProcess message listener
+  (default) or through Manager.handle_lan_message up to the device listener
+  (``--manager``, needs the Home Assistant dev environment)
+
+    python tools/lan_benchmark.py --hosts 8 --devices 40 --rate 20 --commands 500
+"""
+import argparse
+import asyncio
+import json
+from pathlib import Path
+import statistics
+import sys
+import threading
+import time
+from typing import Any
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from lan_emulator import DEFAULT_PORT, HostEmulator  # noqa: E402
+
+ENTRY_ID = "lan-benchmark"
+LAN_SECRET_KEY = "00112233445566778899aabbccddeeff"
+
+
+def summarize(samples: list[float]) -> dict[str, Any]:
+    """Latency percentiles in milliseconds."""
+    if not samples:
+        return {"count": 0}
+    ms = sorted(s * 1000 for s in samples)
+    quantiles = statistics.quantiles(ms, n=100, method="inclusive") if len(ms) > 1 else ms * 99
+    return {
+        "count": len(ms),
+        "p50": round(quantiles[49], 2),
+        "p95": round(quantiles[94], 2),
+        "p99": round(quantiles[98], 2),
+        "max": round(ms[-1], 2),
+    }
+
+
+class ReportLatency:
+    """Match received updates with the emulator's reports by (device, switch value)."""
+
+    def __init__(self):
+        self._sent: dict[str, tuple[str, float]] = {}
+        self._lock = threading.Lock()
+        self.samples: list[float] = []
+
+    def on_report(self, device_no: str, status: dict[str, Any], sent_at: float):
+        if "switch" in status:
+            with self._lock:
+                self._sent[device_no] = (status["switch"], sent_at)
+
+    def on_update(self, device_no: str, switch: Any):
+        now = time.monotonic()
+        with self._lock:
+            sent = self._sent.get(device_no)
+            if sent is not None and sent[0] == switch:
+                self.samples.append(now - sent[1])
+                del self._sent[device_no]
+
+
+def _import_lan_process(manager: bool):
+    if manager:
+        # 和集成使用同一个模块,Manager 才能识别 LanProcess
+        sys.path.insert(0, str(ROOT))
+        from custom_components.duwi_home.duwi_lan_sdk.service.lan_process import LanProcess
+    else:
+        from duwi_lan_sdk.service.lan_process import LanProcess
+    return LanProcess
+
+
+def _create_manager(lp, emulator: HostEmulator, latency: ReportLatency):
+    from custom_components.duwi_home.duwi_smarthome_sdk.base.customer_api import CustomerApi
+    from custom_components.duwi_home.duwi_smarthome_sdk.base.customer_device import CustomerDevice
+    from custom_components.duwi_home.duwi_smarthome_sdk.base.manager import Manager, SharingDeviceListener
+
+    class BenchmarkListener(SharingDeviceListener):
+        def update_device(self, device, status=None):
+            latency.on_update(device.device_no, device.value.get("switch"))
+
+    api = CustomerApi("http://127.0.0.1:9", "ws://127.0.0.1:9", "benchmark", "benchmark", "0.0.0", "0.0.0",
+                      "benchmark")
+    manager = Manager(ENTRY_ID, LAN_SECRET_KEY, customer_api=api, lp=lp)
+    # 只走局域网
+    manager._is_connected = False
+    for device in emulator.devices():
+        manager.device_map[device.device_no] = CustomerDevice({
+            "deviceNo": device.device_no,
+            "deviceTypeNo": device.device_type_no,
+            "terminalSequence": device.terminal_sequence,
+            "routeNum": device.route_num,
+            "host": device.terminal_sequence,
+            "value": dict(device.value),
+        })
+        manager.device_map[device.device_no].hosts = [device.terminal_sequence]
+    manager.add_device_listener(BenchmarkListener())
+    lp.add_message_listener(manager.handle_lan_message, ENTRY_ID)
+    return manager
+
+
+async def _wait_online(lp, hosts: list[str], timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if set(lp.get_online_hosts(ENTRY_ID)) >= set(hosts):
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+
+async def run(args) -> dict[str, Any]:
+    LanProcess = _import_lan_process(args.manager)
+    emulator = HostEmulator(LAN_SECRET_KEY, args.hosts, args.devices, args.port, args.rate, args.loss,
+                            args.latency, args.jitter, args.seed)
+    latency = ReportLatency()
+    emulator.add_report_listener(latency.on_report)
+    await emulator.start()
+
+    lp = LanProcess()
+    lp.lan_port = args.port
+    manager = None
+    if args.manager:
+        manager = _create_manager(lp, emulator, latency)
+    else:
+        def on_message(message: dict[str, Any]):
+            data = message.get("data", {})
+            if "route" in data and "switch" in data.get("property", {}):
+                latency.on_update(f"{data['sequence']}-{data['route']}", data["property"]["switch"])
+
+        lp.add_message_listener(on_message, ENTRY_ID)
+    hosts = list(emulator.addresses)
+    started = time.monotonic()
+    lp.sync_hosts(ENTRY_ID, hosts, LAN_SECRET_KEY, emulator.addresses)
+    lp.start()
+    try:
+        online = await _wait_online(lp, hosts, args.online_timeout)
+        online_time = time.monotonic() - started
+
+        # 指令 -> 应答
+        devices = emulator.devices()
+        ack_samples, unacked = [], 0
+        for i in range(args.commands):
+            device = devices[i % len(devices)]
+            t0 = time.monotonic()
+            results = await lp.device_operate_hosts(
+                [device.terminal_sequence], device.device_type_no, device.device_no, device.terminal_sequence,
+                device.route_num, False, False, {"switch": "on" if i % 2 else "off"})
+            if all(results.values()):
+                ack_samples.append(time.monotonic() - t0)
+            else:
+                unacked += 1
+            if args.command_interval:
+                await asyncio.sleep(args.command_interval)
+
+        # 上报 -> 更新
+        await asyncio.sleep(args.duration)
+    finally:
+        lp.stop()
+        lp.remove_message_listener(ENTRY_ID)
+        await emulator.stop()
+
+    return {
+        "hosts_online": online,
+        "online_time_s": round(online_time, 3),
+        "command_ack_ms": summarize(ack_samples),
+        "commands_unacked": unacked,
+        "report_update_ms": summarize(latency.samples),
+        "lan_stats": lp.stats,
+        "send_stats": lp._scheduler.stats,
+        "emulator_stats": emulator.stats(),
+        "manager_report_stats": manager.report_stats if manager is not None else None,
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=2)
+    parser.add_argument("--devices", type=int, default=10, help="devices per host")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help="LAN port, use another one when an integration runs on this machine")
+    parser.add_argument("--rate", type=float, default=5.0, help="reports per second per host")
+    parser.add_argument("--loss", type=float, default=0.0, help="packet loss ratio, both directions")
+    parser.add_argument("--latency", type=float, default=0.0, help="one-way latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency (s)")
+    parser.add_argument("--commands", type=int, default=100)
+    parser.add_argument("--command-interval", type=float, default=0.0, help="pause between commands (s)")
+    parser.add_argument("--duration", type=float, default=5.0, help="report measuring time after commands (s)")
+    parser.add_argument("--online-timeout", type=float, default=15.0)
+    parser.add_argument("--manager", action="store_true", help="measure through Manager.handle_lan_message")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser
+
+
+if __name__ == "__main__":
+    print(json.dumps(asyncio.run(run(build_parser().parse_args())), indent=2))
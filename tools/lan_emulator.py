@@ -0,0 +1,280 @@
+"""Emulated Duwi DXH hosts speaking the LAN protocol over loopback.
+
+Each emulated host binds its own loopback address (127.0.0.2, 127.0.0.3, ...)
+on the LAN port, answers heartbeats and CON frames with ACKs, replies to
+query_info / terminal_data_up, applies device and group commands and reports
+device state at a configurable rate. Packet loss and latency are injected on
+both directions.
+
+    python tools/lan_emulator.py --hosts 4 --devices 50 --key <lan secret key>
+
+The emulator only needs the LAN SDK (and ``cryptography``); see
+lan_benchmark.py for driving LanProcess and the Manager against it.
+"""
+import argparse
+import asyncio
+from dataclasses import dataclass, field
+import json
+import logging
+from pathlib import Path
+import random
+import socket
+import sys
+import time
+from typing import Any, Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "custom_components" / "duwi_home"))
+
+from duwi_lan_sdk.const.const import BEGIN_COMMAND, DEVICE_ID, END_COMMAND, LAN_PORT  # noqa: E402
+from duwi_lan_sdk.model.device_cmd_message import DeviceCmdMessage, next_trace_id  # noqa: E402
+from duwi_lan_sdk.util.ace import decrypt_AES  # noqa: E402
+from duwi_lan_sdk.util.command import get_send_command  # noqa: E402
+
+_LOGGER = logging.getLogger("lan_emulator")
+
+DEFAULT_PORT = LAN_PORT
+HA_ADDRESS = "127.0.0.1"
+
+# 报文类型 T
+LAN_CON = 0b00
+LAN_NON = 0b01
+LAN_ACK = 0b10
+
+_BEGIN = bytes.fromhex(BEGIN_COMMAND)
+_END = bytes.fromhex(END_COMMAND)
+_HA_DEVICE_ID = bytes.fromhex(DEVICE_ID)
+
+
+@dataclass
+class Frame:
+    lan_type: int
+    message_id: bytes
+    device_id: bytes
+    payload: dict[str, Any] | None
+
+
+def parse_frame(data: bytes, lan_secret_key: str) -> Frame | None:
+    """Parse a FAAF...FBBF frame, decrypting the payload with the house key."""
+    if len(data) < 13 or data[:2] != _BEGIN or data[-2:] != _END:
+        return None
+    lan_type = (data[2] >> 4) & 0b11
+    len_bytes = data[2] & 0x0F
+    frame = Frame(lan_type, data[3:5], data[5:11], None)
+    if len_bytes:
+        payload_len = int.from_bytes(data[11:11 + len_bytes], "big")
+        payload = data[11 + len_bytes:-2]
+        if len(payload) != payload_len:
+            return None
+        frame.payload = json.loads(decrypt_AES(lan_secret_key, payload))
+    return frame
+
+
+def build_ack(message_id: bytes, device_id: bytes) -> bytes:
+    return _BEGIN + bytes([LAN_ACK << 4]) + message_id + device_id + _END
+
+
+@dataclass
+class EmulatedDevice:
+    device_no: str
+    device_type_no: str
+    message_type: str
+    terminal_sequence: str
+    route_num: int
+    value: dict[str, Any] = field(default_factory=lambda: {"switch": "off"})
+
+
+class EmulatedHost(asyncio.DatagramProtocol):
+    """A single DXH host with its devices."""
+
+    def __init__(self, sequence: str, ip: str, lan_secret_key: str, devices: list[EmulatedDevice],
+                 target: tuple[str, int], loss: float = 0.0, latency: float = 0.0, jitter: float = 0.0,
+                 rng: random.Random | None = None):
+        self.sequence = sequence
+        self.ip = ip
+        self.lan_secret_key = lan_secret_key
+        self.devices = {(d.terminal_sequence, d.route_num): d for d in devices}
+        self.target = target
+        self.loss = loss
+        self.latency = latency
+        self.jitter = jitter
+        self.rng = rng or random.Random()
+        self.transport: asyncio.DatagramTransport | None = None
+        self._device_id = bytes.fromhex(sequence)
+        # 上报回调 (device_no, property, 发送时间)
+        self.report_listeners: list[Callable[[str, dict[str, Any], float], None]] = []
+        self.stats = {"received": 0, "lost": 0, "acked": 0, "commands": 0, "reports": 0, "dumps": 0}
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr):
+        self.stats["received"] += 1
+        if self.rng.random() < self.loss:
+            self.stats["lost"] += 1
+            return
+        try:
+            frame = parse_frame(data, self.lan_secret_key)
+        except ValueError:
+            return
+        if frame is None or frame.device_id != _HA_DEVICE_ID:
+            return
+        if frame.lan_type == LAN_CON:
+            self.stats["acked"] += 1
+            self._sendto(build_ack(frame.message_id, self._device_id))
+        if frame.payload is not None:
+            self._handle(frame.payload)
+
+    def _handle(self, message: dict[str, Any]):
+        message_type = message.get("type", "")
+        data = message.get("data", {})
+        if message_type == "sys.op":
+            if data.get("terminal_data_up", {}).get("sequence") == self.sequence:
+                self.stats["dumps"] += 1
+                for device in self.devices.values():
+                    self.report(device)
+        elif message_type == "terminal.host":
+            if data.get("sequence") != self.sequence:
+                return
+            service = data.get("service", {})
+            if "query_info" in service:
+                self._send_message("terminal.host",
+                                   {"sequence": self.sequence, "property": {"use_storage_percent": 10}})
+            if (group := service.get("device_group_cmd_down")) is not None:
+                self.stats["commands"] += 1
+                self._send_message("terminal.host", {"sequence": self.sequence, "service": {
+                    "device_group_cmd_up": {"group_no": group["group_no"], "property": group["property"]}}})
+        elif (device := self.devices.get((data.get("sequence"), data.get("route")))) is not None:
+            self.stats["commands"] += 1
+            device.value.update(data.get("property", {}))
+            self.report(device, data.get("property", {}))
+
+    def report(self, device: EmulatedDevice, status: dict[str, Any] | None = None):
+        """Report device state, the whole value when status is not given."""
+        status = dict(device.value if status is None else status)
+        self.stats["reports"] += 1
+        sent_at = time.monotonic()
+        for listener in self.report_listeners:
+            listener(device.device_no, status, sent_at)
+        self._send_message(device.message_type, {
+            "sequence": device.terminal_sequence, "route": device.route_num, "property": status})
+
+    def toggle(self, device: EmulatedDevice):
+        """Flip the switch as if pressed on the wall."""
+        device.value["switch"] = "off" if device.value.get("switch") == "on" else "on"
+        self.report(device, {"switch": device.value["switch"]})
+
+    def _send_message(self, message_type: str, data: dict[str, Any]):
+        message = DeviceCmdMessage(next_trace_id(), "1.0", message_type, data)
+        self._sendto(get_send_command(self.lan_secret_key, message.to_json(), "NON", self.sequence))
+
+    def _sendto(self, frame: bytes):
+        if self.transport is None:
+            return
+        if self.rng.random() < self.loss:
+            self.stats["lost"] += 1
+            return
+        delay = self.latency + self.rng.uniform(0, self.jitter)
+        if delay > 0:
+            asyncio.get_running_loop().call_later(delay, self.transport.sendto, frame, self.target)
+        else:
+            self.transport.sendto(frame, self.target)
+
+
+class HostEmulator:
+    """N hosts with M devices each, reporting at report_rate reports/s per host."""
+
+    def __init__(self, lan_secret_key: str, hosts: int = 2, devices: int = 10, port: int = DEFAULT_PORT,
+                 report_rate: float = 0.0, loss: float = 0.0, latency: float = 0.0, jitter: float = 0.0,
+                 seed: int | None = None):
+        self.lan_secret_key = lan_secret_key
+        self.port = port
+        self.report_rate = report_rate
+        self.rng = random.Random(seed)
+        self.hosts: list[EmulatedHost] = []
+        for i in range(hosts):
+            sequence = f"E0{i:010X}"
+            host_devices = [
+                EmulatedDevice(f"{sequence}-{route}", "3-001", "device.light", sequence, route)
+                for route in range(1, devices + 1)
+            ]
+            self.hosts.append(EmulatedHost(sequence, f"127.0.0.{i + 2}", lan_secret_key, host_devices,
+                                           (HA_ADDRESS, port), loss, latency, jitter, self.rng))
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def addresses(self) -> dict[str, str]:
+        return {host.sequence: host.ip for host in self.hosts}
+
+    def devices(self) -> list[EmulatedDevice]:
+        return [device for host in self.hosts for device in host.devices.values()]
+
+    def add_report_listener(self, callback: Callable[[str, dict[str, Any], float], None]):
+        for host in self.hosts:
+            host.report_listeners.append(callback)
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        for host in self.hosts:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if hasattr(socket, "SO_REUSEPORT"):
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            sock.bind((host.ip, self.port))
+            await loop.create_datagram_endpoint(lambda h=host: h, sock=sock)
+            if self.report_rate > 0:
+                self._tasks.append(loop.create_task(self._report_loop(host)))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+        for host in self.hosts:
+            if host.transport is not None:
+                host.transport.close()
+
+    async def _report_loop(self, host: EmulatedHost):
+        devices = list(host.devices.values())
+        while True:
+            await asyncio.sleep(self.rng.expovariate(self.report_rate))
+            host.toggle(self.rng.choice(devices))
+
+    def stats(self) -> dict[str, int]:
+        total: dict[str, int] = {}
+        for host in self.hosts:
+            for key, value in host.stats.items():
+                total[key] = total.get(key, 0) + value
+        return total
+
+
+async def _main(args):
+    emulator = HostEmulator(args.key, args.hosts, args.devices, args.port, args.rate, args.loss,
+                            args.latency, args.jitter, args.seed)
+    await emulator.start()
+    print("emulating hosts:", json.dumps(emulator.addresses))
+    try:
+        while True:
+            await asyncio.sleep(10)
+            print(json.dumps(emulator.stats()))
+    finally:
+        await emulator.stop()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--key", required=True, help="LAN secret key (hex)")
+    parser.add_argument("--hosts", type=int, default=2)
+    parser.add_argument("--devices", type=int, default=10, help="devices per host")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="LAN port the integration listens on")
+    parser.add_argument("--rate", type=float, default=0.0, help="reports per second per host")
+    parser.add_argument("--loss", type=float, default=0.0, help="packet loss ratio, both directions")
+    parser.add_argument("--latency", type=float, default=0.0, help="one-way latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency (s)")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(_main(build_parser().parse_args()))
+    except KeyboardInterrupt:
+        pass